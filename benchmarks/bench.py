@@ -0,0 +1,241 @@
+"""Benchmarks of the local expression toolchain
+
+Synthetic expression files are built from the clauses of the expressions folder, scaled to 10k clauses
+(and 1M clauses with --large). Each operation reports its best time and its peak memory (tracemalloc),
+compared to the baselines of baselines.json.
+
+>>> python benchmarks/bench.py
+>>> python benchmarks/bench.py --large --output bench_output.txt
+>>> python benchmarks/bench.py --update
+# Save the current results as the new baselines
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cf_rules import Analyzer, Expression, Optimizer, Preflight, Utils
+from cf_rules.utils import ZONE_FIELDS
+from cf_rules.batch import np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+SIZES = {"10k": 10_000, "1M": 1_000_000}
+# Slower runs are regressions above this ratio of the baseline
+THRESHOLD = 0.25
+
+
+def source_clauses() -> list[str]:
+    """Get the clauses of the expressions folder of the repository"""
+
+    utils = Utils(os.path.join(ROOT, "expressions"))
+
+    clauses = []
+    for file in sorted(os.listdir(utils.directory)):
+        if file.endswith(".txt"):
+            clauses.extend(utils.iter_clauses(file))
+
+    return clauses
+
+
+def scale(clauses: list[str], count: int) -> list[str]:
+    """Repeat the clauses up to count, making every copy distinct by changing its first value"""
+
+    def vary(clause: str, index: int) -> str:
+        if '"' in clause:
+            return re.sub(r'"([^"]*)"', lambda x: f'"{x.group(1)}{index}"', clause, count=1)
+        return re.sub(r"(\d+)\)$", lambda x: f"{int(x.group(1)) + index})", clause, count=1)
+
+    return [vary(clause, index) for index, clause in zip(range(count), itertools.cycle(clauses))]
+
+
+def measure(function, repeat: int) -> dict:
+    """Get the best time of a function over repeat runs and its peak memory over one more run"""
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time": min(times), "peak": peak}
+
+
+def operations(directory: str, size: str, count: int) -> dict:
+    """Get the operations to benchmark on a synthetic folder of count clauses"""
+
+    utils = Utils(directory)
+    clauses = scale(source_clauses(), count)
+
+    utils.write_expression("Synthetic", clauses, header={"action": "block", "enabled": "True"})
+    _, expression = utils.read_expression("Synthetic")
+    parsed = Expression(expression)
+
+    json_data = {"result": {"rules": [{"id": index, "expression": clause} for index, clause in enumerate(clauses[:1000])]}}
+    headers = [f"#! action:{action} enabled:True !#" for action in itertools.islice(itertools.cycle(["block", "skip", "log", "managed_challenge"]), count)]
+
+    # One file per 1000 clauses for the folder checks
+    preflight_directory = os.path.join(directory, "preflight")
+    preflight_utils = Utils(preflight_directory)
+    for index in range(0, count, 1000):
+        preflight_utils.write_expression(f"Rule {index}", clauses[index:index + 1000], header={"action": "block"})
+
+    requests = [
+        {"http.user_agent": f"Mozilla/5.0 {index}", "ip.geoip.asnum": index, "cf.threat_score": index % 10}
+        for index in range(1000)
+    ]
+
+    # Pages of 50 zones as listed by the API, one zone per 10 clauses
+    zones = [
+        {
+            "id": f"{index:032x}",
+            "name": f"example{index}.com",
+            "status": "active",
+            "paused": False,
+            "type": "full",
+            "name_servers": ["ada.ns.cloudflare.com", "bob.ns.cloudflare.com"],
+            "original_name_servers": ["ns1.example.net", "ns2.example.net"],
+            "meta": {"step": 2, "custom_certificate_quota": 0, "page_rule_quota": 3, "phishing_detected": False},
+            "owner": {"id": None, "type": "user", "email": None},
+            "account": {"id": "a1b2c3", "name": "Example"},
+            "permissions": ["#zone:read", "#zone:edit", "#waf:read", "#waf:edit", "#dns_records:read", "#dns_records:edit"],
+            "plan": {"id": f"{0:032x}", "name": "Free Website", "price": 0, "currency": "USD", "legacy_id": "free", "is_subscribed": False},
+        }
+        for index in range(count // 10)
+    ]
+    zone_pages = [
+        json.dumps({"success": True, "errors": [], "messages": [], "result": zones[index:index + 50]}).encode("utf-8")
+        for index in range(0, len(zones), 50)
+    ]
+
+    ops = {
+        "write_expression": lambda: utils.write_expression("Written", expression),
+        "write_expression_iterable": lambda: utils.write_expression("Written", iter(clauses)),
+        "read_expression": lambda: utils.read_expression("Synthetic"),
+        "stream_expression": lambda: sum(1 for _ in utils.stream_expression("Synthetic")[1]),
+        "iter_clauses": lambda: sum(1 for _ in utils.iter_clauses("Synthetic")),
+        "process_header": lambda: [utils.process_header(x) for x in headers],
+        "beautify": lambda: Utils.beautify(expression),
+        "get_json_key": lambda: [Utils.get_json_key(json_data, ["result", "rules", index % 1000, "expression"]) for index in range(count)],
+        "parse": lambda: Expression(expression),
+        "canonical": lambda: parsed.canonical,
+        "stable_hash": lambda: Expression.stable_hash(expression),
+        "evaluate": lambda: [parsed.evaluate(x) for x in requests[:10_000_000 // count]],
+        "preflight": lambda: Preflight(preflight_directory).check_files(workers=1),
+        "decode_zones": lambda: [x for page in zone_pages for x in json.loads(page)["result"]],
+        "decode_zones_projected": lambda: [x for page in zone_pages for x in Utils.decode_json(page, ZONE_FIELDS)["result"]],
+    }
+
+    # Quadratic analyses and masks of every clause are only measured on the small size
+    if size == "10k":
+        rules = [
+            {"description": f"Rule {index}", "expression": " or ".join(clauses[index:index + 100]), "action": "block"}
+            for index in range(0, 1000, 100)
+        ]
+        stats = {x["description"]: {"hit_rate": 0.01 * (index + 1)} for index, x in enumerate(rules)}
+
+        ops["analyzer"] = lambda: Analyzer(rules).report()
+        ops["optimizer"] = lambda: Optimizer(rules, stats).optimize()
+
+    if np is not None and size == "10k":
+        # pylint: disable=import-outside-toplevel
+        from cf_rules import Batch
+
+        columns = {
+            "http.user_agent": [f"Mozilla/5.0 {index % 5000}" for index in range(10_000)],
+            "ip.geoip.asnum": list(range(10_000)),
+        }
+        ops["batch"] = lambda: Batch(columns).evaluate(parsed)
+
+    return ops
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> list[str]:
+    """Get the operations slower than their baseline by more than threshold"""
+
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline and result["time"] > baseline["time"] * (1 + threshold):
+            regressions.append(f"{name} is {result['time'] / baseline['time']:.2f}x slower than its baseline")
+        if baseline and result["peak"] > baseline["peak"] * (1 + threshold):
+            regressions.append(f"{name} uses {result['peak'] / baseline['peak']:.2f}x more memory than its baseline")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the local expression toolchain")
+    parser.add_argument("--large", action="store_true", help="Also run the 1M clauses benchmarks (slow)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per operation, the best time is kept")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed slowdown ratio before a regression")
+    parser.add_argument("--only", help="Only run the operations containing this text")
+    parser.add_argument("--update", action="store_true", help="Save the results as the new baselines")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    with open(BASELINES, "r", encoding="utf-8") as file:
+        baselines = json.load(file)
+
+    results = {}
+    lines = []
+
+    for size, count in SIZES.items():
+        if size == "1M" and not args.large:
+            continue
+
+        directory = tempfile.mkdtemp(prefix="cf_rules_bench_")
+        try:
+            for name, function in operations(directory, size, count).items():
+                key = f"{name}@{size}"
+                if args.only and args.only not in key:
+                    continue
+
+                results[key] = measure(function, 1 if size == "1M" else args.repeat)
+
+                baseline = baselines["results"].get(key)
+                delta = f"{results[key]['time'] / baseline['time']:6.2f}x" if baseline else "   new"
+                lines.append(f"{key:32} {results[key]['time'] * 1000:10.2f} ms {results[key]['peak'] / 1024:12.0f} KiB {delta}")
+                print(lines[-1])
+        finally:
+            shutil.rmtree(directory)
+
+    regressions = compare(results, baselines["results"], args.threshold)
+    lines.extend(regressions)
+    for regression in regressions:
+        print(regression)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    if args.update:
+        baselines["machine"] = f"{platform.python_implementation()} {platform.python_version()} on {platform.machine()}"
+        baselines["results"].update(results)
+        with open(BASELINES, "w", encoding="utf-8") as file:
+            json.dump(baselines, file, indent=4)
+            file.write("\n")
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,12 +8,96 @@ __author_email__ = "pro@quentium.fr"
 __license__ = "Apache 2.0"
 __copyright__ = "Copyright 2025 Quentin Lienhardt"
 
+import importlib
+from typing import TYPE_CHECKING
+
 __all__ = (
     "Cloudflare",
     "Utils",
     "Error",
+    "RuleStore",
+    "Expression",
+    "Replay",
+    "Batch",
+    "Analyzer",
+    "Optimizer",
+    "Preflight",
+    "CachedCloudflare",
+    "Daemon",
+    "DaemonClient",
+    "Transport",
+    "RequestsTransport",
+    "HTTP2Transport",
+    "MemoryTransport",
+    "AdaptiveTransport",
+    "Snapshots",
+    "ZoneIndex",
+    "Orchestrator",
+    "RateLimiter",
+    "RateLimitedTransport",
+    "DryRunTransport",
+    "RulePack",
 )
 
-from .cf import Cloudflare
-from .utils import Utils
-from .error import Error
+# Submodules are only imported when their classes are first used (PEP 562),
+# so importing the package does not load requests, NumPy or the parser
+_MODULES = {
+    "Cloudflare": ".cf",
+    "Utils": ".utils",
+    "Error": ".error",
+    "RuleStore": ".store",
+    "Expression": ".expression",
+    "Replay": ".replay",
+    "Batch": ".batch",
+    "Analyzer": ".analysis",
+    "Optimizer": ".optimizer",
+    "Preflight": ".preflight",
+    "CachedCloudflare": ".daemon",
+    "Daemon": ".daemon",
+    "DaemonClient": ".daemon",
+    "Transport": ".transport",
+    "RequestsTransport": ".transport",
+    "HTTP2Transport": ".transport",
+    "MemoryTransport": ".transport",
+    "AdaptiveTransport": ".transport",
+    "Snapshots": ".snapshot",
+    "ZoneIndex": ".zones",
+    "Orchestrator": ".orchestrator",
+    "RateLimiter": ".transport",
+    "RateLimitedTransport": ".transport",
+    "DryRunTransport": ".transport",
+    "RulePack": ".pack",
+}
+
+if TYPE_CHECKING:
+    from .cf import Cloudflare
+    from .utils import Utils
+    from .error import Error
+    from .store import RuleStore
+    from .expression import Expression
+    from .replay import Replay
+    from .batch import Batch
+    from .analysis import Analyzer
+    from .optimizer import Optimizer
+    from .preflight import Preflight
+    from .daemon import CachedCloudflare, Daemon, DaemonClient
+    from .transport import AdaptiveTransport, HTTP2Transport, MemoryTransport, RequestsTransport, Transport
+    from .snapshot import Snapshots
+    from .zones import ZoneIndex
+    from .orchestrator import Orchestrator
+    from .transport import DryRunTransport, RateLimitedTransport, RateLimiter
+    from .pack import RulePack
+
+
+def __getattr__(name: str) -> object:
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
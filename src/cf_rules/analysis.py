@@ -0,0 +1,332 @@
+import ipaddress
+import math
+import os
+
+from .error import Error
+from .expression import Comparison, Expression, Literal, Logical
+from .utils import Utils
+
+# Actions stopping the evaluation of the next custom rules when matching
+TERMINATING_ACTIONS = ("block", "challenge", "js_challenge", "managed_challenge", "skip")
+
+# Length of " or " joining two clauses
+CLAUSE_SEPARATOR = 4
+# Maximum length of the expression of a rule accepted by Cloudflare
+MAX_EXPRESSION_LENGTH = 4096
+
+
+def interval(node: Comparison) -> list[tuple[float, float]] | None:
+    """Get the integer intervals matched by a numeric comparison, or None if it is not numeric"""
+
+    value = node.value
+
+    if node.operator == "in" and hasattr(value, "members") and value.members and all(x.kind in ("int", "range") for x in value.members):
+        return [(x.value, x.value) if x.kind == "int" else tuple(int(y) for y in x.value.split("..")) for x in value.members]
+
+    if getattr(value, "kind", None) != "int":
+        return None
+
+    match node.operator:
+        case "eq":
+            return [(value.value, value.value)]
+        case "ge":
+            return [(value.value, math.inf)]
+        case "gt":
+            return [(value.value + 1, math.inf)]
+        case "le":
+            return [(-math.inf, value.value)]
+        case "lt":
+            return [(-math.inf, value.value - 1)]
+
+    return None
+
+
+def networks(node: Comparison) -> list | None:
+    """Get the IP networks matched by an IP comparison, or None if it is not a list of networks"""
+
+    if node.operator == "eq" and getattr(node.value, "kind", None) == "ip":
+        members = [node.value]
+    elif node.operator == "in" and hasattr(node.value, "members") and node.value.members:
+        members = node.value.members
+    else:
+        return None
+
+    if not all(x.kind == "ip" and ".." not in x.value for x in members):
+        return None
+
+    return [ipaddress.ip_network(x.value) for x in members]
+
+
+def strings(node: Comparison) -> list[str] | None:
+    """Get the strings exactly matched by a string comparison, or None if it is not one"""
+
+    if node.operator == "eq" and getattr(node.value, "kind", None) == "string":
+        return [node.value.value]
+
+    if node.operator == "in" and hasattr(node.value, "members") and node.value.members and all(x.kind == "string" for x in node.value.members):
+        return [x.value for x in node.value.members]
+
+    return None
+
+
+def implies(a, b) -> bool:
+    """Check if every request matching the clause a also matches the clause b (both canonical)
+
+    Only obvious cases are detected: a clause can be narrower without being reported
+    """
+
+    if a.text() == b.text():
+        return True
+
+    if isinstance(a, Logical) and a.operator == "or":
+        return all(implies(x, b) for x in a.children)
+    if isinstance(b, Logical) and b.operator == "and":
+        return all(implies(a, x) for x in b.children)
+    if isinstance(a, Logical) and a.operator == "and":
+        return any(implies(x, b) for x in a.children)
+    if isinstance(b, Logical) and b.operator == "or":
+        return any(implies(a, x) for x in b.children)
+
+    if not isinstance(a, Comparison) or not isinstance(b, Comparison) or a.operator is None or b.operator is None:
+        return False
+    if a.field.text() != b.field.text():
+        return False
+
+    if b.operator == "contains" and getattr(b.value, "kind", None) == "string":
+        if a.operator == "contains" and getattr(a.value, "kind", None) == "string":
+            return b.value.value in a.value.value
+        a_strings = strings(a)
+        return a_strings is not None and all(b.value.value in x for x in a_strings)
+
+    a_strings, b_strings = strings(a), strings(b)
+    if a_strings is not None and b_strings is not None:
+        return set(a_strings) <= set(b_strings)
+
+    a_interval, b_interval = interval(a), interval(b)
+    if a_interval is not None and b_interval is not None:
+        return all(any(c <= x and y <= d for c, d in b_interval) for x, y in a_interval)
+
+    a_networks, b_networks = networks(a), networks(b)
+    if a_networks is not None and b_networks is not None:
+        return all(any(x.version == y.version and x.subnet_of(y) for y in b_networks) for x in a_networks)
+
+    return False
+
+
+def clause_text(clause) -> str:
+    return f"({clause.text()})"
+
+
+class Analyzer:
+    def __init__(self, rules: list[dict]) -> None:
+        """Find shadowed, duplicated and mergeable clauses in an ordered list of rules
+
+        Rules are dictionaries with a description (or name), an expression, an action and an enabled state,
+        as returned by :func:`Cloudflare.get_rules`
+
+        :exception Error: If an expression is not valid
+
+        >>> analyzer = Analyzer(cf.get_rules("example.com")["result"])
+        """
+
+        self.rules = []
+
+        for rule in rules:
+            name = rule.get("description") or rule.get("name")
+            try:
+                clauses = [x.canonical() for x in Expression(rule["expression"]).clauses]
+            except Error as e:
+                raise Error(f"Rule '{name}' is not valid: {e}") from e
+
+            self.rules.append({
+                "name": name,
+                "action": rule.get("action") or "managed_challenge",
+                "enabled": rule.get("enabled", True) is not False,
+                "clauses": clauses,
+            })
+
+    @classmethod
+    def from_folder(cls, directory: str | None = None) -> "Analyzer":
+        """Analyze the expressions of a folder, ordered by file name
+
+        >>> analyzer = Analyzer.from_folder("my_expressions")
+        """
+
+        utils = Utils(directory)
+
+        rules = []
+        for file in sorted(os.listdir(utils.directory)):
+            if file.endswith(".txt"):
+                header, expression = utils.read_expression(file)
+                rules.append({"name": file.removesuffix(".txt"), "expression": expression, **(header or {})})
+
+        return cls(rules)
+
+    def shadowed(self) -> list[dict]:
+        """Get clauses that can never match: narrower than a clause of the same rule,
+        or than a clause of an earlier enabled rule with a terminating action
+        """
+
+        results = []
+
+        for index, rule in enumerate(self.rules):
+            for clause_index, clause in enumerate(rule["clauses"]):
+                shadow = None
+
+                for other_index, other in enumerate(rule["clauses"]):
+                    if other_index == clause_index:
+                        continue
+                    # Equivalent clauses, only the later one is redundant
+                    if other_index > clause_index and implies(other, clause):
+                        continue
+                    if implies(clause, other):
+                        shadow = (rule["name"], other)
+                        break
+
+                if not shadow:
+                    for earlier in self.rules[:index]:
+                        if not earlier["enabled"] or earlier["action"] not in TERMINATING_ACTIONS:
+                            continue
+                        other = next((x for x in earlier["clauses"] if implies(clause, x)), None)
+                        if other is not None:
+                            shadow = (earlier["name"], other)
+                            break
+
+                if shadow:
+                    results.append({
+                        "rule": rule["name"],
+                        "clause": clause_text(clause),
+                        "by_rule": shadow[0],
+                        "by_clause": clause_text(shadow[1]),
+                        "bytes": len(clause_text(clause)) + CLAUSE_SEPARATOR,
+                    })
+
+        return results
+
+    def duplicates(self) -> list[dict]:
+        """Get clauses appearing in several rules, removing the copies would free their bytes"""
+
+        rules_by_clause = {}
+        for rule in self.rules:
+            for clause in rule["clauses"]:
+                rules_by_clause.setdefault(clause_text(clause), [])
+                if rule["name"] not in rules_by_clause[clause_text(clause)]:
+                    rules_by_clause[clause_text(clause)].append(rule["name"])
+
+        return [
+            {
+                "clause": clause,
+                "rules": rules,
+                "bytes": (len(rules) - 1) * (len(clause) + CLAUSE_SEPARATOR),
+            }
+            for clause, rules in rules_by_clause.items()
+            if len(rules) > 1
+        ]
+
+    def case_variants(self) -> list[dict]:
+        """Get string clauses only differing by their case, which could be a single clause using lower()
+
+        Only clauses of consecutive rules with the same action and enabled state are grouped (see :func:`mergeable`)
+        """
+
+        groups = {}
+        run = 0
+        for index, rule in enumerate(self.rules):
+            previous = self.rules[index - 1] if index else None
+            if previous and (previous["action"], previous["enabled"]) != (rule["action"], rule["enabled"]):
+                run += 1
+            for clause in rule["clauses"]:
+                if (
+                    isinstance(clause, Comparison)
+                    and clause.operator in ("contains", "eq")
+                    and getattr(clause.value, "kind", None) == "string"
+                    and clause.field.args is None
+                ):
+                    key = (run, clause.field.text(), clause.operator, clause.value.value.lower())
+                    group = groups.setdefault(key, {"clauses": [], "rules": []})
+                    if clause_text(clause) not in group["clauses"]:
+                        group["clauses"].append(clause_text(clause))
+                    if rule["name"] not in group["rules"]:
+                        group["rules"].append(rule["name"])
+
+        results = []
+        for (_, field, operator, value), group in groups.items():
+            if len(group["clauses"]) > 1:
+                suggestion = f"(lower({field}) {operator} {Literal('string', value).text()})"
+                results.append({
+                    "clauses": group["clauses"],
+                    "rules": group["rules"],
+                    "suggestion": suggestion,
+                    "bytes": sum(len(x) + CLAUSE_SEPARATOR for x in group["clauses"]) - len(suggestion) - CLAUSE_SEPARATOR,
+                })
+
+        return results
+
+    def mergeable(self, max_length: int = MAX_EXPRESSION_LENGTH) -> list[dict]:
+        """Get groups of consecutive rules with the same action and enabled state, which could be a single rule
+
+        Groups are filled in order while their clauses joined by "or" fit in max_length characters,
+        only groups of several rules are returned
+
+        >>> analyzer.mergeable()
+        >>> [{"rules": ["Bad IP", "Bad AS"], "action": "block", "enabled": True, "length": 812, "slots": 1}]
+        """
+
+        groups = []
+        for rule in self.rules:
+            length = sum(len(clause_text(x)) + CLAUSE_SEPARATOR for x in rule["clauses"]) - CLAUSE_SEPARATOR
+            previous = groups[-1] if groups else None
+            if (
+                previous
+                and previous["action"] == rule["action"]
+                and previous["enabled"] == rule["enabled"]
+                and previous["length"] + CLAUSE_SEPARATOR + length <= max_length
+            ):
+                previous["rules"].append(rule["name"])
+                previous["length"] += CLAUSE_SEPARATOR + length
+            else:
+                groups.append({"rules": [rule["name"]], "action": rule["action"], "enabled": rule["enabled"], "length": length})
+
+        return [dict(x, slots=len(x["rules"]) - 1) for x in groups if len(x["rules"]) > 1]
+
+    def report(self, max_rules: int | None = None, max_length: int = MAX_EXPRESSION_LENGTH) -> dict:
+        """Get the full analysis with an estimation of the rule slots and expression bytes each fix would free
+
+        * max_length -> Maximum length of the expression of merged rules, see :func:`mergeable`
+
+        Rules having all their clauses shadowed can be deleted, freeing their slot.
+        Duplicates are not counted in the freed bytes, a copy in an earlier terminating rule is already shadowed.
+
+        >>> analyzer.report(max_rules=cf.max_rules)
+        >>> {"rules": 5, "max_rules": 5, "shadowed": [...], "duplicates": [...], "case_variants": [...], "mergeable": [...], "removable": ["Bad Bots lib"], "slots_freed": 2, "bytes_freed": 1250}
+        """
+
+        shadowed = self.shadowed()
+        duplicates = self.duplicates()
+        case_variants = self.case_variants()
+        mergeable = self.mergeable(max_length)
+
+        # Clauses already removed as shadowed are not counted twice
+        shadowed_clauses = {x["clause"] for x in shadowed}
+        variants_bytes = 0
+        for x in case_variants:
+            remaining = [y for y in x["clauses"] if y not in shadowed_clauses]
+            if len(remaining) > 1:
+                variants_bytes += sum(len(y) + CLAUSE_SEPARATOR for y in remaining) - len(x["suggestion"]) - CLAUSE_SEPARATOR
+
+        shadowed_count = {}
+        for x in shadowed:
+            shadowed_count[x["rule"]] = shadowed_count.get(x["rule"], 0) + 1
+        removable = [x["name"] for x in self.rules if shadowed_count.get(x["name"]) == len(x["clauses"])]
+
+        return {
+            "rules": len(self.rules),
+            "max_rules": max_rules,
+            "shadowed": shadowed,
+            "duplicates": duplicates,
+            "case_variants": case_variants,
+            "mergeable": mergeable,
+            "removable": removable,
+            "slots_freed": len(removable) + sum(x["slots"] for x in mergeable if not set(x["rules"]) & set(removable)),
+            "bytes_freed": sum(x["bytes"] for x in shadowed) + variants_bytes,
+        }
@@ -0,0 +1,241 @@
+from collections.abc import Sequence
+
+from .error import Error
+from .expression import Comparison, Expression, Field, Literal, LiteralSet, Logical, Not, compile_test, to_int
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Functions applied on the distinct values of a column
+COLUMN_FUNCTIONS = {
+    "lower": lambda x: np.char.lower(x),
+    "upper": lambda x: np.char.upper(x),
+    "len": lambda x: np.char.str_len(x),
+}
+
+
+class Batch:
+    def __init__(self, columns: dict[str, Sequence]) -> None:
+        """Table of requests stored by columns to evaluate expressions on all requests at once
+
+        Columns are keyed by field names, as NumPy arrays, lists or Arrow-like arrays (having a to_numpy method).
+        Requires NumPy (pip install numpy).
+
+        :exception Error: If NumPy is not installed or columns do not have the same length
+
+        >>> batch = Batch({"http.user_agent": ["curl/8.0", "AhrefsBot"], "ip.geoip.asnum": [24940, 3215], "cf.threat_score": [0, 12]})
+        """
+
+        if np is None:
+            raise Error("NumPy is required for batch evaluation, install it using pip install numpy")
+
+        self.columns = {}
+        # Rows having a value, only kept for columns with missing values
+        self.valid = {}
+        for name, values in columns.items():
+            self.columns[name], valid = self.to_array(values)
+            if valid is not None:
+                self.valid[name] = valid
+
+        lengths = {len(x) for x in self.columns.values()}
+        if len(lengths) > 1:
+            raise Error("All columns must have the same length")
+
+        self.length = lengths.pop() if lengths else 0
+
+        self._uniques = {}
+        self._masks = {}
+
+    @staticmethod
+    def to_array(values: Sequence) -> tuple["np.ndarray", "np.ndarray | None"]:
+        """Convert a column to a NumPy array with the mask of its rows having a value (None if all rows have one),
+        strings columns are converted to fixed-size unicode
+
+        Missing values (None or NaN) become 0 in numbers columns and empty strings in strings columns,
+        they never match a comparison (except "ne"), like a missing field in :func:`Expression.evaluate`
+        """
+
+        if hasattr(values, "to_numpy"):
+            try:
+                values = values.to_numpy(zero_copy_only=False)
+            except TypeError:
+                values = values.to_numpy()
+
+        array = np.asarray(values)
+
+        if array.dtype.kind == "O":
+            # NaN is the only value not equal to itself
+            items = array.tolist()
+            valid = np.array([x is not None and x == x for x in items], dtype=bool)
+            if all(isinstance(x, (int, float)) and not isinstance(x, bool) for x, y in zip(items, valid) if y):
+                array = np.array([x if y else 0 for x, y in zip(items, valid)])
+            else:
+                array = np.array([str(x) if y else "" for x, y in zip(items, valid)], dtype=str)
+        elif array.dtype.kind == "f":
+            valid = ~np.isnan(array)
+            array = np.where(valid, array, 0)
+        else:
+            return array, None
+
+        return array, None if valid.all() else valid
+
+    def unique(self, name: str) -> tuple["np.ndarray", "np.ndarray"]:
+        """Get the distinct values of a column and the index of each value in them, computed once per column"""
+
+        if name not in self._uniques:
+            self._uniques[name] = np.unique(self.columns[name], return_inverse=True)
+
+        return self._uniques[name]
+
+    def map_unique(self, name: str, test, function=None, vectorized: bool = False) -> "np.ndarray":
+        """Evaluate a test once per distinct value of a column and expand the result to all rows
+
+        * vectorized -> The test takes the array of distinct values instead of a single value
+        """
+
+        uniques, inverse = self.unique(name)
+
+        if function:
+            uniques = function(uniques)
+
+        if vectorized:
+            unique_mask = test(uniques)
+        else:
+            unique_mask = np.fromiter((test(x) for x in uniques.tolist()), dtype=bool, count=len(uniques))
+
+        return unique_mask[inverse]
+
+    def column_test(self, node: Comparison) -> tuple[str, object]:
+        """Get the column name and function of the field of a comparison"""
+
+        field = node.field
+
+        if field.accessors:
+            raise Error(f"Field '{field.text()}' cannot be evaluated on columns")
+
+        if field.args is None:
+            return field.name, None
+
+        if field.name in COLUMN_FUNCTIONS and len(field.args) == 1 and isinstance(field.args[0], Field) and field.args[0].args is None:
+            return field.args[0].name, COLUMN_FUNCTIONS[field.name]
+
+        raise Error(f"Function '{field.name}' cannot be evaluated on columns")
+
+    def compare(self, node: Comparison) -> "np.ndarray":
+        """Evaluate a comparison on all rows, rows missing the field only match with "ne"
+        """
+
+        name, function = self.column_test(node)
+
+        if name not in self.columns:
+            return np.full(self.length, node.operator == "ne")
+
+        mask = self.compare_column(node, name, function)
+
+        if name in self.valid:
+            return mask | ~self.valid[name] if node.operator == "ne" else mask & self.valid[name]
+
+        return mask
+
+    def compare_column(self, node: Comparison, name: str, function) -> "np.ndarray":
+        """Evaluate a comparison on all values of a column, including the placeholders of missing values"""
+
+        column = self.columns[name]
+        numeric = column.dtype.kind in "iufb" and function is None
+        value = node.value
+
+        if node.operator is None:
+            return column.astype(bool) if numeric else self.map_unique(name, lambda x: bool(x) and x != "False", function)
+
+        # Vectorized paths, every other comparison is evaluated once per distinct value
+        if isinstance(value, Literal) and value.kind == "int" and numeric:
+            match node.operator:
+                case "eq":
+                    return column == value.value
+                case "ne":
+                    return column != value.value
+                case "lt":
+                    return column < value.value
+                case "le":
+                    return column <= value.value
+                case "gt":
+                    return column > value.value
+                case "ge":
+                    return column >= value.value
+
+        if isinstance(value, Literal) and value.kind == "string" and node.operator in ("eq", "ne") and function is None:
+            mask = column.astype(str) == value.value
+            return mask if node.operator == "eq" else ~mask
+
+        if isinstance(value, Literal) and value.kind == "string" and node.operator == "contains":
+            return self.map_unique(name, lambda x: np.char.find(x.astype(str), value.value) >= 0, function, vectorized=True)
+
+        if isinstance(value, LiteralSet) and node.operator == "in":
+            kinds = {x.kind for x in value.members}
+            if kinds == {"string"} and function is None:
+                return np.isin(column.astype(str), [x.value for x in value.members])
+            if kinds == {"int"} and numeric:
+                return np.isin(column, [x.value for x in value.members])
+            if kinds <= {"int", "range"} and numeric:
+                mask = np.isin(column, [x.value for x in value.members if x.kind == "int"])
+                for a, b in (tuple(int(y) for y in x.value.split("..")) for x in value.members if x.kind == "range"):
+                    mask |= (column >= a) & (column <= b)
+                return mask
+
+        test = compile_test(node.operator, value)
+
+        if isinstance(value, Literal) and value.kind == "int":
+            # Strings columns compared to an integer
+            return self.map_unique(name, lambda x: to_int(x) is not None and test(x), function)
+
+        return self.map_unique(name, test, function)
+
+    def mask(self, node) -> "np.ndarray":
+        """Evaluate a parsed expression on all rows, masks of identical clauses are computed once"""
+
+        key = node.text()
+
+        if key not in self._masks:
+            if isinstance(node, Logical):
+                masks = [self.mask(x) for x in node.children]
+                match node.operator:
+                    case "and":
+                        self._masks[key] = np.logical_and.reduce(masks)
+                    case "or":
+                        self._masks[key] = np.logical_or.reduce(masks)
+                    case _:
+                        self._masks[key] = np.logical_xor.reduce(masks)
+            elif isinstance(node, Not):
+                self._masks[key] = ~self.mask(node.child)
+            else:
+                self._masks[key] = self.compare(node)
+
+        return self._masks[key]
+
+    def evaluate(self, expression: Expression | str) -> dict:
+        """Evaluate an expression on all rows, returning boolean masks of the expression and of each top-level clause
+
+        :exception Error: If a field or function cannot be evaluated on columns
+
+        >>> batch.evaluate('(http.user_agent contains "Bot") or (cf.threat_score ge 1)')
+        >>> {"mask": array([False, True]), "clauses": [array([False, True]), array([False, True])]}
+        """
+
+        if isinstance(expression, str):
+            expression = Expression(expression)
+
+        return {
+            "mask": self.mask(expression.tree),
+            "clauses": [self.mask(x) for x in expression.clauses],
+        }
+
+    def evaluate_rules(self, rules: dict[str, Expression | str]) -> dict[str, dict]:
+        """Evaluate several rules on all rows, see :func:`evaluate`
+
+        >>> batch.evaluate_rules({"Bad Bots": '(http.user_agent contains "Bot")', "Bad IPs": "(cf.threat_score ge 1)"})
+        >>> {"Bad Bots": {"mask": array([False, True]), "clauses": [...]}, "Bad IPs": {"mask": array([False, True]), "clauses": [...]}}
+        """
+
+        return {name: self.evaluate(expression) for name, expression in rules.items()}
@@ -1,9 +1,18 @@
-import os
-
-import requests
+import copy
+import json
+from collections.abc import Iterator
 
+from .analysis import Analyzer
 from .error import Error
-from .utils import Utils
+from .expression import Expression
+from .optimizer import Optimizer
+from .pack import RulePack
+from .preflight import Preflight
+from .snapshot import Snapshots
+from .store import RuleStore
+from .transport import API_URL, DryRunTransport, RequestsTransport, Transport
+from .zones import ZoneIndex
+from .utils import CUSTOM_PHASE, JSON_HEADER_KEYS, PHASE_ACTIONS, PLAN_MAX_RULES, RULESET_FIELDS, Utils
 
 
 class DomainObject(dict):
@@ -25,21 +34,60 @@ class RulesetObject(dict):
 
 
 class Cloudflare:
-    def __init__(self, folder: str | None = None):
+    def __init__(self, folder: str | None = None, transport: Transport | None = None, create: bool = True):
         """Initialize Cloudflare class
 
         Specify a folder argument where expressions will be saved
 
+        * create -> Create the folder now, else it is only created when a rule is exported
+
+        * transport -> HTTP backend used for every request, see :class:`RequestsTransport` (default), \
+        :class:`HTTP2Transport`, :class:`AdaptiveTransport` and :class:`MemoryTransport`
+
         >>> cf = Cloudflare("my_expressions")
+        >>> cf = Cloudflare("my_expressions", transport=HTTP2Transport())
         """
 
-        self.utils = Utils(folder)
+        self.utils = Utils(folder, create)
         self.error = Error()
+        self.transport = transport or RequestsTransport()
+
+        # Expression files already checked, see :class:`Preflight`
+        self._checked = {}
+
+        # Domains resolved without any request, see :func:`index_zones`
+        self.zone_index = None
+
+        # Fields kept from zones and rulesets when decoding responses, None keeps whole objects
+        # (zones are kept whole unless :data:`ZONE_FIELDS` is set, see :func:`Utils.project`)
+        self.zone_fields = None
+        self.ruleset_fields = RULESET_FIELDS
 
         self.plan = "free"
         self.max_rules = 5
         self.active_rules = 0
 
+    def _request(self, method: str, path: str, body: dict | None = None) -> object:
+        """Send a request to Cloudflare's API through the transport of the instance"""
+
+        return self.transport.request(method, API_URL + path, headers=self._headers, json=body, timeout=5)
+
+    @staticmethod
+    def _json(r: object, fields: dict | None = None) -> object:
+        """Decode a response with the fastest JSON backend, keeping only some fields of its result (see :func:`Utils.decode_json`)
+
+        Responses without a raw body (see :func:`Transport.request`) are decoded by their json() method
+        """
+
+        content = getattr(r, "content", None)
+        if content is None:
+            data = r.json()
+            if fields is not None and isinstance(data, dict) and data.get("result") is not None:
+                data["result"] = Utils.project(data["result"], fields)
+            return data
+
+        return Utils.decode_json(content, fields)
+
     def auth_key(self, email: str, key: str) -> dict:
         """Get your global API Key through cloudflare profile (API Keys section)
 
@@ -71,7 +119,7 @@ class Cloudflare:
             "Content-Type": "application/json",
         }
 
-        r = requests.get("https://api.cloudflare.com/client/v4/user", headers=self._headers, timeout=5)
+        r = self._request("GET", "/user")
 
         return r.json()
 
@@ -101,7 +149,7 @@ class Cloudflare:
             "Content-Type": "application/json",
         }
 
-        r = requests.get("https://api.cloudflare.com/client/v4/user/tokens/verify", headers=self._headers, timeout=5)
+        r = self._request("GET", "/user/tokens/verify")
 
         return r.json()
 
@@ -117,9 +165,11 @@ class Cloudflare:
         if not hasattr(self, "_headers"):
             raise Error("You must authenticate first, use cf.auth_key(email, key) or cf.auth_token(bearer_token)")
 
-        r = requests.get("https://api.cloudflare.com/client/v4/zones", headers=self._headers, timeout=5)
-
-        zones = self.error.handle(r.json(), ["result"])
+        if self.zone_index is not None:
+            zones = self.zone_index.zones
+        else:
+            r = self._request("GET", "/zones")
+            zones = self.error.handle(self._json(r, self.zone_fields), ["result"])
 
         if not zones:
             raise Error("No domain found")
@@ -130,6 +180,46 @@ class Cloudflare:
             "result": zones,
         }
 
+    def iter_zones(self, per_page: int = 50) -> Iterator[dict]:
+        """Iterate over all zones of the account, one request per page of zones
+
+        :exception Error: If not authenticated (use :func:`auth_key(email, key) <auth_key>` or :func:`auth_token(bearer_token) <auth_token>`)
+
+        >>> [x["name"] for x in cf.iter_zones()]
+        >>> ["example.com", "example.fr", ...]
+        """
+
+        if not hasattr(self, "_headers"):
+            raise Error("You must authenticate first, use cf.auth_key(email, key) or cf.auth_token(bearer_token)")
+
+        page = 1
+        while True:
+            r = self._request("GET", f"/zones?page={page}&per_page={per_page}")
+
+            data = self._json(r, self.zone_fields)
+            yield from self.error.handle(data, ["result"])
+
+            if page >= (data.get("result_info") or {}).get("total_pages", 1):
+                break
+            page += 1
+
+    def index_zones(self, refresh_interval: float = 5) -> ZoneIndex:
+        """Resolve all domains from an in-memory index of the zones instead of one request per domain
+
+        All zones are listed once (see :class:`ZoneIndex`), then :func:`get_domain`, :func:`get_domains`,
+        :func:`set_plan` and all rule methods use the index. Unknown domains list the zones again.
+
+        >>> cf.index_zones()
+        >>> for domain_name in ["example.com", "example.fr", ...]:
+        >>>     cf.set_plan(domain_name)
+        >>>     cf.import_rules(domain_name)
+        """
+
+        self.zone_index = ZoneIndex(self.iter_zones, refresh_interval)
+        self.zone_index.refresh()
+
+        return self.zone_index
+
     @property
     def domains(self) -> list[DomainObject]:
         """Get all domains as a list of :class:`DomainObject`
@@ -164,9 +254,12 @@ class Cloudflare:
         if not hasattr(self, "_headers"):
             raise Error("You must authenticate first, use cf.auth_key(email, key) or cf.auth_token(bearer_token)")
 
-        r = requests.get(f"https://api.cloudflare.com/client/v4/zones?name={domain_name}", headers=self._headers, timeout=5)
+        if self.zone_index is not None:
+            return DomainObject(self.zone_index.get(domain_name))
+
+        r = self._request("GET", f"/zones?name={domain_name}")
 
-        domain = self.error.handle(r.json(), ["result"])
+        domain = self.error.handle(self._json(r, self.zone_fields), ["result"])
 
         if not domain:
             raise Error(f"Domain '{domain_name}' not found")
@@ -184,21 +277,14 @@ class Cloudflare:
         .. note::
             Will define the current plan of the website in the instance of the class
 
+        With an index of zones (see :func:`index_zones`), the plan is read from it without any request
+
         >>> cf.set_plan("example.com")
         # Now the maximum available rules for this domain depends on the current plan
         """
 
         self.plan = self.get_domain(domain_name)["plan"]["legacy_id"]
-
-        match self.plan:
-            case "free":
-                self.max_rules = 5
-            case "pro":
-                self.max_rules = 20
-            case "business":
-                self.max_rules = 100
-            case "enterprise":
-                self.max_rules = 1000
+        self.max_rules = PLAN_MAX_RULES.get(self.plan, self.max_rules)
 
     def get_rulesets(self, domain_name: str) -> dict:
         """Get all rulesets from a specific domain
@@ -210,9 +296,9 @@ class Cloudflare:
         zone = self.get_domain(domain_name)
         zone_id = zone["id"]
 
-        r = requests.get(f"https://api.cloudflare.com/client/v4/zones/{zone_id}/rulesets", headers=self._headers, timeout=5)
+        r = self._request("GET", f"/zones/{zone_id}/rulesets")
 
-        rulesets = self.error.handle(r.json(), ["result"])
+        rulesets = self.error.handle(self._json(r, self.ruleset_fields), ["result"])
 
         return {
             "zone_id": zone_id,
@@ -234,69 +320,82 @@ class Cloudflare:
 
         return [RulesetObject(x) for x in self.get_rulesets(domain_name)["result"]]
 
+    def get_phase_ruleset(self, domain_name: str, phase: str = CUSTOM_PHASE) -> RulesetObject:
+        """Get the entrypoint ruleset of a phase from a specific domain as :class:`RulesetObject`, with its rules
+
+        The ruleset is fetched directly, without listing all rulesets of the domain.
+        If the phase has no entrypoint ruleset yet, its id is None and it will be created with the first rule.
+
+        * phase -> Please refer to https://developers.cloudflare.com/ruleset-engine/about/phases/ (see :data:`PHASE_ACTIONS` for the supported phases)
+
+        >>> cf.get_phase_ruleset("example.com", "http_request_transform")
+        >>> {"id": "a1b2c3", "phase": "http_request_transform", "rules": [...], "zone_id": "d4e5f6", ...}
+        """
+
+        if phase not in PHASE_ACTIONS:
+            raise Error(f"Unknown phase '{phase}' (available phases: {', '.join(PHASE_ACTIONS)})")
+
+        zone = self.get_domain(domain_name)
+        zone_id = zone["id"]
+
+        r = self._request("GET", f"/zones/{zone_id}/rulesets/phases/{phase}/entrypoint")
+
+        if r.status_code == 404:
+            ruleset = {"id": None, "phase": phase, "rules": []}
+        else:
+            ruleset = self.error.handle(self._json(r, self.ruleset_fields), ["result"])
+
+        ruleset["zone_id"] = zone_id
+
+        return RulesetObject(ruleset)
+
     def get_custom_ruleset(self, domain_name: str) -> RulesetObject:
         """Get the custom ruleset from a specific domain as :class:`RulesetObject`
 
-        It should be the only ruleset with the source "firewall_custom" as per Cloudflare's documentation.
+        It is the entrypoint ruleset of the "http_request_firewall_custom" phase (see :func:`get_phase_ruleset`).
         This is the ruleset where all custom rules are stored.
 
         :exception Error: If no custom ruleset is found
 
         >>> cf.get_custom_ruleset("example.com")
-        >>> {"id": "a1b2c3", "name": "default", "source": "firewall_custom", ...}
+        >>> {"id": "a1b2c3", "name": "default", "phase": "http_request_firewall_custom", ...}
         """
 
-        rulesets = self.get_rulesets(domain_name)
+        custom_ruleset = self.get_phase_ruleset(domain_name, CUSTOM_PHASE)
 
-        custom_ruleset = [x for x in rulesets["result"] if x.get("source") == "firewall_custom"]
-
-        if not custom_ruleset:
+        if not custom_ruleset["id"]:
             raise Error("No custom ruleset found")
 
-        custom_ruleset = custom_ruleset[0]
-
-        if "error" in custom_ruleset:
-            raise Error(custom_ruleset["error"])
+        return custom_ruleset
 
-        custom_ruleset["zone_id"] = rulesets["zone_id"]
+    def get_rules(self, domain_name: str, phase: str = CUSTOM_PHASE) -> dict:
+        """Get all rules from a specific domain, custom rules by default
 
-        return RulesetObject(custom_ruleset)
-
-    def get_rules(self, domain_name: str) -> dict:
-        """Get all rules from a specific domain
-
-        :exception Error: If no rules are found
+        * phase -> Phase of the rules, see :func:`get_phase_ruleset`
 
         >>> cf.get_rules("example.com")
         >>> {"count": 3, "rules": ["Bad Bots", "Bad IP", "Bad AS"], "result": [{"id": "a1b2c3", "description": "Bad Bots", ...}, ...]}
+        >>> cf.get_rules("example.com", "http_request_transform")
         """
 
-        ruleset = self.get_custom_ruleset(domain_name)
-        zone_id = ruleset["zone_id"]
-        custom_ruleset_id = ruleset["id"]
-
-        r = requests.get(f"https://api.cloudflare.com/client/v4/zones/{zone_id}/rulesets/{custom_ruleset_id}", headers=self._headers, timeout=5)
-
-        rules = self.error.handle(r.json(), ["result", "rules"])
-
-        if not rules:
-            raise Error("No rules found")
+        ruleset = self.get_phase_ruleset(domain_name, phase)
 
-        # No rules found (handle silently fails), return empty list
-        if isinstance(rules, dict):
-            rules = []
+        # Rulesets without rules have no rules key
+        rules = ruleset.get("rules") or []
 
-        self.active_rules = len(rules)
+        if phase == CUSTOM_PHASE:
+            self.active_rules = len(rules)
 
         return {
-            "zone_id": zone_id,
-            "custom_ruleset_id": custom_ruleset_id,
+            "zone_id": ruleset["zone_id"],
+            "custom_ruleset_id": ruleset["id"],
+            "phase": phase,
             "count": len(rules),
             "rules": [x["description"] for x in rules],
             "result": rules,
         }
 
-    def rules(self, domain_name: str) -> list[RuleObject]:
+    def rules(self, domain_name: str, phase: str = CUSTOM_PHASE) -> list[RuleObject]:
         """Get all rules as a list of :class:`RuleObject`
 
         Access any value of the object with the dot operator
@@ -307,9 +406,9 @@ class Cloudflare:
         >>> [{"id": "a1b2c3", "description": "Bad Bots", ...}, {"id": "d4e5f6", "description": "Bad IP", ...}, ...]
         """
 
-        return [RuleObject(x) for x in self.get_rules(domain_name)["result"]]
+        return [RuleObject(x) for x in self.get_rules(domain_name, phase)["result"]]
 
-    def get_rule(self, domain_name: str, *, rule_name: str | None = None, rule_id: str | None = None) -> RuleObject:
+    def get_rule(self, domain_name: str, *, rule_name: str | None = None, rule_id: str | None = None, phase: str = CUSTOM_PHASE) -> RuleObject:
         """Get a specific rule by name or ID from a specific domain as :class:`RuleObject`
 
         :exception Error: Rule name or rule ID is not provided
@@ -320,10 +419,10 @@ class Cloudflare:
         """
 
         if rule_id:
-            rules = self.get_rules(domain_name)
+            rules = self.get_rules(domain_name, phase)
             rule = [x for x in rules["result"] if x["id"] == rule_id]
         elif rule_name:
-            rules = self.get_rules(domain_name)
+            rules = self.get_rules(domain_name, phase)
             rule = [x for x in rules["result"] if x["description"] == rule_name]
         else:
             raise Error("You must provide a rule_name or rule_id")
@@ -341,26 +440,30 @@ class Cloudflare:
 
         return RuleObject(rule)
 
-    def export_rules(self, domain_name: str) -> True:
+    def export_rules(self, domain_name: str, phase: str = CUSTOM_PHASE) -> True:
         """Export all expressions from a specific domain
 
+        * phase -> Phase of the rules, see :func:`get_phase_ruleset`. Rules of other phases also keep their action parameters and rate limit in the header
+
         .. note::
             Will save all expressions into multiple files in the folder specified in Cloudflare's constructor
+            Files already holding the same expression (see :func:`Expression.stable_hash`) and header are left untouched
 
         >>> cf.export_rules("example.com")
         # "Bad Bots.txt", "Bad IP.txt", "Bad AS.txt" files created in "my_expressions" folder
+        >>> cf.export_rules("example.com", "http_request_transform")
         """
 
-        rules = self.get_rules(domain_name)
+        rules = self.get_rules(domain_name, phase)
 
         for rule in rules["result"]:
             print(f"Exporting {rule['description']}...")
 
-            header = {
-                "id": rule["id"],
-                "action": rule["action"],
-                "enabled": rule["enabled"],
-            }
+            header = self._rule_header(rule, phase)
+
+            if self._is_exported(rule["description"], rule["expression"], header):
+                print(f"{rule['description']} is already up to date")
+                continue
 
             rule_expression = self.utils.beautify(rule["expression"])
 
@@ -368,7 +471,7 @@ class Cloudflare:
 
         return True
 
-    def export_rule(self, domain_name: str, *, rule_name: str | None = None, rule_id: str | None = None) -> True:
+    def export_rule(self, domain_name: str, *, rule_name: str | None = None, rule_id: str | None = None, phase: str = CUSTOM_PHASE) -> True:
         """Export the expression of a rule in a txt file
 
         :exception Error: Rule name or rule ID is not provided
@@ -381,25 +484,24 @@ class Cloudflare:
         """
 
         if rule_id:
-            rule = self.get_rule(domain_name, rule_id=rule_id)
+            rule = self.get_rule(domain_name, rule_id=rule_id, phase=phase)
         elif rule_name:
-            rule = self.get_rule(domain_name, rule_name=rule_name)
+            rule = self.get_rule(domain_name, rule_name=rule_name, phase=phase)
         else:
             raise Error("You must provide a rule_name or rule_id")
 
-        header = {
-            "id": rule["id"],
-            "action": rule["action"],
-            "enabled": rule["enabled"],
-        }
+        header = self._rule_header(rule, phase)
+
+        if self._is_exported(rule["description"], rule["expression"], header):
+            return True
 
         rule_expression = self.utils.beautify(rule["expression"])
 
-        self.utils.write_expression(rule_name, rule_expression, header=header)
+        self.utils.write_expression(rule["description"], rule_expression, header=header)
 
         return True
 
-    def create_rule(self, domain_name: str, rule_file: str, rule_name: str | None = None, action: str | None = None, position: int | None = None) -> bool:
+    def create_rule(self, domain_name: str, rule_file: str, rule_name: str | None = None, action: str | None = None, position: int | None = None, phase: str = CUSTOM_PHASE) -> bool:
         """Create a rule with a specific expression
 
         * action -> Please refer to https://developers.cloudflare.com/ruleset-engine/rules-language/actions/
@@ -410,6 +512,7 @@ class Cloudflare:
         Action is read from the header of the file by default, but you can specify it manually. Else it will be "managed_challenge"
 
         * position -> Rule position, with 1 being the first rule in the list
+        * phase -> Phase of the rule, see :func:`get_phase_ruleset`. The default action is the first one of the phase in :data:`PHASE_ACTIONS`, action parameters and rate limit are read from the header
 
         :exception Error: Rule file is not found
         :exception Error: Rule already exists in remote WAF
@@ -422,9 +525,9 @@ class Cloudflare:
         """
 
         if not rule_name:
-            rule_name = rule_file.strip(".txt")
+            rule_name = rule_file.removesuffix(".txt")
 
-        rules = self.get_rules(domain_name)
+        rules = self.get_rules(domain_name, phase)
         zone_id = rules["zone_id"]
         custom_ruleset_id = rules["custom_ruleset_id"]
 
@@ -444,17 +547,22 @@ class Cloudflare:
         if position:
             new_rule["position"] = {"index": position}
 
+        default_action = PHASE_ACTIONS[phase][0]
+
         if header:
             if action or "action" in header:
                 new_rule["action"] = action or header["action"]
             else:
-                new_rule["action"] = "managed_challenge"
+                new_rule["action"] = default_action
             if "enabled" in header:
                 new_rule["enabled"] = header["enabled"]
+            for key in JSON_HEADER_KEYS:
+                if key in header:
+                    new_rule[key] = header[key]
         else:
-            new_rule["action"] = action or "managed_challenge"
+            new_rule["action"] = action or default_action
 
-        if new_rule["action"] == "skip":
+        if new_rule["action"] == "skip" and "action_parameters" not in new_rule:
             new_rule["action_parameters"] = {
                 "phases": [
                     "http_request_firewall_managed",
@@ -465,15 +573,20 @@ class Cloudflare:
                 "ruleset": "current",
             }
 
-        if self.active_rules < self.max_rules:
-            r = requests.post(f"https://api.cloudflare.com/client/v4/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules", headers=self._headers, json=new_rule, timeout=5)
-        else:
+        if phase == CUSTOM_PHASE and self.active_rules >= self.max_rules:
             raise Error(f"Cannot create more rules ({self.active_rules} used / {self.max_rules} available)\n"
                         "\t\t\tIf you have a better plan, please register the domain plan using cf.set_plan(\"<your-domain>\")")
 
+        if not custom_ruleset_id:
+            # The entrypoint ruleset of the phase is created with its first rule
+            new_rule.pop("position", None)
+            r = self._request("PUT", f"/zones/{zone_id}/rulesets/phases/{phase}/entrypoint", body={"rules": [new_rule]})
+        else:
+            r = self._request("POST", f"/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules", body=new_rule)
+
         return self.error.handle(r.json(), ["success"])
 
-    def update_rule(self, domain_name: str, rule_file: str, rule_name: str | None = None, action: str | None = None, position: int | None = None) -> bool:
+    def update_rule(self, domain_name: str, rule_file: str, rule_name: str | None = None, action: str | None = None, position: int | None = None, phase: str = CUSTOM_PHASE) -> bool:
         """Update a rule with a specific expression
 
         :exception Error: Rule file is not found
@@ -482,6 +595,11 @@ class Cloudflare:
             First modify "Bad Bots.txt" by changing the expression or adding a new rule
 
         * position -> Rule position, starting from 1
+        * phase -> Phase of the rule, see :func:`get_phase_ruleset`
+
+        .. note::
+            No request is made if the expression is the same as the remote one once normalized (see :func:`Expression.canonicalize`)
+            and the action, enabled state, action parameters and rate limit did not change
 
         >>> cf.update_rule("example.com", "Bad Bots.txt")
         # Will update the remote rule "Bad Bots" with the expression in "Bad Bots.txt"
@@ -490,9 +608,9 @@ class Cloudflare:
         """
 
         if not rule_name:
-            rule_name = rule_file.strip(".txt")
+            rule_name = rule_file.removesuffix(".txt")
 
-        rule = self.get_rule(domain_name, rule_name=rule_name)
+        rule = self.get_rule(domain_name, rule_name=rule_name, phase=phase)
         zone_id = rule["zone_id"]
         custom_ruleset_id = rule["custom_ruleset_id"]
         rule_id = rule["id"]
@@ -512,99 +630,120 @@ class Cloudflare:
                 updated_rule["action"] = action or header["action"]
             if "enabled" in header:
                 updated_rule["enabled"] = header["enabled"]
+            for key in JSON_HEADER_KEYS:
+                if key in header:
+                    updated_rule[key] = header[key]
+
+        if updated_rule["action"] != rule["action"] and "action_parameters" not in (header or {}):
+            # Parameters of the previous action are not kept
+            updated_rule.pop("action_parameters", None)
+        if updated_rule["action"] == "skip" and "action_parameters" not in updated_rule:
+            updated_rule["action_parameters"] = self._build_rule(rule_name, expression, "skip")["action_parameters"]
 
         if position:
             updated_rule["position"] = {"index": position}
-
-        if updated_rule["action"] == "skip":
-            updated_rule["action_parameters"] = {
-                "phases": [
-                    "http_request_firewall_managed",
-                    "http_request_sbfm",
-                    "http_ratelimit",
-                ],
-                "products": [],
-                "ruleset": "current",
-            }
+        elif (
+            Expression.stable_hash(expression) == Expression.stable_hash(rule["expression"])
+            and updated_rule["action"] == rule["action"]
+            and updated_rule.get("enabled") == rule.get("enabled")
+            and all(updated_rule.get(key) == rule.get(key) for key in JSON_HEADER_KEYS)
+        ):
+            # Nothing changed, Cloudflare would reject the update anyway
+            print(f"Rule '{rule_name}' is already up to date")
+            return True
 
         updated_rule["expression"] = expression
 
-        r = requests.patch(f"https://api.cloudflare.com/client/v4/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules/{rule_id}", headers=self._headers, json=updated_rule, timeout=5)
+        r = self._request("PATCH", f"/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules/{rule_id}", body=updated_rule)
 
         return self.error.handle(r.json(), ["success"])
 
-    def delete_rule(self, domain_name: str, rule_name: str) -> bool:
+    def delete_rule(self, domain_name: str, rule_name: str, phase: str = CUSTOM_PHASE) -> bool:
         """Delete a rule from a specific domain
 
         >>> cf.delete_rule("example.com", "Bad AS")
         # Will delete the rule "Bad AS" remotely from the domain "example.com"
         """
 
-        rule = self.get_rule(domain_name, rule_name=rule_name)
+        rule = self.get_rule(domain_name, rule_name=rule_name, phase=phase)
         zone_id = rule["zone_id"]
         custom_ruleset_id = rule["custom_ruleset_id"]
         rule_id = rule["id"]
 
-        r = requests.delete(f"https://api.cloudflare.com/client/v4/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules/{rule_id}", headers=self._headers, timeout=5)
+        r = self._request("DELETE", f"/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules/{rule_id}")
 
         return self.error.handle(r.json(), ["success"])
 
-    def purge_rules(self, domain_name: str) -> bool:
+    def purge_rules(self, domain_name: str, phase: str = CUSTOM_PHASE) -> bool:
         """Purge all rules from a specific domain
 
+        All rules are deleted at once by emptying the ruleset of the phase
+
         >>> cf.purge_rules("example.com")
         # Will delete all rules remotely from the domain "example.com"
+        >>> cf.purge_rules("example.com", "http_ratelimit")
         """
 
-        rules = self.get_rules(domain_name)["rules"]
+        rules = self.get_rules(domain_name, phase)
 
-        for rule in rules:
-            self.delete_rule(domain_name, rule)
+        if rules["count"]:
+            r = self._request("PUT", f"/zones/{rules['zone_id']}/rulesets/{rules['custom_ruleset_id']}", body={"rules": []})
+            self.error.handle(r.json(), ["success"])
 
-        self.active_rules = 0
+        if phase == CUSTOM_PHASE:
+            self.active_rules = 0
 
         return True
 
-    def import_rules(self, domain_name: str, actions_all: str | None = None) -> bool:
+    def import_rules(self, domain_name: str, actions_all: str | None = None, phase: str = CUSTOM_PHASE) -> bool:
         """Import all expressions from all txt file
 
         * actions_all -> Set the same action for all imported rules, \
         please refer to https://developers.cloudflare.com/ruleset-engine/rules-language/actions/
+        * phase -> Phase of the rules, see :func:`get_phase_ruleset`
 
         Available actions as string:
         `managed_challenge, js_challenge, challenge, block, skip, log`
 
         :exception Error: Cannot create more rules (5 used / 5 available depending on the current plan)
+        :exception Error: If a file is not valid, listing the errors of all files
 
         .. note::
             If you have a better plan, please register your plan using the method :func:`set_plan(domain_name) <set_plan>`
 
+        .. note::
+            Files with the same name as an existing remote rule are skipped, use :func:`update_rule` to change them
+
+        .. note::
+            All files are validated first (see :func:`validate_rules`), nothing is created if any of them is not valid
+
         >>> cf.import_rules("example.com")
         # Will use the action in the header specific for every file
         >>> cf.import_rules("example.com", "block")
         # Will import all rules and use the "block" action
         """
 
-        files = os.listdir(self.utils.directory)
+        preflight = Preflight(self.utils.directory, cache=self._checked)
 
-        rules = self.get_rules(domain_name)["rules"]
+        # Local errors are reported before the first request
+        preflight.check(action=actions_all, phase=phase)
 
-        self.active_rules = len(rules)
+        remote_rules = self.get_rules(domain_name, phase)
+        max_rules = self.max_rules if phase == CUSTOM_PHASE else None
+        report = preflight.check(remote_rules["result"], max_rules, actions_all, phase=phase)
 
-        for file in files:
-            if file.endswith(".txt"):
-                print(f"Importing {file}...")
+        for file in preflight.files:
+            print(f"Importing {file}...")
 
-                if file.strip(".txt") not in rules:
-                    if self.active_rules < self.max_rules:
-                        if actions_all:
-                            self.import_rule(domain_name, file, action=actions_all)
-                        else:
-                            self.import_rule(domain_name, file)
-                        self.active_rules += 1
-                    else:
-                        raise Error(f"Cannot create more rules ({self.active_rules} used / {self.max_rules} available)\n"
-                                    "\t\t\tIf you have a better plan, please register the domain plan using cf.set_plan(\"<your-domain>\")")
+            if file in report["skip"]:
+                continue
+
+            if actions_all:
+                self.import_rule(domain_name, file, action=actions_all, phase=phase)
+            else:
+                self.import_rule(domain_name, file, phase=phase)
+            if phase == CUSTOM_PHASE:
+                self.active_rules += 1
 
         return True
 
@@ -616,3 +755,732 @@ class Cloudflare:
     >>> cf.import_rule("example.com", "Bad URL.txt", action="managed_challenge")
     # Import a rule with the expression in "Bad URL.txt", will use the action in the header if specified or force it using the action argument
     """
+
+    def validate_rules(self, domain_name: str | None = None, actions_all: str | None = None, phase: str = CUSTOM_PHASE) -> dict:
+        """Validate all expression files locally and report all errors at once: invalid headers and expressions,
+        name collisions and rules over the plan limit
+
+        Without domain, no request is made and the files are only checked on their own
+
+        >>> cf.validate_rules("example.com")
+        >>> {"files": 4, "create": ["Bad AS.txt"], "skip": {"Bad IP.txt": "Bad IP", ...}, "errors": [{"file": "Bad Bots.txt", "error": "Invalid action 'blocks' ..."}]}
+        """
+
+        preflight = Preflight(self.utils.directory, cache=self._checked)
+
+        if not domain_name:
+            return preflight.run(action=actions_all, phase=phase)
+
+        max_rules = self.max_rules if phase == CUSTOM_PHASE else None
+
+        return preflight.run(self.get_rules(domain_name, phase)["result"], max_rules, actions_all, phase=phase)
+
+    def dry_run(self, method: str, *args, domain_names: list[str] | None = None, concurrency: int = 1, latency: float = 0.25, set_plans: bool = False, **kwargs) -> dict:
+        """Run a method on several domains without sending any change, and report the requests it would send
+
+        Reads are sent through the transport of the instance (use a :class:`MemoryTransport` or
+        :class:`CachedCloudflare` to avoid them), changes are only recorded (see :class:`DryRunTransport`).
+        Errors, like rules over the plan limit, are reported by domain without stopping the other ones.
+        Local files are still written by export methods.
+
+        * args -> Arguments of the method, after the domain
+        * domain_names -> Domains passed as first argument of the method, else the method is called once with the other arguments
+        * concurrency -> Domains processed in parallel by the real run, see :func:`DryRunTransport.report`
+        * latency -> Average duration of a request in seconds
+        * set_plans -> Call :func:`set_plan` before the method for each domain (as the cf-rules command does),
+        else the plan of the instance is used like in a real run of the method
+
+        >>> cf.dry_run("import_rules", "block", domain_names=["example.com", "example.fr"], concurrency=2, set_plans=True)
+        >>> {"calls": 14, "reads": 8, "writes": 6, "endpoints": {...}, "duration": 3.5, "rate_windows": 1, "errors": [{"domain": "example.fr", "error": "..."}]}
+        """
+
+        if method.startswith("_") or method == "dry_run" or not callable(getattr(self, method, None)):
+            raise Error(f"Unknown method '{method}'")
+
+        transport = DryRunTransport(self.transport)
+
+        # Plans and active rules of the run are not kept by the instance
+        dry = copy.copy(self)
+        dry.transport = transport
+
+        # Zones listed again during the run are recorded, the index of the instance is left unchanged
+        if self.zone_index is not None:
+            dry.zone_index = copy.copy(self.zone_index)
+            dry.zone_index.list_zones = dry.iter_zones
+
+        errors = []
+        for domain_name in domain_names or [None]:
+            try:
+                if domain_name is None:
+                    getattr(dry, method)(*args, **kwargs)
+                else:
+                    if set_plans:
+                        dry.set_plan(domain_name)
+                    getattr(dry, method)(domain_name, *args, **kwargs)
+            except Error as e:
+                errors.append({"domain": domain_name, "error": str(e)})
+
+        report = transport.report(concurrency, latency)
+        report["errors"] = errors
+
+        print(f"{report['calls']} requests ({report['reads']} reads, {report['writes']} changes), "
+              f"about {report['duration']}s with {concurrency} domain(s) in parallel")
+        if report["rate_windows"] > 1:
+            print(f"Over the rate limit, the requests need {report['rate_windows']} windows of 5 minutes")
+        for error in errors:
+            print(f"{error['domain']}: {error['error']}" if error["domain"] else error["error"])
+
+        return report
+
+    @staticmethod
+    def _rule_header(rule: dict, phase: str) -> dict:
+        """Build the header of an exported rule, other phases than custom rules also keep their JSON items"""
+
+        header = {
+            "id": rule["id"],
+            "action": rule["action"],
+            "enabled": rule["enabled"],
+        }
+
+        if phase != CUSTOM_PHASE:
+            header.update({key: rule[key] for key in JSON_HEADER_KEYS if key in rule})
+
+        return header
+
+    def _is_exported(self, rule_file: str, expression: str, header: dict) -> bool:
+        """Check if a local rule file already holds the same expression and header as a remote rule"""
+
+        try:
+            local_header, local_expression = self.utils.read_expression(rule_file)
+        except Error:
+            return False
+
+        return local_header == header and Expression.stable_hash(local_expression) == Expression.stable_hash(expression)
+
+    @staticmethod
+    def _build_rule(rule_name: str, expression: str, action: str, enabled: bool | None = None) -> dict:
+        """Build the body of a rule for the API, adding the parameters needed by the skip action"""
+
+        rule = {
+            "description": rule_name,
+            "expression": expression,
+            "action": action,
+        }
+
+        if enabled is not None:
+            rule["enabled"] = enabled
+
+        if action == "skip":
+            rule["action_parameters"] = {
+                "phases": [
+                    "http_request_firewall_managed",
+                    "http_request_sbfm",
+                    "http_ratelimit",
+                ],
+                "products": [],
+                "ruleset": "current",
+            }
+
+        return rule
+
+    def export_pack(self, domain_name: str, filename: str, phase: str = CUSTOM_PHASE) -> RulePack:
+        """Export all rules of a specific domain into a single :class:`RulePack` file
+
+        >>> cf.export_pack("example.com", "rules.pack.json")
+        """
+
+        pack = RulePack.from_rules(self.get_rules(domain_name, phase)["result"], phase)
+        pack.save(filename)
+
+        return pack
+
+    @staticmethod
+    def _place_rules(rules: list[dict], positioned: list[tuple[int, dict]]) -> list[dict]:
+        """Order rules with some of them at a position (starting from 1), the others keep their order around them"""
+
+        by_position = dict(positioned)
+        placed = {id(x) for x in by_position.values()}
+        others = [x for x in rules if id(x) not in placed]
+
+        ordered = []
+        for position in range(1, len(rules) + 1):
+            if position in by_position:
+                ordered.append(by_position.pop(position))
+            elif others:
+                ordered.append(others.pop(0))
+
+        # Positions after the last rule
+        return ordered + [by_position[x] for x in sorted(by_position)] + others
+
+    def _push_pack(self, domain_name: str, pack: RulePack, actions_all: str | None, update: bool) -> dict:
+        """Create the missing rules of a pack (and update the differing ones) in a single ruleset update"""
+
+        problems = pack.check()
+        if actions_all and actions_all not in PHASE_ACTIONS.get(pack.phase, ()):
+            problems.append(f"Invalid action '{actions_all}' for phase {pack.phase}")
+        if problems:
+            raise Error(f"{len(problems)} error(s) found in pack:\n\t" + "\n\t".join(problems))
+
+        rules = self.get_rules(domain_name, pack.phase)
+        remote_rules = [
+            {key: value for key, value in x.items() if key not in ("version", "last_updated")}
+            for x in rules["result"]
+        ]
+        remote_names = {x["description"]: i for i, x in enumerate(remote_rules)}
+
+        report = {"created": [], "updated": [], "moved": [], "skipped": []}
+        new_rules = []
+        # Rules placed at their position in the pack, existing rules are only moved by a sync
+        positioned = []
+
+        for rule in pack:
+            action = actions_all or rule["action"] or PHASE_ACTIONS[pack.phase][0]
+            body = self._build_rule(rule["name"], rule["expression"], action, rule["enabled"])
+            body.update({key: rule[key] for key in JSON_HEADER_KEYS if key in rule})
+
+            if rule["name"] in remote_names:
+                index = remote_names[rule["name"]]
+                remote_rule = remote_rules[index]
+                same = (
+                    Expression.stable_hash(remote_rule["expression"]) == rule["hash"]
+                    and remote_rule["action"] == body["action"]
+                    and remote_rule.get("enabled", True) == body["enabled"]
+                    and all(remote_rule.get(key) == body.get(key) for key in JSON_HEADER_KEYS if key in rule)
+                )
+                if not update:
+                    report["skipped"].append(rule["name"])
+                    continue
+                if same:
+                    report["skipped"].append(rule["name"])
+                else:
+                    # Parameters of the previous action are not kept
+                    remote_rules[index] = {**body, **{key: remote_rule[key] for key in ("id", "ref") if key in remote_rule}}
+                    report["updated"].append(rule["name"])
+                if rule["position"]:
+                    positioned.append((rule["position"], remote_rules[index]))
+            else:
+                new_rules.append(body)
+                report["created"].append(rule["name"])
+                if rule["position"]:
+                    positioned.append((rule["position"], body))
+
+        if pack.phase == CUSTOM_PHASE and len(remote_rules) + len(new_rules) > self.max_rules:
+            raise Error(f"Cannot create {len(new_rules)} rules ({len(remote_rules)} used / {self.max_rules} available)\n"
+                        "\t\t\tIf you have a better plan, please register the domain plan using cf.set_plan(\"<your-domain>\")")
+
+        ordered = self._place_rules(remote_rules + new_rules, positioned)
+
+        before = [x["description"] for x in remote_rules]
+        after = [x["description"] for x in ordered if x["description"] in remote_names]
+        for position, rule in positioned:
+            name = rule["description"]
+            if name in report["skipped"] and before.index(name) != after.index(name):
+                report["moved"].append(name)
+        report["skipped"] = [x for x in report["skipped"] if x not in report["moved"]]
+
+        if not report["created"] and not report["updated"] and not report["moved"]:
+            return report
+
+        zone_id = rules["zone_id"]
+        # The entrypoint ruleset is created with its first rules if the phase has none
+        if rules["custom_ruleset_id"]:
+            path = f"/zones/{zone_id}/rulesets/{rules['custom_ruleset_id']}"
+        else:
+            path = f"/zones/{zone_id}/rulesets/phases/{pack.phase}/entrypoint"
+
+        r = self._request("PUT", path, body={"rules": ordered})
+
+        self.error.handle(r.json(), ["success"])
+
+        if pack.phase == CUSTOM_PHASE:
+            self.active_rules = len(ordered)
+
+        return report
+
+    def import_pack(self, domain_name: str, filename: str, actions_all: str | None = None) -> dict:
+        """Import the rules of a :class:`RulePack` file into a specific domain, in a single ruleset update
+
+        Rules with the same name as a remote rule are skipped, new rules are placed at their position in the pack
+        (after the remote ones if they have none)
+
+        :exception Error: If the pack is not valid or the rules do not fit in the plan
+
+        >>> cf.import_pack("example.com", "rules.pack.json")
+        >>> {"created": ["Bad AS"], "updated": [], "moved": [], "skipped": ["Bad Bots", "Bad IP"]}
+        """
+
+        return self._push_pack(domain_name, RulePack.load(filename), actions_all, update=False)
+
+    def sync_pack(self, domain_names: list[str], filename: str, actions_all: str | None = None) -> dict:
+        """Make the rules of several domains match a :class:`RulePack` file, one ruleset update per changed domain
+
+        Rules of the pack are created, updated (expression, action, enabled state) or moved to their position in the pack,
+        other remote rules are kept in order around them
+
+        :exception Error: If the pack is not valid
+
+        >>> cf.sync_pack(["example.com", "example.fr"], "rules.pack.json")
+        >>> {"example.com": {"created": [], "updated": ["Bad Bots"], "moved": [], "skipped": ["Bad IP"]}, ...}
+        """
+
+        pack = RulePack.load(filename)
+
+        report = {}
+        for domain_name in domain_names:
+            print(f"Syncing {domain_name}...")
+
+            if self.zone_index is not None:
+                self.set_plan(domain_name)
+
+            report[domain_name] = self._push_pack(domain_name, pack, actions_all, update=True)
+
+        return report
+
+    def export_zones(self, domain_names: list[str] | None = None, directory: str | None = None) -> RuleStore:
+        """Export the rules of several domains into a content-addressed :class:`RuleStore`
+
+        Every distinct expression is saved once, and each domain gets a manifest of its rules.
+        All domains are exported if no domain names are provided.
+
+        >>> cf.export_zones(["example.com", "example.fr"], "my_store")
+        # "objects" and "zones" folders created in "my_store" folder
+        """
+
+        store = RuleStore(directory)
+        domain_names = domain_names or self.get_domains()["domains"]
+
+        for domain_name in domain_names:
+            print(f"Exporting {domain_name}...")
+
+            rules = self.get_rules(domain_name)
+
+            manifest = {}
+            for rule in rules["result"]:
+                manifest[rule["description"]] = {
+                    "id": rule["id"],
+                    "hash": store.put(rule["expression"]),
+                    "action": rule["action"],
+                    "enabled": rule["enabled"],
+                }
+                manifest[rule["description"]].update({key: rule[key] for key in JSON_HEADER_KEYS if key in rule})
+
+            store.write_manifest(domain_name, manifest, zone_id=rules["zone_id"])
+
+        return store
+
+    def sync_zones(self, domain_names: list[str] | None = None, directory: str | None = None, source: str | None = None) -> dict:
+        """Import the rules of a :class:`RuleStore` into several domains
+
+        * source -> Domain whose manifest is pushed to every domain, else each domain is restored from its own manifest
+
+        Rules already having the same expression hash, action, enabled state and JSON items remotely are skipped.
+
+        :exception Error: Cannot create more rules (5 used / 5 available depending on the current plan)
+
+        >>> cf.sync_zones(["example.fr", "example.net"], "my_store", source="example.com")
+        >>> {"example.fr": {"created": ["Bad AS"], "updated": ["Bad Bots"], "skipped": ["Bad IP"]}, ...}
+        """
+
+        store = RuleStore(directory)
+        domain_names = domain_names or store.zones
+
+        report = {}
+
+        for domain_name in domain_names:
+            print(f"Syncing {domain_name}...")
+
+            # The plan of every domain is known without any request once the zones are indexed
+            if self.zone_index is not None:
+                self.set_plan(domain_name)
+
+            manifest = store.read_manifest(source or domain_name)["rules"]
+
+            rules = self.get_rules(domain_name)
+            zone_id = rules["zone_id"]
+            custom_ruleset_id = rules["custom_ruleset_id"]
+            remote_rules = {x["description"]: x for x in rules["result"]}
+
+            report[domain_name] = {"created": [], "updated": [], "skipped": []}
+
+            for rule_name, local_rule in manifest.items():
+                remote_rule = remote_rules.get(rule_name)
+
+                if remote_rule and store.signature({**remote_rule, "hash": store.hash(remote_rule["expression"])}) == store.signature(local_rule):
+                    report[domain_name]["skipped"].append(rule_name)
+                    continue
+
+                new_rule = self._build_rule(rule_name, store.get(local_rule["hash"]), local_rule["action"], local_rule["enabled"])
+                new_rule.update({key: local_rule[key] for key in JSON_HEADER_KEYS if key in local_rule})
+
+                if remote_rule:
+                    r = self._request("PATCH", f"/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules/{remote_rule['id']}", body=new_rule)
+                    self.error.handle(r.json(), ["success"])
+                    report[domain_name]["updated"].append(rule_name)
+                elif self.active_rules < self.max_rules:
+                    if custom_ruleset_id:
+                        r = self._request("POST", f"/zones/{zone_id}/rulesets/{custom_ruleset_id}/rules", body=new_rule)
+                        self.error.handle(r.json(), ["success"])
+                    else:
+                        # The entrypoint ruleset is created with the first rule, the next ones are added to it
+                        r = self._request("PUT", f"/zones/{zone_id}/rulesets/phases/{CUSTOM_PHASE}/entrypoint", body={"rules": [new_rule]})
+                        custom_ruleset_id = self.error.handle(r.json(), ["result", "id"])
+                    self.active_rules += 1
+                    report[domain_name]["created"].append(rule_name)
+                else:
+                    raise Error(f"Cannot create more rules ({self.active_rules} used / {self.max_rules} available)\n"
+                                "\t\t\tIf you have a better plan, please register the domain plan using cf.set_plan(\"<your-domain>\")")
+
+        return report
+
+    def drift_report(self, domain_names: list[str] | None = None, directory: str | None = None, refresh: bool = True) -> dict:
+        """Get a zones × rules matrix telling if each rule is identical, differing or missing across domains
+
+        * refresh -> Export the domains into the store first, else only the existing manifests are compared (no request)
+
+        >>> cf.drift_report(["example.com", "example.fr"])
+        >>> {"zones": [...], "rules": [...], "reference": {...}, "matrix": {"example.com": {"Bad Bots": "identical", ...}, "example.fr": {"Bad Bots": "differing", ...}}}
+        """
+
+        store = self.export_zones(domain_names, directory) if refresh else RuleStore(directory)
+
+        return store.drift(domain_names)
+
+    def snapshot_zones(self, domain_names: list[str] | None = None, directory: str | None = None, compression: str = "gz") -> dict:
+        """Back up the entrypoint rulesets of all phases of several domains into a new incremental snapshot
+
+        Only the rulesets whose version changed since the last snapshot are fetched and archived,
+        the others are referenced from the previous archives (see :class:`Snapshots`).
+        All domains are backed up if no domain names are provided.
+
+        * compression -> "gz" (default) or "zstd"
+
+        >>> cf.snapshot_zones(directory="my_backups")
+        >>> {"name": "20250101T000000000000Z", "archive": "snapshot-20250101T000000000000Z.tar.gz", "stats": {"zones": 2, "rulesets": 5, "written": 1, "reused": 4}, ...}
+        """
+
+        snapshots = Snapshots(directory, compression)
+
+        zones = self.get_domains()["result"]
+        if domain_names:
+            zones = [x for x in zones if x["name"] in domain_names]
+
+        with snapshots.create() as snapshot:
+            for zone in zones:
+                print(f"Backing up {zone['name']}...")
+
+                r = self._request("GET", f"/zones/{zone['id']}/rulesets")
+
+                # Entrypoint rulesets of phases, managed rulesets are only referenced by them
+                for summary in self.error.handle(r.json(), ["result"]):
+                    if summary.get("kind") != "zone" or snapshot.reuse(zone["name"], zone["id"], summary):
+                        continue
+
+                    r = self._request("GET", f"/zones/{zone['id']}/rulesets/{summary['id']}")
+
+                    snapshot.add(zone["name"], zone["id"], self.error.handle(r.json(), ["result"]))
+
+        return snapshot.index
+
+    def restore_snapshot(self, domain_name: str, directory: str | None = None, name: str | None = None, phases: list[str] | None = None) -> dict:
+        """Restore the rulesets of a domain from a snapshot, the last one by default
+
+        Each ruleset is restored in a single request, replacing all rules of its phase
+
+        * name -> Name of the snapshot, see :attr:`Snapshots.snapshots`
+        * phases -> Only restore these phases
+
+        :exception Error: If the domain is not in the snapshot
+
+        >>> cf.restore_snapshot("example.com", "my_backups", "20250101T000000000000Z")
+        >>> {"http_request_firewall_custom": 5, "http_request_transform": 2}
+        """
+
+        rulesets = Snapshots(directory).read(domain_name, name)
+
+        # The zone may have been created again with another id
+        zone_id = self.get_domain(domain_name)["id"]
+
+        report = {}
+        for phase, ruleset in rulesets.items():
+            if phases and phase not in phases:
+                continue
+
+            print(f"Restoring {phase}...")
+
+            rules = [
+                {key: value for key, value in x.items() if key not in ("version", "last_updated")}
+                for x in ruleset.get("rules") or []
+            ]
+
+            r = self._request("PUT", f"/zones/{zone_id}/rulesets/phases/{phase}/entrypoint", body={"rules": rules})
+
+            self.error.handle(r.json(), ["success"])
+            report[phase] = len(rules)
+
+        return report
+
+    def analyze_rules(self, domain_name: str) -> dict:
+        """Find shadowed, duplicated and mergeable clauses in the rules of a specific domain
+
+        See :func:`Analyzer.report`, the freed slots are compared to the maximum rules of the current plan (see :func:`set_plan`)
+
+        >>> cf.analyze_rules("example.com")
+        >>> {"rules": 5, "max_rules": 5, "shadowed": [{"rule": "Bad Bots", "clause": '(http.user_agent contains "semrushbot")', "by_rule": "Bad Bots", ...}, ...], "slots_freed": 1, "bytes_freed": 250, ...}
+        """
+
+        rules = self.get_rules(domain_name)["result"]
+
+        return Analyzer(rules).report(max_rules=self.max_rules)
+
+    def optimize_rules(self, domain_name: str, stats: str | dict, pinned: list[tuple[str, str]] | None = None, apply: bool = False) -> dict:
+        """Propose an order of the rules of a specific domain to evaluate less rules per request
+
+        * stats -> JSON file or dictionary of hit rates, like a :func:`Replay.run` report (see :func:`Optimizer.load_stats`)
+        * pinned -> Pairs of rule names, the first one must stay before the second one
+        * apply -> Save the new order in a single ruleset update
+
+        >>> cf.optimize_rules("example.com", replay.run("logs/20250101.log.gz"), apply=True)
+        >>> {"order": ["Bad IPs", "Bad AS", "Bad Bots"], "moves": [...], "evaluations": {"current": 98.2, "optimized": 61.5, "reduction": 0.374}}
+        """
+
+        if isinstance(stats, str):
+            with open(stats, "r", encoding="utf-8") as file:
+                stats = json.load(file)
+
+        rules = self.get_rules(domain_name)
+
+        optimizer = Optimizer(rules["result"], Optimizer.load_stats(stats), overlaps=stats.get("overlaps"), pinned=pinned)
+        result = optimizer.optimize()
+
+        if apply and result["moves"]:
+            zone_id = rules["zone_id"]
+            custom_ruleset_id = rules["custom_ruleset_id"]
+
+            remote_rules = {x["description"]: x for x in rules["result"]}
+            ordered_rules = [
+                {key: value for key, value in remote_rules[name].items() if key not in ("version", "last_updated")}
+                for name in result["order"]
+            ]
+
+            if custom_ruleset_id:
+                path = f"/zones/{zone_id}/rulesets/{custom_ruleset_id}"
+            else:
+                path = f"/zones/{zone_id}/rulesets/phases/{CUSTOM_PHASE}/entrypoint"
+
+            r = self._request("PUT", path, body={"rules": ordered_rules})
+
+            self.error.handle(r.json(), ["success"])
+
+        return result
+
+    @staticmethod
+    def scope_expression(domain_names: list[str]) -> str:
+        """Build the expression matching the requests of several domains, used to scope account rulesets
+
+        >>> Cloudflare.scope_expression(["example.com", "example.fr"])
+        >>> '(cf.zone.name in {"example.com" "example.fr"})'
+        """
+
+        return "(cf.zone.name in {" + " ".join(json.dumps(x) for x in sorted(set(domain_names))) + "})"
+
+    @staticmethod
+    def _scope_domains(expression: str) -> list[str]:
+        """Get the domains matched by a scope expression, see :func:`scope_expression`"""
+
+        names = []
+        nodes = [Expression(expression).tree]
+        while nodes:
+            clause = nodes.pop()
+            # Scopes written by hand may combine the domains with other conditions
+            nodes.extend(getattr(clause, "children", None) or [])
+            if getattr(clause, "field", None) is None or clause.field.name != "cf.zone.name":
+                continue
+            if clause.operator == "in":
+                names.extend(x.value for x in clause.value.members)
+            elif clause.operator in ("eq", "=="):
+                names.append(clause.value.value)
+
+        return sorted(set(names))
+
+    def get_account_id(self, domain_name: str) -> str:
+        """Get the id of the account owning a specific domain
+
+        >>> cf.get_account_id("example.com")
+        >>> "a1b2c3"
+        """
+
+        return self.get_domain(domain_name)["account"]["id"]
+
+    def get_account_ruleset(self, account_id: str, ruleset_name: str) -> RulesetObject | None:
+        """Get a custom ruleset of an account by its name as :class:`RulesetObject`, None if it does not exist
+
+        >>> cf.get_account_ruleset("a1b2c3", "Fleet rules")
+        >>> {"id": "d4e5f6", "name": "Fleet rules", "kind": "custom", "phase": "http_request_firewall_custom", "rules": [...], "account_id": "a1b2c3", ...}
+        """
+
+        if not hasattr(self, "_headers"):
+            raise Error("You must authenticate first, use cf.auth_key(email, key) or cf.auth_token(bearer_token)")
+
+        r = self._request("GET", f"/accounts/{account_id}/rulesets")
+
+        rulesets = self.error.handle(r.json(), ["result"])
+        ruleset = next((x for x in rulesets if x.get("kind") == "custom" and x.get("name") == ruleset_name), None)
+
+        if not ruleset:
+            return None
+
+        r = self._request("GET", f"/accounts/{account_id}/rulesets/{ruleset['id']}")
+
+        ruleset = self.error.handle(r.json(), ["result"])
+        ruleset["account_id"] = account_id
+
+        return RulesetObject(ruleset)
+
+    def _account_entrypoint(self, account_id: str) -> list[dict]:
+        """Get the rules of the custom rules entrypoint of an account, without their read-only keys"""
+
+        r = self._request("GET", f"/accounts/{account_id}/rulesets/phases/{CUSTOM_PHASE}/entrypoint")
+
+        if r.status_code == 404:
+            return []
+
+        rules = self.error.handle(r.json(), ["result"]).get("rules") or []
+
+        return [{key: value for key, value in x.items() if key not in ("version", "last_updated")} for x in rules]
+
+    def get_account_scope(self, account_id: str, ruleset_name: str) -> list[str]:
+        """Get the domains an account custom ruleset is deployed to
+
+        >>> cf.get_account_scope("a1b2c3", "Fleet rules")
+        >>> ["example.com", "example.fr"]
+        """
+
+        ruleset = self.get_account_ruleset(account_id, ruleset_name)
+
+        if not ruleset:
+            raise Error(f"Account ruleset '{ruleset_name}' not found")
+
+        for rule in self._account_entrypoint(account_id):
+            if rule["action"] == "execute" and rule.get("action_parameters", {}).get("id") == ruleset["id"]:
+                return self._scope_domains(rule["expression"])
+
+        return []
+
+    def set_account_scope(self, account_id: str, ruleset_name: str, domain_names: list[str]) -> str:
+        """Deploy an account custom ruleset to specific domains only, replacing its previous scope
+
+        A single execute rule of the account entrypoint runs the ruleset for the requests of these domains,
+        no domain removes the rule (the ruleset is kept but not deployed anymore)
+
+        :exception Error: If the account ruleset is not found
+
+        >>> cf.set_account_scope("a1b2c3", "Fleet rules", ["example.com", "example.fr", "example.net"])
+        >>> "updated"
+        # "created", "updated", "removed" or "unchanged"
+        """
+
+        ruleset = self.get_account_ruleset(account_id, ruleset_name)
+
+        if not ruleset:
+            raise Error(f"Account ruleset '{ruleset_name}' not found")
+
+        return self._deploy_account_ruleset(account_id, ruleset, domain_names)
+
+    def _deploy_account_ruleset(self, account_id: str, ruleset: dict, domain_names: list[str]) -> str:
+        """Create, update or remove the execute rule of an account ruleset in the account entrypoint"""
+
+        rules = self._account_entrypoint(account_id)
+        index = next(
+            (i for i, x in enumerate(rules) if x["action"] == "execute" and x.get("action_parameters", {}).get("id") == ruleset["id"]),
+            None,
+        )
+
+        if not domain_names:
+            if index is None:
+                return "unchanged"
+            del rules[index]
+            status = "removed"
+        else:
+            execute_rule = {
+                "description": ruleset["name"],
+                "expression": self.scope_expression(domain_names),
+                "action": "execute",
+                "action_parameters": {"id": ruleset["id"]},
+                "enabled": True,
+            }
+
+            if index is None:
+                rules.append(execute_rule)
+                status = "created"
+            elif (
+                self._scope_domains(rules[index]["expression"]) == sorted(set(domain_names))
+                and rules[index].get("enabled", True)
+            ):
+                return "unchanged"
+            else:
+                rules[index] = {**rules[index], **execute_rule}
+                status = "updated"
+
+        r = self._request("PUT", f"/accounts/{account_id}/rulesets/phases/{CUSTOM_PHASE}/entrypoint", body={"rules": rules})
+
+        self.error.handle(r.json(), ["success"])
+
+        return status
+
+    def deploy_account_rules(self, account_id: str, ruleset_name: str, domain_names: list[str], actions_all: str | None = None) -> dict:
+        """Deploy the rules of the expressions folder once for many domains, as an account custom ruleset
+
+        The ruleset is created or updated in a single request, then deployed to the domains
+        with one execute rule (see :func:`set_account_scope`), whatever the number of domains.
+        Nothing is sent when the remote rules and scope are already the same.
+
+        .. note::
+            Account custom rulesets need an Enterprise plan with the WAF Advanced add-on
+
+        :exception Error: If any expression file is not valid (see :func:`validate_rules`)
+
+        >>> cf.deploy_account_rules(cf.get_account_id("example.com"), "Fleet rules", ["example.com", "example.fr"])
+        >>> {"ruleset_id": "d4e5f6", "ruleset": "created", "scope": "created", "rules": ["Bad Bots", "Bad IPs"], "zones": ["example.com", "example.fr"]}
+        """
+
+        preflight = Preflight(self.utils.directory, cache=self._checked)
+        preflight.check(action=actions_all)
+
+        rules = []
+        for file in preflight.files:
+            header, expression = self.utils.read_expression(file)
+            header = header or {}
+            rules.append(self._build_rule(
+                file.removesuffix(".txt"),
+                expression,
+                actions_all or header.get("action") or "managed_challenge",
+                header.get("enabled"),
+            ))
+
+        def signature(rules: list[dict]) -> list[tuple]:
+            return [
+                (x["description"], Expression.stable_hash(x["expression"]), x["action"], x.get("enabled", True))
+                for x in rules
+            ]
+
+        ruleset = self.get_account_ruleset(account_id, ruleset_name)
+
+        if not ruleset:
+            body = {"name": ruleset_name, "kind": "custom", "phase": CUSTOM_PHASE, "rules": rules}
+            r = self._request("POST", f"/accounts/{account_id}/rulesets", body=body)
+            ruleset = self.error.handle(r.json(), ["result"])
+            status = "created"
+        elif signature(ruleset.get("rules") or []) != signature(rules):
+            r = self._request("PUT", f"/accounts/{account_id}/rulesets/{ruleset['id']}", body={"rules": rules})
+            self.error.handle(r.json(), ["success"])
+            status = "updated"
+        else:
+            status = "unchanged"
+
+        return {
+            "ruleset_id": ruleset["id"],
+            "ruleset": status,
+            "scope": self._deploy_account_ruleset(account_id, ruleset, domain_names),
+            "rules": [x["description"] for x in rules],
+            "zones": sorted(set(domain_names)),
+        }
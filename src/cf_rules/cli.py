@@ -0,0 +1,240 @@
+"""Command-line interface of cf_rules
+
+Credentials are read from the CF_API_TOKEN environment variable, or CF_API_EMAIL and CF_API_KEY
+
+>>> cf-rules list
+>>> cf-rules --format ndjson export example.com example.fr
+>>> cf-rules validate --action block
+>>> cf-rules pack rules.pack.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from .error import Error
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="cf-rules", description="Import / export Cloudflare WAF custom rules in bulk")
+    parser.add_argument("--folder", default="expressions", help="Expressions folder (default: expressions)")
+    parser.add_argument("--phase", default="http_request_firewall_custom", help="Phase of the rules (default: custom rules)")
+    parser.add_argument("--format", choices=("text", "json", "ndjson"), default="text", help="Output format, progress is written to stderr with json and ndjson")
+
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    command = commands.add_parser("list", help="List all domains, or the rules of a domain")
+    command.add_argument("domain", nargs="?")
+
+    command = commands.add_parser("export", help="Export the rules of domains to the expressions folder")
+    command.add_argument("domains", nargs="+")
+    command.add_argument("--pack", help="Rule pack file to export to instead of the folder, one domain only")
+
+    command = commands.add_parser("import", help="Import the expressions folder into domains")
+    command.add_argument("domains", nargs="+")
+    command.add_argument("--action", help="Action of all rules, overriding the headers")
+    command.add_argument("--pack", help="Rule pack file to import instead of the folder")
+    command.add_argument("--dry-run", action="store_true", help="Only report the requests that would be sent")
+
+    command = commands.add_parser("update", help="Update a rule of domains from its expression file")
+    command.add_argument("file")
+    command.add_argument("domains", nargs="+")
+    command.add_argument("--name", help="Name of the remote rule (default: name of the file)")
+    command.add_argument("--action", help="Action of the rule, overriding the header")
+    command.add_argument("--dry-run", action="store_true", help="Only report the requests that would be sent")
+
+    command = commands.add_parser("purge", help="Delete all rules of domains")
+    command.add_argument("domains", nargs="+")
+    command.add_argument("--dry-run", action="store_true", help="Only report the requests that would be sent")
+
+    command = commands.add_parser("sync", help="Import the rules of a store into domains")
+    command.add_argument("domains", nargs="*")
+    command.add_argument("--store", default="store", help="Store folder (default: store)")
+    command.add_argument("--source", help="Domain whose rules are pushed to every domain")
+    command.add_argument("--pack", help="Rule pack file whose rules are pushed to every domain, instead of the store")
+    command.add_argument("--dry-run", action="store_true", help="Only report the requests that would be sent")
+
+    command = commands.add_parser("pack", help="Build a rule pack file from the expressions folder")
+    command.add_argument("file")
+
+    command = commands.add_parser("unpack", help="Write the rules of a rule pack file to the expressions folder")
+    command.add_argument("file")
+
+    command = commands.add_parser("validate", help="Validate the expressions folder, against the rules of a domain if given")
+    command.add_argument("domain", nargs="?")
+    command.add_argument("--action", help="Action of all rules, overriding the headers")
+
+    return parser.parse_args(argv)
+
+
+class Output:
+    def __init__(self, output_format: str) -> None:
+        """Writer of the results of a command, as text, a JSON array or one JSON object per line (streamed)
+
+        Results are written to the standard output of its creation, even when progress messages are redirected
+        """
+
+        self.format = output_format
+        self.stream = sys.stdout
+        self.results = []
+
+    def write(self, result: dict, text: str) -> None:
+        if self.format == "ndjson":
+            self.stream.write(json.dumps(result) + "\n")
+            self.stream.flush()
+        elif self.format == "json":
+            self.results.append(result)
+        else:
+            self.stream.write(text + "\n")
+
+    def close(self) -> None:
+        if self.format == "json":
+            json.dump(self.results, self.stream, indent=4)
+            self.stream.write("\n")
+
+
+def failures() -> tuple:
+    """Exceptions reported as failures instead of tracebacks: errors of the library, of the system
+    and of the network (requests exceptions are OSError, httpx ones are only raised once it is imported)
+    """
+
+    errors = (Error, OSError)
+    if "httpx" in sys.modules:
+        errors += (sys.modules["httpx"].HTTPError,)
+
+    return errors
+
+
+def authenticate(cf) -> None:
+    """Authenticate with the credentials of the environment"""
+
+    if os.environ.get("CF_API_TOKEN"):
+        response = cf.auth_token(os.environ["CF_API_TOKEN"])
+    elif os.environ.get("CF_API_EMAIL") and os.environ.get("CF_API_KEY"):
+        response = cf.auth_key(os.environ["CF_API_EMAIL"], os.environ["CF_API_KEY"])
+    else:
+        raise Error("Set CF_API_TOKEN, or CF_API_EMAIL and CF_API_KEY, to authenticate")
+
+    cf.error.handle(response, ["success"])
+
+
+def run(args: argparse.Namespace, output: Output) -> bool:
+    """Run a command, returning False if any domain failed"""
+
+    # pylint: disable=import-outside-toplevel
+    if args.command == "validate" and not args.domain:
+        from .preflight import Preflight
+
+        report = Preflight(args.folder).run(action=args.action, phase=args.phase)
+        for error in report["errors"]:
+            output.write({"file": error["file"], "error": error["error"]}, f"{error['file'] or args.folder}: {error['error']}")
+        output.write({"files": report["files"], "errors": len(report["errors"])}, f"{report['files']} files, {len(report['errors'])} error(s)")
+        return not report["errors"]
+
+    if args.command in ("pack", "unpack"):
+        from .pack import RulePack
+
+        if args.command == "pack":
+            pack = RulePack.from_folder(args.folder, args.phase)
+            pack.save(args.file)
+        else:
+            pack = RulePack.load(args.file)
+            pack.to_folder(args.folder)
+        output.write({"file": args.file, "phase": pack.phase, "rules": len(pack)}, f"{args.file}: {len(pack)} rules")
+        return True
+
+    from .cf import Cloudflare
+
+    cf = Cloudflare(args.folder, create=args.command == "export")
+    authenticate(cf)
+
+    if args.command == "list":
+        if args.domain:
+            for rule in cf.get_rules(args.domain, args.phase)["result"]:
+                output.write(rule, f"{rule['id']}  {rule['action']:18}  {rule['description']}")
+        else:
+            for zone in cf.iter_zones():
+                output.write(zone, f"{zone['id']}  {zone['plan']['legacy_id']:10}  {zone['status']:8}  {zone['name']}")
+        return True
+
+    domains = args.domains if args.command != "validate" else [args.domain]
+    if args.command == "export" and args.pack and len(domains) > 1:
+        raise Error("Only one domain can be exported to a rule pack")
+    if args.command == "sync" and not domains and not args.pack:
+        from .store import RuleStore
+
+        domains = RuleStore(args.store).zones
+
+    # One listing of all zones instead of one request per domain
+    if len(domains) > 1:
+        cf.index_zones()
+
+    # Changes are recorded instead of sent, see :func:`Cloudflare.dry_run`
+    if getattr(args, "dry_run", False):
+        from .transport import DryRunTransport
+
+        cf.transport = DryRunTransport(cf.transport)
+
+    success = True
+    for domain in domains:
+        try:
+            if args.command in ("import", "sync", "validate"):
+                cf.set_plan(domain)
+
+            match args.command:
+                case "export" if args.pack:
+                    result = len(cf.export_pack(domain, args.pack, args.phase))
+                case "export":
+                    result = cf.export_rules(domain, args.phase)
+                case "import" if args.pack:
+                    result = cf.import_pack(domain, args.pack, args.action)
+                case "import":
+                    result = cf.import_rules(domain, args.action, args.phase)
+                case "update":
+                    result = cf.update_rule(domain, args.file, args.name, args.action, phase=args.phase)
+                case "purge":
+                    result = cf.purge_rules(domain, args.phase)
+                case "sync" if args.pack:
+                    result = cf.sync_pack([domain], args.pack)[domain]
+                case "sync":
+                    result = cf.sync_zones([domain], args.store, args.source)[domain]
+                case "validate":
+                    result = cf.validate_rules(domain, args.action, args.phase)
+                    success = success and not result["errors"]
+        except failures() as e:
+            success = False
+            output.write({"domain": domain, "success": False, "error": str(e)}, f"{domain}: {e}")
+        else:
+            output.write({"domain": domain, "success": True, "result": result}, f"{domain}: done")
+
+    if getattr(args, "dry_run", False):
+        report = cf.transport.report()
+        output.write({"dry_run": report}, f"{report['calls']} requests ({report['reads']} reads, {report['writes']} changes), about {report['duration']}s")
+
+    return success
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point of the cf-rules command
+
+    >>> cf-rules --help
+    """
+
+    args = parse_args(argv)
+    output = Output(args.format)
+
+    # Progress messages of the methods must not mix with JSON results
+    progress = sys.stderr if args.format != "text" else sys.stdout
+
+    try:
+        with contextlib.redirect_stdout(progress):
+            success = run(args, output)
+    except failures() as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        output.close()
+
+    return 0 if success else 1
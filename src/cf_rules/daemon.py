@@ -0,0 +1,318 @@
+import contextlib
+import copy
+import io
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+from .cf import Cloudflare, DomainObject, RulesetObject
+from .error import Error
+from .pack import RulePack
+from .store import RuleStore
+from .transport import Transport
+from .utils import CUSTOM_PHASE
+
+# Unix socket used when no address is given
+DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "cf_rules.sock")
+
+# Hosts a TCP daemon can listen on
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# Methods of Cloudflare callable through the daemon
+DAEMON_METHODS = (
+    "get_domains",
+    "get_rules",
+    "set_plan",
+    "export_rules",
+    "export_rule",
+    "import_rules",
+    "create_rule",
+    "update_rule",
+    "delete_rule",
+    "purge_rules",
+    "validate_rules",
+    "export_zones",
+    "sync_zones",
+    "drift_report",
+    "analyze_rules",
+    "optimize_rules",
+    "deploy_account_rules",
+    "set_account_scope",
+    "get_account_scope",
+    "snapshot_zones",
+    "restore_snapshot",
+    "export_pack",
+    "import_pack",
+    "sync_pack",
+)
+
+
+def parse_address(address: str) -> tuple[str, int] | str:
+    """Get the (host, port) of a "host:port" TCP address, or the path of a Unix socket
+
+    :exception Error: If the host of a TCP address is not a loopback address
+    """
+
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and "/" not in address:
+        host = host.strip("[]") or "127.0.0.1"
+        # The daemon has no authentication, it must not be reachable from the network
+        if host not in LOCAL_HOSTS:
+            raise Error(f"Address '{address}' is not local (available hosts: {', '.join(LOCAL_HOSTS)})")
+        return host, int(port)
+    return address
+
+
+class CachedCloudflare(Cloudflare):
+    def __init__(self, folder: str | None = None, transport: Transport | None = None, ttl: float = 60) -> None:
+        """Cloudflare keeping domains and the rulesets of phases in memory between calls
+
+        Domains are resolved once, rulesets are kept for ttl seconds and dropped on any change
+
+        >>> cf = CachedCloudflare("my_expressions", ttl=30)
+        """
+
+        super().__init__(folder, transport)
+
+        self.ttl = ttl
+
+        self._domains = {}
+        self._rulesets = {}
+
+    def _request(self, method: str, path: str, body: dict | None = None) -> object:
+        if method != "GET":
+            self._rulesets.clear()
+
+        return super()._request(method, path, body)
+
+    def refresh(self) -> None:
+        """Drop all cached domains and rulesets
+
+        >>> cf.refresh()
+        """
+
+        self._domains.clear()
+        self._rulesets.clear()
+
+    def get_domain(self, domain_name: str) -> DomainObject:
+        if domain_name not in self._domains:
+            self._domains[domain_name] = super().get_domain(domain_name)
+
+        return copy.deepcopy(self._domains[domain_name])
+
+    def get_phase_ruleset(self, domain_name: str, phase: str = CUSTOM_PHASE) -> RulesetObject:
+        cached_at, ruleset = self._rulesets.get((domain_name, phase), (None, None))
+
+        if cached_at is None or time.monotonic() - cached_at > self.ttl:
+            ruleset = super().get_phase_ruleset(domain_name, phase)
+            self._rulesets[domain_name, phase] = (time.monotonic(), ruleset)
+
+        # get_rule adds the ids of the zone and ruleset to the returned rules
+        return copy.deepcopy(ruleset)
+
+
+class ThreadingTCPServer6(socketserver.ThreadingTCPServer):
+    address_family = socket.AF_INET6
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError
+            except ValueError:
+                response = {"success": False, "error": "Request is not a valid JSON object", "output": ""}
+            else:
+                response = self.server.cf_daemon.handle(request)
+
+            # The client always gets a response, even if the result cannot be encoded
+            try:
+                data = json.dumps(response)
+            except (TypeError, ValueError) as e:
+                data = json.dumps({"success": False, "error": f"Result cannot be encoded: {e}", "output": response.get("output", "")})
+
+            self.wfile.write(data.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class Daemon:
+    def __init__(self, cf: Cloudflare, address: str = DEFAULT_ADDRESS) -> None:
+        """Long-running process serving the methods of an authenticated :class:`Cloudflare` instance
+        on a Unix socket or a localhost TCP address ("127.0.0.1:8787")
+
+        Authentication, pooled connections, resolved domains (with :class:`CachedCloudflare`)
+        and checked expression files are kept between calls, so each call only costs its changes.
+        Calls are processed one at a time, in the order they arrive.
+
+        :exception Error: If the host of a TCP address is not 127.0.0.1, ::1 or localhost
+
+        .. warning::
+            Anyone able to connect can use the credentials of the instance:
+            prefer a Unix socket (only readable by its owner), a TCP address is reachable by every local user
+
+        >>> cf = CachedCloudflare("my_expressions")
+        >>> cf.auth_token("xxxxxxxxxx")
+        >>> Daemon(cf, "/run/cf_rules.sock").serve()
+        """
+
+        self.cf = cf
+        self.address = parse_address(address)
+        self.lock = threading.Lock()
+        self.server = None
+
+    def handle(self, request: dict) -> dict:
+        """Process a request {"method": "import_rules", "args": [...], "kwargs": {...}, "folder": "..."}
+
+        The output printed by the method is returned with its result
+
+        >>> daemon.handle({"method": "import_rules", "args": ["example.com"]})
+        >>> {"success": True, "result": True, "output": "Importing Bad Bots.txt...\\n"}
+        """
+
+        method = request.get("method")
+
+        if method == "ping":
+            return {"success": True, "result": "pong", "output": ""}
+        if method == "refresh":
+            with self.lock:
+                if isinstance(self.cf, CachedCloudflare):
+                    self.cf.refresh()
+                self.cf._checked.clear()  # pylint: disable=protected-access
+            return {"success": True, "result": True, "output": ""}
+        if method == "stop":
+            threading.Thread(target=self.stop).start()
+            return {"success": True, "result": True, "output": ""}
+        if method not in DAEMON_METHODS:
+            return {"success": False, "error": f"Unknown method '{method}'", "output": ""}
+
+        with self.lock, contextlib.redirect_stdout(io.StringIO()) as output:
+            directory = self.cf.utils.directory
+            try:
+                if request.get("folder"):
+                    self.cf.utils.change_directory(request["folder"])
+
+                result = getattr(self.cf, method)(*request.get("args", []), **request.get("kwargs", {}))
+            except Error as e:
+                return {"success": False, "error": str(e), "output": output.getvalue()}
+            except Exception as e:  # pylint: disable=broad-except
+                # Malformed arguments or network failures are reported instead of closing the connection
+                return {"success": False, "error": f"{type(e).__name__}: {e}", "output": output.getvalue()}
+            finally:
+                self.cf.utils.directory = directory
+
+        if isinstance(result, RuleStore):
+            result = result.directory
+        elif isinstance(result, RulePack):
+            result = result.rules
+
+        return {"success": True, "result": result, "output": output.getvalue()}
+
+    def serve(self) -> None:
+        """Serve requests until :func:`stop` is called (or a "stop" request is received)
+
+        >>> daemon.serve()
+        """
+
+        if isinstance(self.address, tuple):
+            self.server = ThreadingTCPServer6(self.address, DaemonHandler) if ":" in self.address[0] else \
+                socketserver.ThreadingTCPServer(self.address, DaemonHandler)
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            # The socket is only accessible by its owner from its creation
+            umask = os.umask(0o177)
+            try:
+                self.server = socketserver.ThreadingUnixStreamServer(self.address, DaemonHandler)
+            finally:
+                os.umask(umask)
+
+        self.server.daemon_threads = True
+        self.server.cf_daemon = self
+
+        print(f"Serving on {self.address}...")
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if not isinstance(self.address, tuple) and os.path.exists(self.address):
+                os.remove(self.address)
+
+    def stop(self) -> None:
+        """Stop serving requests
+
+        >>> daemon.stop()
+        """
+
+        if self.server:
+            self.server.shutdown()
+
+
+class DaemonClient:
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float | None = None) -> None:
+        """Thin client calling the methods of :class:`Cloudflare` on a running :class:`Daemon`
+
+        Any method of :data:`DAEMON_METHODS` can be called directly on the client,
+        with an optional folder argument to use another expressions folder
+
+        >>> client = DaemonClient("/run/cf_rules.sock")
+        >>> client.import_rules("example.com", folder="my_expressions")
+        """
+
+        self.address = parse_address(address)
+        self.timeout = timeout
+
+    def call(self, method: str, *args, folder: str | None = None, **kwargs) -> object:
+        """Call a method on the daemon, printing its output
+
+        :exception Error: If the daemon is not running or the method failed
+
+        >>> client.call("update_rule", "example.com", "Bad Bots.txt")
+        >>> True
+        """
+
+        if isinstance(self.address, tuple):
+            family = socket.AF_INET6 if ":" in self.address[0] else socket.AF_INET
+        else:
+            family = socket.AF_UNIX
+        request = {"method": method, "args": args, "kwargs": kwargs}
+        if folder:
+            request["folder"] = os.path.abspath(folder)
+
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.timeout)
+                connection.connect(self.address)
+                connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                with connection.makefile("rb") as file:
+                    line = file.readline()
+        except OSError as e:
+            raise Error(f"Cannot reach the daemon on {self.address}: {e}") from e
+
+        if not line:
+            raise Error("The daemon closed the connection")
+
+        response = json.loads(line)
+
+        if response.get("output"):
+            print(response["output"], end="")
+
+        if not response["success"]:
+            raise Error(response["error"])
+
+        return response["result"]
+
+    def __getattr__(self, name: str) -> object:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
@@ -0,0 +1,743 @@
+import hashlib
+import io
+import ipaddress
+import re
+import urllib.parse
+from collections.abc import Callable, Iterable, Iterator
+
+from .error import Error
+
+TOKENS = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<raw>r(?P<hashes>\#*)"(?s:.*?)"(?P=hashes))
+  | (?P<comment>\#[^\n]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<ip>(?:\d{1,3}\.){3}\d{1,3}(?:/\d{1,2}|\.\.(?:\d{1,3}\.){3}\d{1,3})?
+        |(?=[0-9A-Fa-f:]*:[0-9A-Fa-f]*:)[0-9A-Fa-f:]+(?:/\d{1,3})?)
+  | (?P<number>-?\d+(?:\.\.-?\d+)?)
+  | (?P<symbol>==|!=|<=|>=|&&|\|\||\^\^|[<>~!(){}\[\],*])
+  | (?P<name>\$?[A-Za-z_][A-Za-z0-9_.]*)
+""", re.VERBOSE)
+# Opening of a string or a raw string, possibly not closed on the same line
+STRING_START = re.compile(r'r\#*"|"')
+
+# Every spelling of the logical and comparison operators, mapped to their canonical name
+LOGICAL_OPERATORS = {
+    "not": "not", "!": "not",
+    "and": "and", "&&": "and",
+    "xor": "xor", "^^": "xor",
+    "or": "or", "||": "or",
+}
+COMPARISON_OPERATORS = {
+    "eq": "eq", "==": "eq",
+    "ne": "ne", "!=": "ne",
+    "lt": "lt", "<": "lt",
+    "le": "le", "<=": "le",
+    "gt": "gt", ">": "gt",
+    "ge": "ge", ">=": "ge",
+    "contains": "contains",
+    "matches": "matches", "~": "matches",
+    "wildcard": "wildcard",
+    "strict": "strict wildcard",
+    "in": "in",
+}
+# Functions whose arguments are expressions instead of fields
+EXPRESSION_FUNCTIONS = ("any", "all")
+# Functions that can be evaluated locally, see :func:`Expression.evaluate`
+FUNCTIONS = {
+    "lower": lambda x: x.lower(),
+    "upper": lambda x: x.upper(),
+    "len": len,
+    "url_decode": urllib.parse.unquote,
+    "starts_with": lambda x, y: x.startswith(y),
+    "ends_with": lambda x, y: x.endswith(y),
+}
+
+
+class Token:
+    __slots__ = ("kind", "text", "line", "column")
+
+    def __init__(self, kind: str, text: str, line: int, column: int) -> None:
+        self.kind = kind
+        self.text = text
+        self.line = line
+        self.column = column
+
+    def __repr__(self) -> str:
+        return f"'{self.text}' at line {self.line}, column {self.column}"
+
+
+class Literal:
+    __slots__ = ("kind", "value")
+
+    def __init__(self, kind: str, value: object) -> None:
+        self.kind = kind
+        self.value = value
+
+    def text(self) -> str:
+        if self.kind == "string":
+            return '"' + self.value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        return str(self.value)
+
+    def key(self) -> tuple:
+        return (self.kind, self.value if self.kind == "int" else 0, self.text())
+
+    def canonical(self) -> "Literal":
+        return self
+
+
+class LiteralSet:
+    __slots__ = ("members",)
+
+    def __init__(self, members: list[Literal]) -> None:
+        self.members = members
+
+    def text(self) -> str:
+        return "{" + " ".join(x.text() for x in self.members) + "}"
+
+    def canonical(self) -> "LiteralSet":
+        members = {x.text(): x for x in self.members}
+        return LiteralSet(sorted(members.values(), key=Literal.key))
+
+
+class Field:
+    __slots__ = ("name", "args", "accessors")
+
+    def __init__(self, name: str, args: list | None = None, accessors: list[str] | None = None) -> None:
+        self.name = name
+        self.args = args
+        self.accessors = accessors or []
+
+    def text(self) -> str:
+        text = self.name
+        if self.args is not None:
+            text += "(" + ", ".join(x.text() for x in self.args) + ")"
+        return text + "".join(self.accessors)
+
+    def canonical(self) -> "Field":
+        if self.args is None:
+            return self
+        return Field(self.name, [x.canonical() for x in self.args], self.accessors)
+
+
+class Comparison:
+    __slots__ = ("field", "operator", "value")
+
+    def __init__(self, field: Field, operator: str | None = None, value: Literal | LiteralSet | None = None) -> None:
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def text(self) -> str:
+        if self.operator is None:
+            return self.field.text()
+        return f"{self.field.text()} {self.operator} {self.value.text()}"
+
+    def canonical(self) -> "Comparison":
+        if self.operator is None:
+            return Comparison(self.field.canonical())
+        return Comparison(self.field.canonical(), self.operator, self.value.canonical())
+
+
+class Not:
+    __slots__ = ("child",)
+
+    def __init__(self, child) -> None:
+        self.child = child
+
+    def text(self) -> str:
+        return f"not ({self.child.text()})"
+
+    def canonical(self):
+        child = self.child.canonical()
+        if isinstance(child, Not):
+            return child.child
+        return Not(child)
+
+
+class Logical:
+    __slots__ = ("operator", "children")
+
+    def __init__(self, operator: str, children: list) -> None:
+        self.operator = operator
+        self.children = children
+
+    def text(self) -> str:
+        return f" {self.operator} ".join(f"({x.text()})" for x in self.children)
+
+    def canonical(self):
+        children = []
+        for child in (x.canonical() for x in self.children):
+            if isinstance(child, Logical) and child.operator == self.operator:
+                children.extend(child.children)
+            else:
+                children.append(child)
+
+        # "a and a" is "a", but "a xor a" is never true
+        if self.operator == "xor":
+            children.sort(key=lambda x: x.text())
+        else:
+            children = sorted({x.text(): x for x in children}.values(), key=lambda x: x.text())
+
+        if len(children) == 1:
+            return children[0]
+
+        return Logical(self.operator, children)
+
+
+def tokenize(lines: Iterable[str]) -> Iterator[Token]:
+    """Split the lines of an expression into tokens, skipping spaces and comments
+
+    A string can span several lines, which are joined by a space like :func:`Utils.read_expression` does
+    (:func:`Utils.beautify` breaks lines after every "and" / "or", even inside strings)
+    """
+
+    lines = iter(lines)
+    line_number = 0
+
+    for line in lines:
+        line_number += 1
+        # Start offsets of the lines joined into the current one, to locate its tokens
+        starts = [(0, line_number)]
+        position = 0
+        while position < len(line):
+            match = TOKENS.match(line, position)
+            if (not match or match.lastgroup not in ("raw", "string")) and STRING_START.match(line, position):
+                next_line = next(lines, None)
+                if next_line is not None:
+                    line_number += 1
+                    line = f"{line.rstrip()} "
+                    starts.append((len(line), line_number))
+                    line += next_line.strip()
+                    continue
+            start, start_line = next(x for x in reversed(starts) if x[0] <= position)
+            if not match:
+                raise Error(f"Unexpected character '{line[position]}' at line {start_line}, column {position - start + 1}")
+            if match.lastgroup not in ("space", "comment"):
+                yield Token(match.lastgroup, match.group(), start_line, position - start + 1)
+            position = match.end()
+
+
+class Parser:
+    def __init__(self, tokens: Iterator[Token]) -> None:
+        """Recursive descent parser of Cloudflare's rules language
+
+        Operators precedence is not > and > xor > or, as per Cloudflare's documentation
+        """
+
+        self.tokens = tokens
+        self.current = next(self.tokens, None)
+
+    def advance(self) -> Token:
+        token = self.current
+        self.current = next(self.tokens, None)
+        return token
+
+    def logical(self, operator: str) -> bool:
+        return self.current is not None and self.current.kind in ("name", "symbol") and LOGICAL_OPERATORS.get(self.current.text) == operator
+
+    def expect(self, text: str) -> Token:
+        if self.current is None:
+            raise Error(f"Expected '{text}' but the expression ended")
+        if self.current.text != text:
+            raise Error(f"Expected '{text}' but got {self.current}")
+        return self.advance()
+
+    def parse(self):
+        if self.current is None:
+            raise Error("Empty expression")
+
+        node = self.parse_or()
+
+        if self.current is not None:
+            raise Error(f"Unexpected {self.current}")
+
+        return node
+
+    def iter_clauses(self) -> Iterator:
+        """Parse the top-level clauses joined by "or" one by one"""
+
+        if self.current is None:
+            raise Error("Empty expression")
+
+        yield self.parse_xor()
+
+        while self.logical("or"):
+            self.advance()
+            yield self.parse_xor()
+
+        if self.current is not None:
+            raise Error(f"Unexpected {self.current}")
+
+    def parse_or(self):
+        return self.parse_logical("or", self.parse_xor)
+
+    def parse_xor(self):
+        return self.parse_logical("xor", self.parse_and)
+
+    def parse_and(self):
+        return self.parse_logical("and", self.parse_not)
+
+    def parse_logical(self, operator: str, parse_operand):
+        children = [parse_operand()]
+        while self.logical(operator):
+            self.advance()
+            children.append(parse_operand())
+        return Logical(operator, children) if len(children) > 1 else children[0]
+
+    def parse_not(self):
+        if self.logical("not"):
+            self.advance()
+            return Not(self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.current is None:
+            raise Error("Unexpected end of expression")
+
+        if self.current.text == "(":
+            self.advance()
+            node = self.parse_or()
+            self.expect(")")
+            return node
+
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> Comparison:
+        field = self.parse_field()
+
+        if self.current is None or self.current.kind not in ("name", "symbol") or self.current.text not in COMPARISON_OPERATORS:
+            return Comparison(field)
+
+        operator = COMPARISON_OPERATORS[self.advance().text]
+        if operator == "strict wildcard":
+            self.expect("wildcard")
+
+        if operator == "in":
+            return Comparison(field, operator, self.parse_set())
+
+        return Comparison(field, operator, self.parse_literal())
+
+    def parse_field(self) -> Field:
+        token = self.advance()
+
+        if token is None:
+            raise Error("Expected a field but the expression ended")
+        if token.kind != "name" or token.text in LOGICAL_OPERATORS or token.text.startswith("$"):
+            raise Error(f"Expected a field but got {token}")
+
+        args = None
+        if self.current is not None and self.current.text == "(":
+            self.advance()
+            args = []
+            while self.current is not None and self.current.text != ")":
+                if token.text in EXPRESSION_FUNCTIONS:
+                    args.append(self.parse_or())
+                elif self.current.kind == "name" and self.current.text not in ("true", "false"):
+                    args.append(self.parse_field())
+                else:
+                    args.append(self.parse_literal())
+                if self.current is not None and self.current.text == ",":
+                    self.advance()
+            self.expect(")")
+
+        accessors = []
+        while self.current is not None and self.current.text == "[":
+            self.advance()
+            index = self.advance()
+            if index is None or index.kind not in ("string", "number") and index.text != "*":
+                raise Error(f"Expected an index but got {index or 'the end of the expression'}")
+            self.expect("]")
+            accessors.append(f"[{index.text}]")
+
+        return Field(token.text, args, accessors)
+
+    def parse_set(self) -> LiteralSet | Literal:
+        if self.current is not None and self.current.text.startswith("$"):
+            return Literal("list", self.advance().text)
+
+        self.expect("{")
+        members = []
+        while self.current is not None and self.current.text != "}":
+            members.append(self.parse_literal())
+        self.expect("}")
+
+        return LiteralSet(members)
+
+    def parse_literal(self) -> Literal:
+        token = self.advance()
+
+        if token is None:
+            raise Error("Expected a value but the expression ended")
+
+        match token.kind:
+            case "string":
+                return Literal("string", re.sub(r'\\([\\"])', r"\1", token.text[1:-1]))
+            case "raw":
+                return Literal("string", re.fullmatch(r'r(#*)"(.*)"\1', token.text, re.DOTALL).group(2))
+            case "number" if ".." in token.text:
+                return Literal("range", token.text)
+            case "number":
+                return Literal("int", int(token.text))
+            case "ip" if ".." in token.text:
+                return Literal("ip", token.text)
+            case "ip" if "/" not in token.text and ":" not in token.text:
+                # Plain IPv4 addresses are already in their normalized form once validated
+                if all(x == "0" or not x.startswith("0") and int(x) <= 255 for x in token.text.split(".")):
+                    return Literal("ip", token.text)
+                raise Error(f"Invalid IP address {token}")
+            case "ip":
+                try:
+                    network = ipaddress.ip_network(token.text, strict=False)
+                    # A single address with or without its full prefix length
+                    if network.num_addresses == 1:
+                        return Literal("ip", str(network.network_address))
+                    return Literal("ip", str(network))
+                except ValueError as e:
+                    raise Error(f"Invalid IP address {token}") from e
+            case "name" if token.text in ("true", "false"):
+                return Literal("bool", token.text)
+
+        raise Error(f"Expected a value but got {token}")
+
+
+def to_int(value: object) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_ip(value: object) -> ipaddress.IPv4Address | ipaddress.IPv6Address | None:
+    try:
+        return ipaddress.ip_address(value)
+    except ValueError:
+        return None
+
+
+def ip_range(text: str) -> Callable[[object], bool]:
+    """Get a test for an IP literal, either a single address, a CIDR network or a "start..end" range"""
+
+    if ".." in text:
+        start, end = (ipaddress.ip_address(x) for x in text.split(".."))
+        return lambda x: (ip := to_ip(x)) is not None and ip.version == start.version and start <= ip <= end
+
+    network = ipaddress.ip_network(text, strict=False)
+    return lambda x: (ip := to_ip(x)) is not None and ip in network
+
+
+def compile_test(operator: str, value: Literal | LiteralSet) -> Callable[[object], bool]:
+    """Compile the right side of a comparison into a test of a single field value"""
+
+    if operator == "in":
+        if isinstance(value, Literal):
+            raise Error(f"List '{value.value}' cannot be evaluated locally")
+
+        strings = {x.value for x in value.members if x.kind == "string"}
+        integers = {x.value for x in value.members if x.kind == "int"}
+        ranges = [tuple(int(y) for y in x.value.split("..")) for x in value.members if x.kind == "range"]
+        ips = [ip_range(x.value) for x in value.members if x.kind == "ip"]
+
+        def test(x):
+            if str(x) in strings:
+                return True
+            if integers or ranges:
+                number = to_int(x)
+                if number in integers or number is not None and any(a <= number <= b for a, b in ranges):
+                    return True
+            return any(ip(x) for ip in ips)
+
+        return test
+
+    if isinstance(value, LiteralSet):
+        # Strings merged from several "contains" clauses, see merge_contains()
+        pattern = re.compile("|".join(re.escape(x.value) for x in value.members))
+        return lambda x: pattern.search(str(x)) is not None
+
+    match value.kind, operator:
+        case "list", _:
+            raise Error(f"List '{value.value}' cannot be evaluated locally")
+        case "ip", "eq":
+            return ip_range(value.value)
+        case "ip", "ne":
+            test = ip_range(value.value)
+            return lambda x: not test(x)
+        case "int", _:
+            literal = value.value
+        case "bool", _:
+            literal = value.value == "true"
+            return lambda x: bool(x) == literal if operator == "eq" else bool(x) != literal
+        case _:
+            literal = value.value
+
+    match operator:
+        case "eq":
+            return lambda x: str(x) == literal if isinstance(literal, str) else to_int(x) == literal
+        case "ne":
+            return lambda x: str(x) != literal if isinstance(literal, str) else to_int(x) != literal
+        case "contains":
+            return lambda x: str(literal) in str(x)
+        case "matches":
+            pattern = re.compile(str(literal))
+            return lambda x: pattern.search(str(x)) is not None
+        case "wildcard" | "strict wildcard":
+            flags = re.DOTALL if operator == "strict wildcard" else re.DOTALL | re.IGNORECASE
+            pattern = re.compile(".*".join(re.escape(x) for x in str(literal).split("*")), flags)
+            return lambda x: pattern.fullmatch(str(x)) is not None
+
+    compare = {
+        "lt": lambda x, y: x < y,
+        "le": lambda x, y: x <= y,
+        "gt": lambda x, y: x > y,
+        "ge": lambda x, y: x >= y,
+    }[operator]
+
+    if isinstance(literal, str):
+        return lambda x: compare(str(x), literal)
+    return lambda x: (number := to_int(x)) is not None and compare(number, literal)
+
+
+def compile_field(field: Field) -> Callable[[dict], object]:
+    """Compile a field into a getter of its value in a request, keyed by field names"""
+
+    if field.args is None:
+        def get(request, name=field.name):
+            return request.get(name)
+    elif field.name in EXPRESSION_FUNCTIONS:
+        # Arrays are already evaluated as "any element matches" by comparisons
+        if field.name == "all":
+            raise Error("Function 'all' cannot be evaluated locally")
+        return compile_node(field.args[0])
+    elif field.name in FUNCTIONS:
+        function = FUNCTIONS[field.name]
+        args = [compile_field(x) if isinstance(x, Field) else (lambda request, value=x.value: value) for x in field.args]
+
+        def get(request):
+            values = [x(request) for x in args]
+            if values[0] is None:
+                return None
+            if isinstance(values[0], list):
+                return [function(x, *values[1:]) for x in values[0]]
+            return function(*values)
+    else:
+        raise Error(f"Function '{field.name}' cannot be evaluated locally")
+
+    if not field.accessors:
+        return get
+
+    accessors = [x[1:-1] for x in field.accessors]
+
+    def get_item(request):
+        value = get(request)
+        for accessor in accessors:
+            if value is None:
+                return None
+            if accessor == "*":
+                value = list(value.values()) if isinstance(value, dict) else list(value)
+            elif accessor.startswith('"'):
+                value = value.get(accessor[1:-1]) if isinstance(value, dict) else None
+            else:
+                index = int(accessor)
+                value = value[index] if isinstance(value, list) and len(value) > index else None
+        return value
+
+    return get_item
+
+
+def merge_contains(children: list) -> list:
+    """Merge "or" clauses checking if the same field contains a string into a single search"""
+
+    groups = {}
+    merged = []
+
+    for child in children:
+        if isinstance(child, Comparison) and child.operator == "contains" and child.value.kind == "string":
+            key = child.field.text()
+            if key not in groups:
+                groups[key] = Comparison(child.field, "contains", LiteralSet([]))
+                merged.append(groups[key])
+            groups[key].value.members.append(child.value)
+        else:
+            merged.append(child)
+
+    return merged
+
+
+def compile_node(node) -> Callable[[dict], bool]:
+    """Compile a parsed expression into a function evaluating a request"""
+
+    if isinstance(node, Logical):
+        if node.operator == "or":
+            children = [compile_node(x) for x in merge_contains(node.children)]
+        else:
+            children = [compile_node(x) for x in node.children]
+        match node.operator:
+            case "and":
+                return lambda request: all(x(request) for x in children)
+            case "or":
+                return lambda request: any(x(request) for x in children)
+            case _:
+                return lambda request: sum(bool(x(request)) for x in children) % 2 == 1
+
+    if isinstance(node, Not):
+        child = compile_node(node.child)
+        return lambda request: not child(request)
+
+    get = compile_field(node.field)
+
+    if node.operator is None:
+        return lambda request: (value := get(request)) is not None and (any(value) if isinstance(value, list) else bool(value))
+
+    test = compile_test(node.operator, node.value)
+    missing = node.operator == "ne"
+
+    def evaluate(request):
+        value = get(request)
+        if value is None:
+            return missing
+        if isinstance(value, list):
+            return any(test(x) for x in value)
+        return test(value)
+
+    return evaluate
+
+
+def field_names(node) -> set[str]:
+    """Get the names of all fields used in a parsed expression"""
+
+    if isinstance(node, Logical):
+        return set().union(*(field_names(x) for x in node.children))
+    if isinstance(node, Not):
+        return field_names(node.child)
+    if isinstance(node, Comparison):
+        return field_names(node.field)
+    if isinstance(node, Field):
+        if node.args is None:
+            return {node.name}
+        return set().union(set(), *(field_names(x) for x in node.args))
+    return set()
+
+
+class Expression:
+    def __init__(self, expression: str | Iterable[str]) -> None:
+        """Parsed Cloudflare expression, from a string or an iterable of lines
+
+        :exception Error: If the expression is not valid
+
+        >>> expression = Expression('(http.user_agent contains "DotBot") or (cf.threat_score ge 1)')
+        """
+
+        if isinstance(expression, str):
+            expression = io.StringIO(expression)
+
+        self.tree = Parser(tokenize(expression)).parse()
+        self._evaluate = None
+
+    @property
+    def clauses(self) -> list:
+        """Get the top-level clauses of the expression, joined by "or"
+
+        >>> Expression("(cf.client.bot) or (cf.threat_score ge 1)").clauses
+        >>> [<Comparison cf.client.bot>, <Comparison cf.threat_score ge 1>]
+        """
+
+        if isinstance(self.tree, Logical) and self.tree.operator == "or":
+            return self.tree.children
+        return [self.tree]
+
+    @property
+    def canonical(self) -> str:
+        """Get the normalized form of the expression
+
+        Whitespaces and parentheses are consistent, operands of "and" / "or" are sorted and deduplicated,
+        as well as the members of sets, and every operator uses its named form
+
+        >>> Expression('(http.user_agent contains "b")  or\\n(http.user_agent contains "a") || (ip.src in {2.2.2.2 1.1.1.1 1.1.1.1})').canonical
+        >>> '(http.user_agent contains "a") or (http.user_agent contains "b") or (ip.src in {1.1.1.1 2.2.2.2})'
+        """
+
+        tree = self.tree.canonical()
+
+        if isinstance(tree, Logical):
+            return tree.text()
+        return f"({tree.text()})"
+
+    @property
+    def hash(self) -> str:
+        """Get a stable hash of the canonical form of the expression
+
+        >>> Expression("(cf.client.bot)").hash == Expression("cf.client.bot").hash
+        >>> True
+        """
+
+        return hashlib.sha256(self.canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def iter_clauses(expression: str | Iterable[str]) -> Iterator:
+        """Parse the top-level clauses of an expression one by one, without keeping the whole expression
+
+        :exception Error: If the expression is not valid (raised when reaching the invalid clause)
+
+        >>> for clause in Expression.iter_clauses(lines):
+        ...     print(clause.text())
+        """
+
+        if isinstance(expression, str):
+            expression = io.StringIO(expression)
+
+        yield from Parser(tokenize(expression)).iter_clauses()
+
+    @staticmethod
+    def canonicalize(expression: str) -> str:
+        """Get the normalized form of an expression string
+
+        :exception Error: If the expression is not valid
+
+        >>> Expression.canonicalize("cf.threat_score >= 1")
+        >>> "(cf.threat_score ge 1)"
+        """
+
+        return Expression(expression).canonical
+
+    @staticmethod
+    def stable_hash(expression: str) -> str:
+        """Get the hash of the canonical form of an expression string
+
+        Falls back to a hash of the expression with collapsed whitespaces if it cannot be parsed,
+        so it can be used on any remote expression
+
+        >>> Expression.stable_hash("(cf.client.bot)\\nor (cf.threat_score ge 1)") == Expression.stable_hash("(cf.threat_score ge 1) or (cf.client.bot)")
+        >>> True
+        """
+
+        try:
+            return Expression(expression).hash
+        except Error:
+            return hashlib.sha256(" ".join(expression.split()).encode("utf-8")).hexdigest()
+
+    @property
+    def fields(self) -> set[str]:
+        """Get the names of all fields used in the expression
+
+        >>> Expression('(lower(http.user_agent) contains "bot") or (ip.src in {1.1.1.1})').fields
+        >>> {"http.user_agent", "ip.src"}
+        """
+
+        return field_names(self.tree)
+
+    def evaluate(self, request: dict) -> bool:
+        """Evaluate the expression locally against a request, keyed by field names
+
+        Missing fields never match (except with "ne"), array fields match if any element matches.
+        Lists ($list_name) and functions other than lower, upper, len, url_decode, starts_with, ends_with and any cannot be evaluated.
+
+        :exception Error: If the expression cannot be evaluated locally
+
+        >>> Expression('(http.user_agent contains "bot") and (ip.geoip.asnum in {14061 16276})').evaluate({"http.user_agent": "dotbot", "ip.geoip.asnum": 14061})
+        >>> True
+        """
+
+        if self._evaluate is None:
+            self._evaluate = compile_node(self.tree)
+
+        return self._evaluate(request)
@@ -0,0 +1,191 @@
+import json
+import math
+
+from .analysis import TERMINATING_ACTIONS
+from .error import Error
+from .expression import Comparison, Expression, Field, Logical, Not
+
+# Relative cost of evaluating a comparison, depending on its operator
+OPERATOR_COSTS = {
+    "matches": 5,
+    "wildcard": 2,
+    "strict wildcard": 2,
+}
+# Actions not deciding the outcome of a request: skip bypasses the next rules, log must see the same requests
+ORDERED_ACTIONS = ("skip", "log")
+
+
+def evaluation_cost(node) -> int:
+    """Estimate the cost of evaluating a parsed expression as its number of weighted comparisons"""
+
+    if isinstance(node, Logical):
+        return sum(evaluation_cost(x) for x in node.children)
+    if isinstance(node, Not):
+        return evaluation_cost(node.child)
+    if isinstance(node, Comparison):
+        cost = OPERATOR_COSTS.get(node.operator, 1)
+        if node.field.args:
+            cost += sum(evaluation_cost(x) for x in node.field.args if not isinstance(x, Field))
+        return cost
+    return 0
+
+
+class Optimizer:
+    def __init__(self, rules: list[dict], stats: dict, overlaps: dict | None = None, pinned: list[tuple[str, str]] | None = None) -> None:
+        """Propose an order of rules evaluating cheap and often matching terminating rules first
+
+        * rules -> Ordered rules, as returned by :func:`Cloudflare.get_rules`
+        * stats -> Hit rate (and optionally cost) of every rule, see :func:`load_stats`
+        * overlaps -> Requests matching two rules, as in a :func:`Replay.run` report. \
+        Two rules with different actions keep their order, unless the overlaps show they match no common request
+        * pinned -> Pairs of rule names, the first one must stay before the second one
+
+        Skip and log rules always stay before the rules following them, so they apply to the same requests.
+
+        >>> optimizer = Optimizer(cf.get_rules("example.com")["result"], Optimizer.load_stats("stats.json"))
+        """
+
+        self.rules = []
+
+        for rule in rules:
+            name = rule.get("description") or rule.get("name")
+            rule_stats = stats.get(name, {})
+
+            try:
+                cost = rule_stats.get("cost") or evaluation_cost(Expression(rule["expression"]).tree)
+            except Error as e:
+                raise Error(f"Rule '{name}' is not valid: {e}") from e
+
+            self.rules.append({
+                "name": name,
+                "action": rule.get("action") or "managed_challenge",
+                "enabled": rule.get("enabled", True) is not False,
+                "hit_rate": rule_stats.get("hit_rate", 0),
+                "cost": cost,
+            })
+
+        names = [x["name"] for x in self.rules]
+        self.constraints = set()
+
+        for index, rule in enumerate(self.rules):
+            if rule["action"] in ORDERED_ACTIONS:
+                self.constraints.update((rule["name"], x) for x in names[index + 1:])
+
+        # Rules with different actions decide differently for the requests matching both,
+        # they are only reordered when the overlaps show they match no common request
+        for index, first in enumerate(self.rules):
+            for second in self.rules[index + 1:]:
+                if first["action"] != second["action"] and (
+                    overlaps is None
+                    or overlaps.get(first["name"], {}).get(second["name"])
+                    or overlaps.get(second["name"], {}).get(first["name"])
+                ):
+                    self.constraints.add((first["name"], second["name"]))
+
+        for a, b in pinned or []:
+            if a not in names or b not in names:
+                raise Error(f"Cannot pin unknown rules '{a}' and '{b}'")
+            self.constraints.add((a, b))
+
+    @staticmethod
+    def load_stats(stats: str | dict) -> dict:
+        """Load the statistics of rules from a JSON file or a dictionary
+
+        Accepts a :func:`Replay.run` report, ``{"requests": 1000, "rules": {"Bad Bots": {"hits": 120, "cost": 3}}}``
+        or directly ``{"Bad Bots": {"hit_rate": 0.12, "cost": 3}}``
+
+        >>> Optimizer.load_stats("stats.json")
+        >>> {"Bad Bots": {"hit_rate": 0.12, "cost": 3}, ...}
+        """
+
+        if isinstance(stats, str):
+            with open(stats, "r", encoding="utf-8") as file:
+                stats = json.load(file)
+
+        if "rules" not in stats:
+            return stats
+
+        requests = stats.get("requests") or 0
+
+        result = {}
+        for name, rule in stats["rules"].items():
+            if "rate" in rule or "hit_rate" in rule:
+                hit_rate = rule.get("hit_rate", rule.get("rate"))
+            else:
+                hit_rate = rule.get("hits", 0) / requests if requests else 0
+            result[name] = {"hit_rate": hit_rate}
+            if "cost" in rule:
+                result[name]["cost"] = rule["cost"]
+
+        return result
+
+    def evaluations(self, order: list[str]) -> float:
+        """Get the expected number of weighted comparisons evaluated per request for an order of rules
+
+        Rules are considered independent: a terminating rule stops the evaluation as often as its hit rate
+
+        >>> optimizer.evaluations(["Bad IPs", "Bad Bots"])
+        >>> 83.7
+        """
+
+        rules = {x["name"]: x for x in self.rules}
+
+        reached = 1
+        total = 0
+        for name in order:
+            rule = rules[name]
+            if not rule["enabled"]:
+                continue
+            total += reached * rule["cost"]
+            if rule["action"] in TERMINATING_ACTIONS:
+                reached *= 1 - rule["hit_rate"]
+
+        return total
+
+    def optimize(self) -> dict:
+        """Get the best order of rules, respecting all ordering constraints
+
+        Among the rules whose constraints are satisfied, the rule with the lowest cost / hit rate ratio comes first
+
+        :exception Error: If the pinned pairs contain a cycle
+
+        >>> optimizer.optimize()
+        >>> {"order": ["Bad IPs", "Bad AS", "Bad Bots"], "moves": [{"rule": "Bad IPs", "from": 3, "to": 1}, ...], "evaluations": {"current": 98.2, "optimized": 61.5, "reduction": 0.374}}
+        """
+
+        names = [x["name"] for x in self.rules]
+        remaining = list(self.rules)
+        order = []
+
+        def ratio(rule: dict) -> float:
+            if not rule["enabled"]:
+                return 0
+            if rule["action"] not in TERMINATING_ACTIONS or rule["hit_rate"] <= 0:
+                return math.inf
+            return rule["cost"] / rule["hit_rate"]
+
+        while remaining:
+            available = [x for x in remaining if not any((y["name"], x["name"]) in self.constraints for y in remaining)]
+            if not available:
+                raise Error("Ordering constraints contain a cycle")
+
+            best = min(available, key=lambda x: (ratio(x), names.index(x["name"])))
+            remaining.remove(best)
+            order.append(best["name"])
+
+        current = self.evaluations(names)
+        optimized = self.evaluations(order)
+
+        return {
+            "order": order,
+            "moves": [
+                {"rule": name, "from": names.index(name) + 1, "to": index + 1}
+                for index, name in enumerate(order)
+                if names.index(name) != index
+            ],
+            "evaluations": {
+                "current": current,
+                "optimized": optimized,
+                "reduction": (current - optimized) / current if current else 0,
+            },
+        }
@@ -0,0 +1,200 @@
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from .cf import Cloudflare
+from .error import Error
+from .transport import RateLimitedTransport, RateLimiter, RequestsTransport, Transport
+
+
+class Account:
+    def __init__(self, name: str, headers: dict, concurrency: int, limiter: RateLimiter) -> None:
+        """Credential of an :class:`Orchestrator`, with its own pool of threads and rate budget"""
+
+        self.name = name
+        self.headers = headers
+        self.concurrency = concurrency
+        self.limiter = limiter
+        self.zone_index = None
+
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix=f"cf_rules_{name}")
+        self.local = threading.local()
+
+
+class Orchestrator:
+    def __init__(
+        self,
+        folder: str | None = None,
+        transport_factory: Callable[[], Transport] | None = None,
+        concurrency: int = 4,
+        rate: float = 4,
+    ) -> None:
+        """Run operations on the zones of several accounts or tokens, each one with its own concurrency and rate budget
+
+        Every credential gets a pool of concurrency threads, each thread using its own :class:`Cloudflare` instance
+        (plans and active rules are not shared) and transport, all limited by the rate of the credential.
+        Accounts are processed in parallel, a throttled account does not slow down the others.
+
+        * transport_factory -> Create the transport of each thread, :class:`RequestsTransport` by default
+        * concurrency -> Default number of parallel requests per credential
+        * rate -> Default requests per second per credential (Cloudflare allows 1200 requests per 5 minutes)
+
+        >>> orchestrator = Orchestrator("my_expressions")
+        >>> orchestrator.add_token("agency", "your-specific-bearer-token")
+        >>> orchestrator.add_key("customer", "cloudflare@example.com", "your-global-api-key", concurrency=2, rate=2)
+        >>> orchestrator.run("import_rules")
+        """
+
+        self.folder = folder
+        self.transport_factory = transport_factory or RequestsTransport
+        self.concurrency = concurrency
+        self.rate = rate
+
+        self.accounts = {}
+        self.zones = {}
+
+        # Expression files are checked once for all threads, see :class:`Preflight`
+        self._checked = {}
+        self._transports = []
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, authenticate: Callable[[Cloudflare], dict], concurrency: int | None, rate: float | None) -> dict:
+        if name in self.accounts:
+            raise Error(f"Account '{name}' already exists")
+
+        limiter = RateLimiter(rate or self.rate)
+        cf = Cloudflare(self.folder, RateLimitedTransport(self.transport_factory(), limiter), create=False)
+        cf._checked = self._checked  # pylint: disable=protected-access
+
+        response = authenticate(cf)
+        cf.error.handle(response, ["success"])
+
+        # pylint: disable=protected-access
+        self.accounts[name] = Account(name, cf._headers, concurrency or self.concurrency, limiter)
+        self.accounts[name].local.cf = cf
+        self._transports.append(cf.transport)
+
+        return response
+
+    def add_token(self, name: str, bearer_token: str, concurrency: int | None = None, rate: float | None = None) -> dict:
+        """Add a credential authenticated with an API token, see :func:`Cloudflare.auth_token`
+
+        :exception Error: If the token is not valid
+
+        >>> orchestrator.add_token("agency", "your-specific-bearer-token", concurrency=8)
+        >>> {"success": True, "result": {"id": "a1b2c3", "status": "active"}, ...}
+        """
+
+        return self._add(name, lambda cf: cf.auth_token(bearer_token), concurrency, rate)
+
+    def add_key(self, name: str, email: str, key: str, concurrency: int | None = None, rate: float | None = None) -> dict:
+        """Add a credential authenticated with a global API key, see :func:`Cloudflare.auth_key`
+
+        :exception Error: If the email or key is not valid
+
+        >>> orchestrator.add_key("customer", "cloudflare@example.com", "your-global-api-key")
+        >>> {"success": True, "result": {"id": "a1b2c3", "email": "cloudflare@example.com", ...}}
+        """
+
+        return self._add(name, lambda cf: cf.auth_key(email, key), concurrency, rate)
+
+    def cloudflare(self, account_name: str) -> Cloudflare:
+        """Get the :class:`Cloudflare` instance of a credential for the current thread
+
+        >>> orchestrator.cloudflare("agency").get_rules("example.com")
+        """
+
+        account = self.accounts[account_name]
+
+        if not hasattr(account.local, "cf"):
+            cf = Cloudflare(self.folder, RateLimitedTransport(self.transport_factory(), account.limiter), create=False)
+            cf._headers = account.headers  # pylint: disable=protected-access
+            cf._checked = self._checked  # pylint: disable=protected-access
+            cf.zone_index = account.zone_index
+            account.local.cf = cf
+
+            with self._lock:
+                self._transports.append(cf.transport)
+
+        return account.local.cf
+
+    def discover(self) -> dict:
+        """List the zones reachable by every credential, all credentials in parallel
+
+        A zone reachable by several credentials is managed by the first one added
+
+        >>> orchestrator.discover()
+        >>> {"agency": ["example.com", "example.fr"], "customer": ["example.net"]}
+        """
+
+        def index(account: Account) -> list[str]:
+            account.zone_index = self.cloudflare(account.name).index_zones()
+            return [x["name"] for x in account.zone_index.zones]
+
+        futures = {name: account.executor.submit(index, account) for name, account in self.accounts.items()}
+
+        self.zones = {}
+        report = {}
+        for name, future in futures.items():
+            report[name] = future.result()
+            for domain_name in report[name]:
+                self.zones.setdefault(domain_name, name)
+
+        return report
+
+    def _call(self, account: Account, method: str, domain_name: str, args: tuple, kwargs: dict) -> object:
+        cf = self.cloudflare(account.name)
+        cf.zone_index = account.zone_index
+        cf.set_plan(domain_name)
+
+        return getattr(cf, method)(domain_name, *args, **kwargs)
+
+    def run(self, method: str, *args, domain_names: list[str] | None = None, **kwargs) -> dict:
+        """Call a method of :class:`Cloudflare` on several domains, each one with the credential reaching it
+
+        The domain is the first argument of the method, other arguments are the same for every domain.
+        All discovered domains are used if no domain names are provided (see :func:`discover`).
+        Errors are reported by domain without stopping the other ones.
+
+        >>> orchestrator.run("import_rules", "block", domain_names=["example.com", "example.net"])
+        >>> {"example.com": {"account": "agency", "success": True, "result": True}, "example.net": {"account": "customer", "success": False, "error": "..."}}
+        """
+
+        if method.startswith("_") or not callable(getattr(Cloudflare, method, None)):
+            raise Error(f"Unknown method '{method}'")
+
+        if not self.zones:
+            self.discover()
+
+        futures = {}
+        report = {}
+        for domain_name in domain_names or self.zones:
+            if domain_name not in self.zones:
+                report[domain_name] = {"account": None, "success": False, "error": f"No credential can reach domain '{domain_name}'"}
+                continue
+
+            account = self.accounts[self.zones[domain_name]]
+            futures[domain_name] = account.executor.submit(self._call, account, method, domain_name, args, kwargs)
+
+        for domain_name, future in futures.items():
+            try:
+                report[domain_name] = {"account": self.zones[domain_name], "success": True, "result": future.result()}
+            except Error as e:
+                report[domain_name] = {"account": self.zones[domain_name], "success": False, "error": str(e)}
+            except Exception as e:  # pylint: disable=broad-except
+                # Network failures of a credential do not stop the domains of the others
+                report[domain_name] = {"account": self.zones[domain_name], "success": False, "error": f"{type(e).__name__}: {e}"}
+
+        return {x: report[x] for x in domain_names or self.zones}
+
+    def close(self) -> None:
+        """Stop the threads and close the transports of all credentials
+
+        >>> orchestrator.close()
+        """
+
+        for account in self.accounts.values():
+            account.executor.shutdown()
+
+        for transport in self._transports:
+            transport.close()
@@ -0,0 +1,216 @@
+import json
+import os
+from collections.abc import Iterator
+
+from .error import Error
+from .expression import Expression
+from .preflight import Preflight
+from .utils import CUSTOM_PHASE, JSON_HEADER_KEYS, PHASE_ACTIONS, Utils
+
+# Identifier and version of the rule pack format
+PACK_FORMAT = "cf_rules.pack"
+PACK_VERSION = 1
+
+
+class RulePack:
+    def __init__(self, rules: list[dict] | None = None, phase: str = CUSTOM_PHASE) -> None:
+        """Rules of a phase held in a single file, with their names, actions, enabled states, positions,
+        expressions and expression hashes
+
+        A pack is loaded in one read without parsing any expression, and rule names are kept as they are
+        (a folder escapes them into file names, see :func:`Utils.escape`).
+        Rules are ordered by position, the first one having position 1, rules without a position come last.
+        Imported and synced rules are placed at their position in the ruleset (see :func:`Cloudflare.sync_pack`).
+
+        >>> pack = RulePack.from_folder("my_expressions")
+        >>> pack.save("rules.pack.json")
+        """
+
+        self.phase = phase
+        self.rules = sorted(rules or [], key=lambda x: (x.get("position") is None, x.get("position") or 0))
+
+    @staticmethod
+    def rule(name: str, expression: str, action: str | None = None, enabled: bool = True, position: int | None = None, expression_hash: str | None = None, **items) -> dict:
+        """Build a rule of a pack, hashing its expression if no hash is given (see :func:`Expression.stable_hash`)
+
+        Other items are the JSON items of rules of other phases (see :data:`JSON_HEADER_KEYS`)
+
+        >>> RulePack.rule("Bad Bots", "(cf.client.bot)", "block")
+        >>> {"name": "Bad Bots", "action": "block", "enabled": True, "position": None, "expression": "(cf.client.bot)", "hash": "5d0b0c8f..."}
+        """
+
+        rule = {
+            "name": name,
+            "action": action,
+            "enabled": enabled,
+            "position": position,
+            "expression": expression,
+            "hash": expression_hash or Expression.stable_hash(expression),
+        }
+        rule.update({key: items[key] for key in JSON_HEADER_KEYS if items.get(key) is not None})
+
+        return rule
+
+    @classmethod
+    def load(cls, filename: str) -> "RulePack":
+        """Load a pack file in one read
+
+        :exception Error: If the file is not a rule pack
+
+        >>> pack = RulePack.load("rules.pack.json")
+        """
+
+        if not os.path.isfile(filename):
+            raise Error(f"No such pack '{filename}'")
+
+        with open(filename, "rb") as file:
+            try:
+                data = Utils.decode_json(file.read())
+            except ValueError as e:
+                raise Error(f"Pack '{filename}' is not valid JSON: {e}") from e
+
+        if not isinstance(data, dict) or data.get("format") != PACK_FORMAT:
+            raise Error(f"'{filename}' is not a rule pack")
+        if data.get("version", 0) > PACK_VERSION:
+            raise Error(f"Pack '{filename}' has version {data['version']}, only version {PACK_VERSION} is supported")
+
+        return cls(data["rules"], data.get("phase", CUSTOM_PHASE))
+
+    def save(self, filename: str) -> None:
+        """Save the pack, one rule per line to keep changes readable in diffs
+
+        >>> pack.save("rules.pack.json")
+        """
+
+        rules = ",\n".join(json.dumps(x, ensure_ascii=False) for x in self.rules)
+        header = json.dumps({"format": PACK_FORMAT, "version": PACK_VERSION, "phase": self.phase})
+
+        with open(filename, "w", encoding="utf-8") as file:
+            file.write(f"{header[:-1]}, \"rules\": [\n{rules}\n]}}\n")
+
+    @classmethod
+    def from_folder(cls, directory: str | None = None, phase: str = CUSTOM_PHASE) -> "RulePack":
+        """Build a pack from the expression files of a folder, ordered by file name
+
+        :exception Error: If any expression file is not valid (see :class:`Preflight`)
+
+        >>> pack = RulePack.from_folder("my_expressions")
+        """
+
+        preflight = Preflight(directory)
+        preflight.check(phase=phase)
+
+        rules = []
+        for position, result in enumerate(preflight.check_files(), start=1):
+            header, expression = preflight.utils.read_expression(result["file"])
+            header = header or {}
+
+            rules.append(cls.rule(
+                result["name"],
+                expression,
+                header.get("action"),
+                header.get("enabled", True),
+                position,
+                result["hash"],
+                **{key: header[key] for key in JSON_HEADER_KEYS if key in header},
+            ))
+
+        return cls(rules, phase)
+
+    def to_folder(self, directory: str | None = None) -> Utils:
+        """Write every rule of the pack to an expression file of a folder, with its header
+
+        >>> pack.to_folder("my_expressions")
+        """
+
+        utils = Utils(directory)
+
+        for rule in self.rules:
+            header = {"action": rule["action"], "enabled": rule["enabled"]} if rule["action"] else {"enabled": rule["enabled"]}
+            header.update({key: rule[key] for key in JSON_HEADER_KEYS if key in rule})
+
+            utils.write_expression(rule["name"], rule["expression"], header=header)
+
+        return utils
+
+    @classmethod
+    def from_rules(cls, rules: list[dict], phase: str = CUSTOM_PHASE) -> "RulePack":
+        """Build a pack from the rules of a domain, as returned by :func:`Cloudflare.get_rules`
+
+        >>> pack = RulePack.from_rules(cf.get_rules("example.com")["result"])
+        """
+
+        return cls(
+            [
+                cls.rule(
+                    x["description"],
+                    x["expression"],
+                    x["action"],
+                    x.get("enabled", True),
+                    position,
+                    **{key: x[key] for key in JSON_HEADER_KEYS if key in x},
+                )
+                for position, x in enumerate(rules, start=1)
+            ],
+            phase,
+        )
+
+    def check(self) -> list[str]:
+        """Get the problems of the pack: invalid actions for its phase, duplicated names and positions
+
+        >>> pack.check()
+        >>> ["Invalid action 'blocks' for rule 'Bad Bots' (available actions: managed_challenge, ...)"]
+        """
+
+        actions = PHASE_ACTIONS.get(self.phase)
+
+        if not actions:
+            return [f"Unknown phase '{self.phase}' (available phases: {', '.join(PHASE_ACTIONS)})"]
+
+        problems = []
+        names = set()
+        positions = set()
+        for rule in self.rules:
+            if rule["action"] and rule["action"] not in actions:
+                problems.append(f"Invalid action '{rule['action']}' for rule '{rule['name']}' (available actions: {', '.join(actions)})")
+            if rule["name"] in names:
+                problems.append(f"Rule '{rule['name']}' is in the pack several times")
+            names.add(rule["name"])
+            if rule["position"] is not None:
+                if rule["position"] < 1 or rule["position"] in positions:
+                    problems.append(f"Invalid position {rule['position']} for rule '{rule['name']}' (positions start from 1 and are unique)")
+                positions.add(rule["position"])
+
+        return problems
+
+    @property
+    def names(self) -> list[str]:
+        """Get the names of all rules, in order
+
+        >>> pack.names
+        >>> ["Bad Bots", "Bad IPs"]
+        """
+
+        return [x["name"] for x in self.rules]
+
+    def get(self, name: str) -> dict:
+        """Get a rule by its name
+
+        :exception Error: If the rule is not in the pack
+
+        >>> pack.get("Bad Bots")
+        >>> {"name": "Bad Bots", "action": "block", "enabled": True, "position": 1, "expression": "...", "hash": "5d0b0c8f..."}
+        """
+
+        rule = next((x for x in self.rules if x["name"] == name), None)
+
+        if not rule:
+            raise Error(f"No rule '{name}' in the pack")
+
+        return rule
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.rules)
+
+    def __len__(self) -> int:
+        return len(self.rules)
@@ -0,0 +1,173 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .error import Error
+from .expression import Expression
+from .utils import CUSTOM_PHASE, PHASE_ACTIONS, Utils
+
+# Folders bigger than this size are checked on a process pool, smaller ones are faster to check in place
+PARALLEL_THRESHOLD = 1 << 20
+
+
+def _check_file(directory: str, file: str) -> dict:
+    lines = Utils.read_lines(os.path.join(directory, file))
+
+    first_line = next(lines, "")
+    header, errors = Utils.parse_header(first_line.strip())
+
+    # The header is a comment for the parser, so line numbers of errors are the ones of the file
+    try:
+        expression_hash = Expression(itertools.chain([first_line], lines)).hash
+    except Error as e:
+        errors.append(f"Expression is not valid: {e}")
+        expression_hash = None
+
+    return {
+        "file": file,
+        "name": file.removesuffix(".txt"),
+        "header": header,
+        "hash": expression_hash,
+        "errors": errors,
+    }
+
+
+class Preflight:
+    def __init__(self, directory: str | None = None, cache: dict | None = None) -> None:
+        """Validate all expression files of a folder locally, before any request is sent
+
+        * cache -> Dictionary kept between instances, files not modified since their last check are not checked again
+
+        :exception Error: If the folder does not exist
+
+        >>> preflight = Preflight("my_expressions")
+        """
+
+        self.utils = Utils(directory, create=False)
+
+        if not os.path.isdir(self.utils.directory):
+            raise Error(f"No folder '{self.utils.directory}'")
+
+        self.files = sorted(x for x in os.listdir(self.utils.directory) if x.endswith(".txt"))
+        self.cache = cache if cache is not None else {}
+
+        self._results = None
+
+    def check_files(self, workers: int | None = None) -> list[dict]:
+        """Check the header and expression of every file, computed once
+
+        Big folders are checked on a process pool using all cores by default
+
+        >>> preflight.check_files()
+        >>> [{"file": "Bad Bots.txt", "name": "Bad Bots", "header": {"action": "block"}, "hash": "9f86d081...", "errors": []}, ...]
+        """
+
+        if self._results is None:
+            paths = {x: os.path.join(self.utils.directory, x) for x in self.files}
+            stats = {x: os.stat(path) for x, path in paths.items()}
+            versions = {x: (stat.st_mtime_ns, stat.st_size) for x, stat in stats.items()}
+
+            missing = [x for x in self.files if self.cache.get(paths[x], (None,))[0] != versions[x]]
+
+            workers = workers or os.cpu_count() or 1
+            size = sum(stats[x].st_size for x in missing)
+
+            if workers > 1 and len(missing) > 1 and size >= PARALLEL_THRESHOLD:
+                with ProcessPoolExecutor(min(workers, len(missing))) as executor:
+                    results = list(executor.map(_check_file, itertools.repeat(self.utils.directory), missing))
+            else:
+                results = [_check_file(self.utils.directory, x) for x in missing]
+
+            for file, result in zip(missing, results):
+                self.cache[paths[file]] = (versions[file], result)
+
+            self._results = [self.cache[paths[x]][1] for x in self.files]
+
+        return self._results
+
+    def run(self, remote_rules: list[dict] | None = None, max_rules: int | None = None, action: str | None = None, workers: int | None = None, phase: str = CUSTOM_PHASE) -> dict:
+        """Validate the folder and plan the rules to create, without stopping at the first error
+
+        * remote_rules -> Rules of the domain, as returned by :func:`Cloudflare.get_rules`, \
+        files with the same name are skipped
+        * max_rules -> Maximum number of rules of the plan, the rules to create must fit in it
+        * action -> Action overriding the header of every file
+        * phase -> Phase of the rules, the actions must be available in it (see :data:`PHASE_ACTIONS`)
+
+        >>> preflight.run(cf.get_rules("example.com")["result"], cf.max_rules)
+        >>> {"files": 4, "create": ["Bad AS.txt"], "skip": {"Bad IP.txt": "Bad IP", ...}, "errors": [{"file": "Bad Bots.txt", "error": "Invalid action 'blocks' ..."}]}
+        """
+
+        errors = []
+        actions = PHASE_ACTIONS.get(phase)
+
+        if not actions:
+            raise Error(f"Unknown phase '{phase}' (available phases: {', '.join(PHASE_ACTIONS)})")
+
+        if action and action not in actions:
+            errors.append({"file": None, "error": f"Invalid action '{action}' for phase {phase} (available actions: {', '.join(actions)})"})
+
+        results = self.check_files(workers)
+
+        for result in results:
+            errors.extend({"file": result["file"], "error": x} for x in result["errors"])
+            header_action = (result["header"] or {}).get("action")
+            if not action and header_action and header_action not in actions:
+                errors.append({"file": result["file"], "error": f"Invalid action '{header_action}' for phase {phase} (available actions: {', '.join(actions)})"})
+
+        # Rules only differing by their case would share a file on case-insensitive file systems
+        files_by_name = {}
+        for result in results:
+            files_by_name.setdefault(result["name"].lower(), []).append(result["file"])
+        for files in files_by_name.values():
+            for file in files[1:]:
+                errors.append({"file": file, "error": f"Same name as '{files[0]}' on case-insensitive file systems"})
+
+        remote_rules = remote_rules or []
+        remote_names = {x["description"] for x in remote_rules}
+
+        # A created rule must not be exported to the file of another remote rule
+        for rule_name in remote_names:
+            escaped = self.utils.escape(rule_name).lower()
+            for result in results:
+                if result["name"] not in remote_names and result["name"].lower() == escaped:
+                    errors.append({"file": result["file"], "error": f"Would be exported to the same file as remote rule '{rule_name}'"})
+
+        create = []
+        skip = {}
+        for result in results:
+            # A rule with the same expression but another name, action or enabled state is a different rule
+            if result["name"] in remote_names:
+                skip[result["file"]] = result["name"]
+            else:
+                create.append(result["file"])
+
+        if max_rules is not None and len(remote_rules) + len(create) > max_rules:
+            errors.append({
+                "file": None,
+                "error": f"Cannot create {len(create)} rules ({len(remote_rules)} used / {max_rules} available), "
+                         "if you have a better plan, please register the domain plan using cf.set_plan(\"<your-domain>\")",
+            })
+
+        return {
+            "files": len(results),
+            "create": create,
+            "skip": skip,
+            "errors": errors,
+        }
+
+    def check(self, remote_rules: list[dict] | None = None, max_rules: int | None = None, action: str | None = None, workers: int | None = None, phase: str = CUSTOM_PHASE) -> dict:
+        """Same as :func:`run`, raising all errors at once
+
+        :exception Error: If any file is not valid or the rules to create do not fit in the plan
+
+        >>> preflight.check(action="block")
+        """
+
+        report = self.run(remote_rules, max_rules, action, workers, phase)
+
+        if report["errors"]:
+            messages = [f"{x['file']}: {x['error']}" if x["file"] else x["error"] for x in report["errors"]]
+            raise Error(f"{len(messages)} error(s) found in folder '{self.utils.directory}':\n\t" + "\n\t".join(messages))
+
+        return report
@@ -0,0 +1,210 @@
+import gzip
+import json
+import os
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+
+from .error import Error
+from .expression import Expression
+from .utils import Utils
+
+# Cloudflare fields mapped to the fields of Logpush HTTP requests logs
+LOGPUSH_FIELDS = {
+    "http.host": "ClientRequestHost",
+    "http.referer": "ClientRequestReferer",
+    "http.request.method": "ClientRequestMethod",
+    "http.request.uri": "ClientRequestURI",
+    "http.request.uri.path": "ClientRequestPath",
+    "http.request.uri.query": "ClientRequestQuery",
+    "http.request.version": "ClientRequestProtocol",
+    "http.user_agent": "ClientRequestUserAgent",
+    "ip.src": "ClientIP",
+    "ip.src.asnum": "ClientASN",
+    "ip.src.country": "ClientCountry",
+    "ip.geoip.asnum": "ClientASN",
+    "ip.geoip.country": "ClientCountry",
+    "cf.bot_management.score": "BotScore",
+    "cf.waf.score": "WAFAttackScore",
+}
+
+# Rules compiled once in every worker process
+_rules = {}
+_fields = {}
+_samples = 0
+
+
+def _init_worker(rules: dict[str, str], fields: dict[str, str], samples: int) -> None:
+    # pylint: disable=global-statement
+    global _rules, _fields, _samples
+
+    _rules = {name: Expression(expression) for name, expression in rules.items()}
+    used_fields = set().union(*(x.fields for x in _rules.values()))
+    _fields = {x: fields[x] for x in used_fields if x in fields}
+    _samples = samples
+
+
+def _replay_chunk(lines: list[bytes]) -> dict:
+    requests = 0
+    invalid = 0
+    hits = Counter()
+    overlaps = Counter()
+    samples = {}
+
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            invalid += 1
+            continue
+
+        requests += 1
+        request = {name: record.get(logpush_name) for name, logpush_name in _fields.items()}
+
+        matched = [name for name, expression in _rules.items() if expression.evaluate(request)]
+
+        for name in matched:
+            hits[name] += 1
+            if len(samples.setdefault(name, [])) < _samples:
+                samples[name].append(record)
+
+        overlaps.update(combinations(matched, 2))
+
+    return {
+        "requests": requests,
+        "invalid": invalid,
+        "hits": hits,
+        "overlaps": overlaps,
+        "samples": samples,
+    }
+
+
+class Replay:
+    def __init__(self, directory: str | None = None, fields: dict[str, str] | None = None, samples: int = 5) -> None:
+        """Replay HTTP requests logs against local expressions to measure their impact before deploying them
+
+        Works fully offline, on the expressions exported with :func:`Cloudflare.export_rules`
+
+        * fields -> Cloudflare fields mapped to the log fields, Logpush HTTP requests fields by default
+        * samples -> Maximum number of matching requests kept for every rule
+
+        Fields used by a rule but missing from the logs never match, they are listed in :attr:`unavailable`
+        and in the report of :func:`run`
+
+        :exception Error: If the folder does not exist or an expression cannot be evaluated locally
+
+        >>> replay = Replay("my_expressions")
+        """
+
+        self.utils = Utils(directory, create=False)
+
+        if not os.path.isdir(self.utils.directory):
+            raise Error(f"No folder '{self.utils.directory}'")
+
+        self.fields = fields or LOGPUSH_FIELDS
+        self.samples = samples
+
+        self.rules = {}
+        for file in sorted(os.listdir(self.utils.directory)):
+            if file.endswith(".txt"):
+                _, expression = self.utils.read_expression(file)
+                self.rules[file.removesuffix(".txt")] = expression
+
+        # Fields of every rule that the logs cannot provide
+        self.unavailable = {}
+
+        # Check every rule before starting any worker
+        for name, expression in self.rules.items():
+            try:
+                parsed = Expression(expression)
+                parsed.evaluate({})
+            except Error as e:
+                raise Error(f"Rule '{name}' cannot be replayed: {e}") from e
+
+            if missing := sorted(parsed.fields - set(self.fields)):
+                self.unavailable[name] = missing
+                print(f"Rule '{name}' uses fields missing from the logs, never matching: {', '.join(missing)}")
+
+    @staticmethod
+    def read_chunks(log_file: str, chunk_size: int) -> Iterator[list[bytes]]:
+        """Read a NDJSON log file, gzip compressed or not, chunk by chunk of lines"""
+
+        opener = gzip.open if log_file.endswith(".gz") else open
+
+        with opener(log_file, "rb") as file:
+            chunk = []
+            for line in file:
+                if line.strip():
+                    chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def run(self, log_files: str | list[str], chunk_size: int = 10000, workers: int | None = None) -> dict:
+        """Replay log files against all rules, on a process pool using all cores by default
+
+        Memory stays bounded: at most two chunks per worker are read ahead
+
+        >>> replay.run(["logs/20250101.log.gz", "logs/20250102.log.gz"])
+        >>> {"requests": 120000, "invalid": 0, "rules": {"Bad Bots": {"hits": 1520, "rate": 0.0127, "samples": [...]}, ...}, "overlaps": {"Bad Bots": {"Bad Bots lib": 12}, ...}, "unavailable": {"Bad IP": ["cf.threat_score"]}}
+        """
+
+        if isinstance(log_files, str):
+            log_files = [log_files]
+
+        workers = workers or os.cpu_count() or 1
+
+        requests = 0
+        invalid = 0
+        hits = Counter()
+        overlaps = Counter()
+        samples = {x: [] for x in self.rules}
+
+        def merge(result: dict) -> None:
+            nonlocal requests, invalid
+
+            requests += result["requests"]
+            invalid += result["invalid"]
+            hits.update(result["hits"])
+            overlaps.update(result["overlaps"])
+            for name, records in result["samples"].items():
+                samples[name].extend(records[:self.samples - len(samples[name])])
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.rules, self.fields, self.samples)) as executor:
+            pending = set()
+
+            for log_file in log_files:
+                print(f"Replaying {log_file}...")
+
+                for chunk in self.read_chunks(log_file, chunk_size):
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            merge(future.result())
+
+                    pending.add(executor.submit(_replay_chunk, chunk))
+
+            for future in wait(pending).done:
+                merge(future.result())
+
+        report_overlaps = {}
+        for (a, b), count in overlaps.items():
+            report_overlaps.setdefault(a, {})[b] = count
+
+        return {
+            "requests": requests,
+            "invalid": invalid,
+            "rules": {
+                name: {
+                    "hits": hits[name],
+                    "rate": hits[name] / requests if requests else 0,
+                    "samples": samples[name],
+                }
+                for name in self.rules
+            },
+            "overlaps": report_overlaps,
+            "unavailable": self.unavailable,
+        }
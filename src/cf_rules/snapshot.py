@@ -0,0 +1,281 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+from datetime import datetime, timezone
+
+from .error import Error
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Extensions of the archives by compression
+COMPRESSIONS = {"gz": ".tar.gz", "zstd": ".tar.zst"}
+
+
+def _open_archive(filename: str, file: io.IOBase) -> tarfile.TarFile:
+    """Open a streaming tar archive for reading, compressed with gzip or zstd depending on its extension"""
+
+    if filename.endswith(COMPRESSIONS["zstd"]):
+        if zstandard is None:
+            raise Error("zstandard is required for zstd archives, install it using pip install zstandard")
+        return tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(file), mode="r|")
+
+    return tarfile.open(fileobj=file, mode="r|gz")
+
+
+class SnapshotWriter:
+    def __init__(self, snapshots: "Snapshots") -> None:
+        """Snapshot being written, see :func:`Snapshots.create`"""
+
+        self.snapshots = snapshots
+        self.previous = snapshots.latest
+
+        created = datetime.now(timezone.utc)
+        self.name = created.strftime("%Y%m%dT%H%M%S%fZ")
+        self.archive = f"snapshot-{self.name}{COMPRESSIONS[snapshots.compression]}"
+
+        self.index = {
+            "name": self.name,
+            "archive": self.archive,
+            "created": created.isoformat().replace("+00:00", "Z"),
+            "parent": self.previous["name"] if self.previous else None,
+            "zones": {},
+            "stats": {"zones": 0, "rulesets": 0, "written": 0, "reused": 0},
+        }
+
+        self._filename = os.path.join(snapshots.directory, self.archive)
+        self._file = open(self._filename + ".part", "wb")
+
+        if snapshots.compression == "zstd":
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._file, closefd=False)
+            self._tar = tarfile.open(fileobj=self._stream, mode="w|")
+        else:
+            self._stream = None
+            self._tar = tarfile.open(fileobj=self._file, mode="w|gz")
+
+    def _zone(self, domain_name: str, zone_id: str) -> dict:
+        if domain_name not in self.index["zones"]:
+            self.index["zones"][domain_name] = {"zone_id": zone_id, "rulesets": {}}
+            self.index["stats"]["zones"] += 1
+
+        return self.index["zones"][domain_name]
+
+    def _add_member(self, member: str, data: bytes) -> None:
+        info = tarfile.TarInfo(member)
+        info.size = len(data)
+        info.mtime = int(datetime.now(timezone.utc).timestamp())
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def reuse(self, domain_name: str, zone_id: str, ruleset: dict) -> bool:
+        """Reference the ruleset of the previous snapshot if it has the same version, without its rules
+
+        >>> snapshot.reuse("example.com", "a1b2c3", {"id": "d4e5f6", "phase": "http_request_firewall_custom", "version": "12"})
+        >>> True
+        """
+
+        if not self.previous:
+            return False
+
+        entry = self.previous["zones"].get(domain_name, {}).get("rulesets", {}).get(ruleset["phase"])
+
+        if not entry or entry["id"] != ruleset["id"] or entry["version"] != ruleset.get("version"):
+            return False
+
+        self._zone(domain_name, zone_id)["rulesets"][ruleset["phase"]] = entry
+        self.index["stats"]["rulesets"] += 1
+        self.index["stats"]["reused"] += 1
+
+        return True
+
+    def add(self, domain_name: str, zone_id: str, ruleset: dict) -> None:
+        """Write a ruleset with its rules in the archive
+
+        >>> snapshot.add("example.com", "a1b2c3", cf.get_phase_ruleset("example.com"))
+        """
+
+        data = json.dumps(ruleset, sort_keys=True).encode("utf-8")
+        member = f"zones/{domain_name}/{ruleset['phase']}.json"
+
+        self._add_member(member, data)
+
+        self._zone(domain_name, zone_id)["rulesets"][ruleset["phase"]] = {
+            "id": ruleset["id"],
+            "version": ruleset.get("version"),
+            "hash": hashlib.sha256(data).hexdigest(),
+            "archive": self.archive,
+            "member": member,
+        }
+        self.index["stats"]["rulesets"] += 1
+        self.index["stats"]["written"] += 1
+
+    def close(self) -> None:
+        """Write the index in the archive and register the snapshot"""
+
+        self._add_member("index.json", json.dumps(self.index, indent=4).encode("utf-8"))
+        self._tar.close()
+        # The tar archive does not close the zstd stream, which writes the end of its frame on close
+        if self._stream:
+            self._stream.close()
+        self._file.close()
+
+        os.replace(self._filename + ".part", self._filename)
+        self.snapshots._register(self.index)  # pylint: disable=protected-access
+
+    def abort(self) -> None:
+        """Drop the archive being written, the snapshot is not registered"""
+
+        self._tar.close()
+        if self._stream:
+            self._stream.close()
+        self._file.close()
+
+        os.remove(self._filename + ".part")
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class Snapshots:
+    def __init__(self, directory: str | None = None, compression: str = "gz") -> None:
+        """Incremental snapshots of the rulesets of many zones, each one a streaming compressed tar archive
+
+        Every archive holds the rulesets changed since the previous snapshot (by ruleset version)
+        and a JSON index of all zones, telling which archive holds each ruleset.
+        The indexes of all snapshots are also kept in the "index.json" file of the folder.
+
+        * compression -> "gz" (default) or "zstd" (requires zstandard, pip install zstandard)
+
+        >>> snapshots = Snapshots("my_backups", compression="zstd")
+        """
+
+        if compression not in COMPRESSIONS:
+            raise Error(f"Unknown compression '{compression}' (available compressions: {', '.join(COMPRESSIONS)})")
+
+        if compression == "zstd" and zstandard is None:
+            raise Error("zstandard is required for zstd archives, install it using pip install zstandard")
+
+        self.directory = directory or "snapshots"
+        self.compression = compression
+        self.catalog = os.path.join(self.directory, "index.json")
+
+        if not os.path.isdir(self.directory):
+            os.mkdir(self.directory)
+
+    @property
+    def snapshots(self) -> list[dict]:
+        """Get the indexes of all snapshots, oldest first
+
+        >>> snapshots.snapshots
+        >>> [{"name": "20250101T000000000000Z", "archive": "snapshot-20250101T000000000000Z.tar.gz", "zones": {...}, ...}, ...]
+        """
+
+        if not os.path.isfile(self.catalog):
+            return []
+
+        with open(self.catalog, "r", encoding="utf-8") as file:
+            return json.load(file)["snapshots"]
+
+    @property
+    def latest(self) -> dict | None:
+        """Get the index of the last snapshot, None if there is no snapshot
+
+        >>> snapshots.latest["name"]
+        >>> "20250102T000000000000Z"
+        """
+
+        snapshots = self.snapshots
+
+        return snapshots[-1] if snapshots else None
+
+    def _register(self, index: dict) -> None:
+        snapshots = self.snapshots + [index]
+
+        with open(self.catalog + ".part", "w", encoding="utf-8") as file:
+            json.dump({"snapshots": snapshots}, file, indent=4)
+
+        os.replace(self.catalog + ".part", self.catalog)
+
+    def get(self, name: str | None = None) -> dict:
+        """Get the index of a snapshot by its name, the last one by default
+
+        :exception Error: If the snapshot is not found
+
+        >>> snapshots.get("20250101T000000000000Z")
+        >>> {"name": "20250101T000000000000Z", "parent": None, "zones": {"example.com": {"zone_id": "a1b2c3", "rulesets": {...}}}, ...}
+        """
+
+        index = next((x for x in self.snapshots if x["name"] == name), None) if name else self.latest
+
+        if not index:
+            raise Error(f"No snapshot '{name or 'latest'}' in folder '{self.directory}'")
+
+        return index
+
+    def create(self) -> SnapshotWriter:
+        """Start a new snapshot, only registered once closed without error
+
+        >>> with snapshots.create() as snapshot:
+        >>>     if not snapshot.reuse("example.com", zone_id, summary):
+        >>>         snapshot.add("example.com", zone_id, ruleset)
+        """
+
+        return SnapshotWriter(self)
+
+    def read(self, domain_name: str, name: str | None = None) -> dict:
+        """Read the rulesets of a zone in a snapshot, the last one by default
+
+        Each archive holding a ruleset of the zone is only read once, up to its last needed member
+
+        :exception Error: If the zone is not in the snapshot or an archive is missing or altered
+
+        >>> snapshots.read("example.com")
+        >>> {"http_request_firewall_custom": {"id": "d4e5f6", "version": "12", "rules": [...], ...}, ...}
+        """
+
+        index = self.get(name)
+        zone = index["zones"].get(domain_name)
+
+        if not zone:
+            raise Error(f"No zone '{domain_name}' in snapshot '{index['name']}'")
+
+        members = {}
+        for phase, entry in zone["rulesets"].items():
+            members.setdefault(entry["archive"], {})[entry["member"]] = (phase, entry["hash"])
+
+        rulesets = {}
+        for archive, wanted in members.items():
+            filename = os.path.join(self.directory, archive)
+
+            if not os.path.isfile(filename):
+                raise Error(f"Archive '{archive}' of snapshot '{index['name']}' is missing")
+
+            with open(filename, "rb") as file, _open_archive(archive, file) as tar:
+                for info in tar:
+                    if info.name not in wanted:
+                        continue
+
+                    phase, expected_hash = wanted.pop(info.name)
+                    data = tar.extractfile(info).read()
+
+                    if hashlib.sha256(data).hexdigest() != expected_hash:
+                        raise Error(f"Member '{info.name}' of archive '{archive}' does not match its hash")
+
+                    rulesets[phase] = json.loads(data)
+
+                    if not wanted:
+                        break
+
+            if wanted:
+                raise Error(f"Archive '{archive}' does not hold {', '.join(wanted)}")
+
+        return rulesets
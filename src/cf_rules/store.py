@@ -0,0 +1,175 @@
+import json
+import os
+from collections import Counter
+
+from .error import Error
+from .expression import Expression
+from .utils import JSON_HEADER_KEYS
+
+
+class RuleStore:
+    def __init__(self, directory: str | None = None) -> None:
+        """Content-addressed store of rule expressions shared by several zones
+
+        Every distinct expression is saved once in the "objects" folder, named by its hash.
+        Each zone gets a manifest in the "zones" folder mapping its rule names to these hashes.
+
+        >>> store = RuleStore("my_store")
+        """
+
+        self.directory = directory or "store"
+
+        self.objects_directory = f"{self.directory}/objects"
+        self.zones_directory = f"{self.directory}/zones"
+
+        for folder in (self.directory, self.objects_directory, self.zones_directory):
+            if not os.path.isdir(folder):
+                os.mkdir(folder)
+
+    @staticmethod
+    def hash(expression: str) -> str:
+        """Get the hash of an expression, used as its key in the store
+
+        Based on :func:`Expression.stable_hash`, so formatting changes keep the same hash
+
+        >>> store.hash("(cf.client.bot)")
+        >>> "5d0b0c8f..."
+        """
+
+        return Expression.stable_hash(expression)
+
+    def put(self, expression: str) -> str:
+        """Save an expression in the store if it is not already there and return its hash
+
+        >>> store.put("(cf.client.bot)")
+        >>> "5d0b0c8f..."
+        """
+
+        expression_hash = self.hash(expression)
+        filename = f"{self.objects_directory}/{expression_hash}.txt"
+
+        if not os.path.isfile(filename):
+            with open(filename, "w", encoding="utf-8") as file:
+                file.write(expression)
+
+        return expression_hash
+
+    def get(self, expression_hash: str) -> str:
+        """Get an expression from the store by its hash
+
+        :exception Error: If the hash is not in the store
+
+        >>> store.get("5d0b0c8f...")
+        >>> "(cf.client.bot)"
+        """
+
+        filename = f"{self.objects_directory}/{expression_hash}.txt"
+
+        if not os.path.isfile(filename):
+            raise Error(f"No expression '{expression_hash}' in store '{self.directory}'")
+
+        with open(filename, "r", encoding="utf-8") as file:
+            return file.read()
+
+    def write_manifest(self, domain_name: str, rules: dict, zone_id: str | None = None) -> None:
+        """Write the manifest of a zone, rules are kept in their remote order
+
+        >>> store.write_manifest("example.com", {"Bad Bots": {"hash": "5d0b0c8f...", "action": "block", "enabled": True}})
+        """
+
+        manifest = {
+            "zone": domain_name,
+            "zone_id": zone_id,
+            "rules": rules,
+        }
+
+        with open(f"{self.zones_directory}/{domain_name}.json", "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=4)
+
+    def read_manifest(self, domain_name: str) -> dict:
+        """Read the manifest of a zone
+
+        :exception Error: If the zone has never been exported to the store
+
+        >>> store.read_manifest("example.com")
+        >>> {"zone": "example.com", "zone_id": "a1b2c3", "rules": {"Bad Bots": {"hash": "5d0b0c8f...", ...}}}
+        """
+
+        filename = f"{self.zones_directory}/{domain_name}.json"
+
+        if not os.path.isfile(filename):
+            raise Error(f"No manifest for '{domain_name}' in store '{self.directory}'")
+
+        with open(filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    @property
+    def zones(self) -> list[str]:
+        """Get all zones having a manifest in the store
+
+        >>> store.zones
+        >>> ["example.com", "example.fr"]
+        """
+
+        return sorted(x.removesuffix(".json") for x in os.listdir(self.zones_directory) if x.endswith(".json"))
+
+    @staticmethod
+    def signature(rule: dict) -> dict:
+        """Get what makes two rules of a manifest the same: expression hash, action, enabled state and JSON items
+        (see :data:`JSON_HEADER_KEYS`)
+
+        >>> store.signature({"id": "f1e2d3", "hash": "5d0b0c8f...", "action": "block", "enabled": True})
+        >>> {"hash": "5d0b0c8f...", "action": "block", "enabled": True}
+        """
+
+        signature = {
+            "hash": rule["hash"],
+            "action": rule.get("action"),
+            "enabled": rule.get("enabled", True),
+        }
+        signature.update({key: rule[key] for key in JSON_HEADER_KEYS if rule.get(key) is not None})
+
+        return signature
+
+    def drift(self, domain_names: list[str] | None = None) -> dict:
+        """Compare the rules of several zones as a zones × rules matrix
+
+        For every rule name, the reference is the signature shared by most zones (see :func:`RuleStore.signature`).
+        Each cell is "identical" (same signature as the reference), "differing" or "missing".
+
+        >>> store.drift(["example.com", "example.fr"])
+        >>> {"zones": [...], "rules": ["Bad Bots", ...], "reference": {"Bad Bots": {"hash": "5d0b0c8f...", "action": "block", "enabled": True}}, "matrix": {"example.com": {"Bad Bots": "identical", ...}, ...}}
+        """
+
+        domain_names = domain_names or self.zones
+        manifests = {x: self.read_manifest(x)["rules"] for x in domain_names}
+
+        rule_names = []
+        for rules in manifests.values():
+            rule_names.extend(x for x in rules if x not in rule_names)
+
+        reference = {}
+        for rule_name in rule_names:
+            signatures = Counter(
+                json.dumps(self.signature(rules[rule_name]), sort_keys=True)
+                for rules in manifests.values() if rule_name in rules
+            )
+            reference[rule_name] = json.loads(signatures.most_common(1)[0][0])
+
+        matrix = {}
+        for domain_name, rules in manifests.items():
+            matrix[domain_name] = {}
+            for rule_name in rule_names:
+                if rule_name not in rules:
+                    matrix[domain_name][rule_name] = "missing"
+                elif self.signature(rules[rule_name]) == reference[rule_name]:
+                    matrix[domain_name][rule_name] = "identical"
+                else:
+                    matrix[domain_name][rule_name] = "differing"
+
+        return {
+            "zones": list(manifests),
+            "rules": rule_names,
+            "reference": reference,
+            "matrix": matrix,
+        }
@@ -0,0 +1,677 @@
+import json
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from .error import Error
+from .expression import Expression
+
+API_URL = "https://api.cloudflare.com/client/v4"
+
+
+class Transport:
+    """Base class of the HTTP backends used by :class:`Cloudflare` to send requests"""
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> object:
+        """Send a request and return a response having a json() method, and a content attribute
+        holding the raw body if possible (decoded faster, see :func:`Utils.decode_json`)
+
+        >>> transport.request("GET", "https://api.cloudflare.com/client/v4/zones", headers=headers, timeout=5).json()
+        >>> {"success": True, "result": [...], ...}
+        """
+
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Close all connections of the transport"""
+
+
+class RequestsTransport(Transport):
+    def __init__(self) -> None:
+        """Transport using requests, with a session keeping connections open between requests
+
+        >>> cf = Cloudflare(transport=RequestsTransport())
+        """
+
+        # pylint: disable=import-outside-toplevel
+        import requests
+
+        self.session = requests.Session()
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> object:
+        return self.session.request(method, url, headers=headers, json=json, timeout=timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class HTTP2Transport(Transport):
+    def __init__(self, max_connections: int = 1) -> None:
+        """Transport using httpx with HTTP/2, requests sent concurrently from several threads
+        are multiplexed over the same connection
+
+        Requires httpx with HTTP/2 support (pip install httpx[http2])
+
+        :exception Error: If httpx is not installed
+
+        >>> cf = Cloudflare(transport=HTTP2Transport())
+        """
+
+        try:
+            # pylint: disable=import-outside-toplevel
+            import httpx
+        except ImportError as e:
+            raise Error("httpx is required for HTTP/2, install it using pip install httpx[http2]") from e
+
+        self.client = httpx.Client(http2=True, limits=httpx.Limits(max_connections=max_connections))
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> object:
+        return self.client.request(method, url, headers=headers, json=json, timeout=timeout)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class AdaptiveTransport(Transport):
+    def __init__(
+        self,
+        transport: Transport | None = None,
+        percentile: float = 0.99,
+        factor: float = 2.0,
+        min_timeout: float = 1.0,
+        max_timeout: float = 30.0,
+        hedge: bool = False,
+        hedge_percentile: float = 0.9,
+        hedge_budget: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+    ) -> None:
+        """Transport wrapping another one, with timeouts adapted to the observed latency of each endpoint
+
+        Endpoints are the method and path of requests, without their ids ("GET /zones/:id/rulesets").
+        Once an endpoint has min_samples latencies, its timeout is the percentile of its last latencies
+        times factor, between min_timeout and max_timeout. Before that, the timeout of the request is used.
+
+        * hedge -> Send a duplicate of slow GET requests (idempotent) after the hedge_percentile of their latency, \
+        the first response is used
+        * hedge_budget -> Maximum ratio of duplicated requests over all requests, to stay within the rate limits
+
+        >>> cf = Cloudflare(transport=AdaptiveTransport(HTTP2Transport(max_connections=2), hedge=True))
+        """
+
+        self.transport = transport or RequestsTransport()
+        self.percentile = percentile
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.window = window
+        self.min_samples = min_samples
+
+        self.latencies = {}
+        self.requests = 0
+        self.hedges = 0
+
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(thread_name_prefix="cf_rules_hedge") if hedge else None
+
+    @staticmethod
+    def endpoint(method: str, url: str) -> str:
+        """Get the endpoint of a request, ids and query removed
+
+        >>> AdaptiveTransport.endpoint("GET", "https://api.cloudflare.com/client/v4/zones/023e105f4ecef8ad9ca31a8372d0c353/rulesets?page=2")
+        >>> "GET /zones/:id/rulesets"
+        """
+
+        path = urllib.parse.urlsplit(url).path.removeprefix(urllib.parse.urlsplit(API_URL).path)
+
+        return f"{method} " + re.sub(r"/[0-9a-f]{32}(?=/|$)", "/:id", path)
+
+    def quantile(self, endpoint: str, percentile: float) -> float | None:
+        """Get a percentile of the last latencies of an endpoint, None while it has less than min_samples
+
+        >>> transport.quantile("GET /zones", 0.5)
+        >>> 0.182
+        """
+
+        with self.lock:
+            latencies = sorted(self.latencies.get(endpoint, ()))
+
+        if len(latencies) < self.min_samples:
+            return None
+
+        return latencies[min(int(percentile * len(latencies)), len(latencies) - 1)]
+
+    def timeout(self, endpoint: str, default: float = 5) -> float:
+        """Get the timeout of an endpoint, see :class:`AdaptiveTransport`
+
+        >>> transport.timeout("GET /zones/:id/rulesets")
+        >>> 1.0
+        """
+
+        latency = self.quantile(endpoint, self.percentile)
+
+        if latency is None:
+            return default
+
+        return min(max(latency * self.factor, self.min_timeout), self.max_timeout)
+
+    def stats(self) -> dict:
+        """Get the latencies and timeout of every endpoint and the number of duplicated requests
+
+        >>> transport.stats()
+        >>> {"requests": 120, "hedges": 3, "endpoints": {"GET /zones": {"count": 20, "p50": 0.18, "p99": 0.95, "timeout": 1.9}, ...}}
+        """
+
+        with self.lock:
+            endpoints = list(self.latencies)
+
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "endpoints": {
+                x: {
+                    "count": len(self.latencies[x]),
+                    "p50": self.quantile(x, 0.5),
+                    f"p{round(self.percentile * 100)}": self.quantile(x, self.percentile),
+                    "timeout": self.timeout(x, None),
+                }
+                for x in endpoints
+            },
+        }
+
+    def _send(self, endpoint: str, method: str, url: str, headers: dict | None, json: dict | None, timeout: float) -> object:
+        """Send a request through the wrapped transport, recording its latency even when it fails"""
+
+        start = time.monotonic()
+        try:
+            return self.transport.request(method, url, headers=headers, json=json, timeout=timeout)
+        finally:
+            with self.lock:
+                self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(time.monotonic() - start)
+
+    def _can_hedge(self) -> bool:
+        with self.lock:
+            if self.hedges + 1 > self.hedge_budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> object:
+        endpoint = self.endpoint(method, url)
+        timeout = self.timeout(endpoint, timeout)
+
+        with self.lock:
+            self.requests += 1
+
+        delay = self.quantile(endpoint, self.hedge_percentile) if self.hedge and method == "GET" else None
+
+        if delay is None:
+            return self._send(endpoint, method, url, headers, json, timeout)
+
+        pending = {self.executor.submit(self._send, endpoint, method, url, headers, json, timeout)}
+        done, pending = wait(pending, timeout=delay)
+
+        if not done and self._can_hedge():
+            pending.add(self.executor.submit(self._send, endpoint, method, url, headers, json, timeout))
+
+        # The first response is used, a failed request only counts if the other one fails too
+        futures = done | pending
+        while True:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+            if not pending:
+                return done.pop().result()
+            futures = pending
+
+    def close(self) -> None:
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        self.transport.close()
+
+
+class RateLimiter:
+    def __init__(self, rate: float = 4, burst: float | None = None) -> None:
+        """Token bucket shared by threads, allowing rate requests per second on average and bursts of burst requests
+
+        The default rate is the global limit of Cloudflare's API (1200 requests per 5 minutes)
+
+        >>> limiter = RateLimiter(rate=4)
+        """
+
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Wait for a token and return the time waited
+
+        >>> limiter.acquire()
+        >>> 0.25
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            # The token is taken now, later callers wait after this one
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if delay:
+            time.sleep(delay)
+
+        return delay
+
+
+class RateLimitedTransport(Transport):
+    def __init__(self, transport: Transport | None = None, limiter: RateLimiter | None = None) -> None:
+        """Transport wrapping another one, waiting for a :class:`RateLimiter` before every request
+
+        Transports sharing the same limiter share its budget
+
+        >>> cf = Cloudflare(transport=RateLimitedTransport(limiter=RateLimiter(rate=2)))
+        """
+
+        self.transport = transport or RequestsTransport()
+        self.limiter = limiter or RateLimiter()
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> object:
+        self.limiter.acquire()
+
+        return self.transport.request(method, url, headers=headers, json=json, timeout=timeout)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class DryRunTransport(Transport):
+    def __init__(self, transport: Transport | None = None) -> None:
+        """Transport recording all requests, only sending reads to the wrapped transport
+
+        Changes (POST, PUT, PATCH, DELETE) are not sent, they succeed with the sent object as result.
+        Reads can be served by a real transport, a :class:`MemoryTransport` or any cached state.
+
+        >>> transport = DryRunTransport(cf.transport)
+        """
+
+        self.transport = transport or RequestsTransport()
+        self.calls = []
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> object:
+        self.calls.append((method, url, json))
+
+        if method == "GET":
+            return self.transport.request(method, url, headers=headers, json=json, timeout=timeout)
+
+        result = {**json, "id": json.get("id") or uuid.uuid4().hex} if json is not None else None
+
+        return MemoryResponse(200, {"success": True, "errors": [], "messages": [], "result": result})
+
+    def report(self, concurrency: int = 1, latency: float = 0.25, rate: float = 4) -> dict:
+        """Count the recorded requests by endpoint and estimate their duration
+
+        * concurrency -> Requests sent in parallel
+        * latency -> Average duration of a request in seconds
+        * rate -> Requests per second allowed by the API (1200 requests per 5 minutes)
+
+        >>> transport.report(concurrency=4)
+        >>> {"calls": 12, "reads": 8, "writes": 4, "endpoints": {"GET /zones": 2, ...}, "duration": 3.0, "rate_windows": 1}
+        """
+
+        endpoints = {}
+        for method, url, _ in self.calls:
+            endpoint = AdaptiveTransport.endpoint(method, url)
+            endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+
+        reads = sum(1 for method, _, _ in self.calls if method == "GET")
+
+        return {
+            "calls": len(self.calls),
+            "reads": reads,
+            "writes": len(self.calls) - reads,
+            "endpoints": endpoints,
+            # Parallel requests are limited by the rate of the API
+            "duration": round(max(len(self.calls) * latency / concurrency, len(self.calls) / rate), 2),
+            # Windows of 5 minutes needed to stay within the rate limit
+            "rate_windows": -(-len(self.calls) // round(rate * 300)),
+        }
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class MemoryResponse:
+    def __init__(self, status_code: int, data: dict) -> None:
+        """Response of :class:`MemoryTransport`, decoded again on every json() call like a real response"""
+
+        self.status_code = status_code
+        self.content = json.dumps(data).encode("utf-8")
+
+    def json(self) -> dict:
+        return json.loads(self.content)
+
+
+class MemoryTransport(Transport):
+    def __init__(self) -> None:
+        """In-memory stand-in of Cloudflare's API serving zones, rulesets and rules without any socket
+
+        Every request is recorded in the calls attribute
+
+        >>> transport = MemoryTransport()
+        >>> transport.add_zone("example.com", plan="pro", rules=[{"description": "Bad IPs", "expression": "(cf.threat_score ge 1)", "action": "block"}])
+        >>> cf = Cloudflare(transport=transport)
+        """
+
+        self.zones = {}
+        self.accounts = set()
+        self.rulesets = {}
+        self.calls = []
+
+        # Rulesets belong to a zone or an account, their routes only differ by this prefix
+        owner = r"(zones|accounts)/(\w+)"
+
+        self.routes = [
+            ("GET", r"/user", self.get_user),
+            ("GET", r"/user/tokens/verify", self.verify_token),
+            ("GET", r"/zones", self.list_zones),
+            ("GET", rf"/{owner}/rulesets", self.list_rulesets),
+            ("POST", r"/(accounts)/(\w+)/rulesets", self.create_ruleset),
+            ("GET", rf"/{owner}/rulesets/phases/(\w+)/entrypoint", self.get_entrypoint),
+            ("PUT", rf"/{owner}/rulesets/phases/(\w+)/entrypoint", self.update_entrypoint),
+            ("GET", rf"/{owner}/rulesets/(\w+)", self.get_ruleset),
+            ("PUT", rf"/{owner}/rulesets/(\w+)", self.update_ruleset),
+            ("POST", rf"/{owner}/rulesets/(\w+)/rules", self.create_rule),
+            ("PATCH", rf"/{owner}/rulesets/(\w+)/rules/(\w+)", self.update_rule),
+            ("DELETE", rf"/{owner}/rulesets/(\w+)/rules/(\w+)", self.delete_rule),
+        ]
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+    @staticmethod
+    def success(result: object, status_code: int = 200, result_info: dict | None = None) -> MemoryResponse:
+        data = {"success": True, "errors": [], "messages": [], "result": result}
+        if result_info:
+            data["result_info"] = result_info
+        return MemoryResponse(status_code, data)
+
+    @staticmethod
+    def failure(status_code: int, code: int, message: str) -> MemoryResponse:
+        return MemoryResponse(status_code, {"success": False, "errors": [{"code": code, "message": message}], "messages": [], "result": None})
+
+    def add_zone(self, name: str, plan: str = "free", rules: list[dict] | None = None, account_id: str = "a1b2c3", status: str = "active") -> dict:
+        """Add a zone with its custom ruleset and rules
+
+        >>> transport.add_zone("example.com", plan="pro")
+        >>> {"id": "9f86d081...", "name": "example.com", "plan": {"legacy_id": "pro", ...}, ...}
+        """
+
+        zone = {
+            "id": self.new_id(),
+            "name": name,
+            "status": status,
+            "plan": {"legacy_id": plan, "name": plan.title() + " Website"},
+            "account": {"id": account_id, "name": account_id},
+            "name_servers": ["ada.ns.cloudflare.com", "bob.ns.cloudflare.com"],
+        }
+        self.zones[zone["id"]] = zone
+        self.accounts.add(account_id)
+
+        self.add_ruleset(zone["id"], "http_request_firewall_custom", rules)
+
+        return zone
+
+    def add_ruleset(self, owner_id: str, phase: str, rules: list[dict] | None = None, scope: str = "zones", kind: str | None = None, name: str = "default") -> dict:
+        """Add a ruleset to a zone (the entrypoint of a phase by default) or to an account"""
+
+        ruleset = {
+            "id": self.new_id(),
+            "name": name,
+            "description": "",
+            "kind": kind or ("zone" if scope == "zones" else "root"),
+            "phase": phase,
+            "version": "1",
+            "last_updated": self.now(),
+            "rules": [self.new_rule(x) for x in rules or []],
+            "owner": (scope, owner_id),
+        }
+        if phase == "http_request_firewall_custom" and ruleset["kind"] == "zone":
+            ruleset["source"] = "firewall_custom"
+
+        self.rulesets[ruleset["id"]] = ruleset
+
+        return ruleset
+
+    def new_rule(self, rule: dict, version: str = "1") -> dict:
+        rule_id = rule.get("id") or self.new_id()
+        return {
+            "enabled": True,
+            **{key: value for key, value in rule.items() if key != "position"},
+            "id": rule_id,
+            "ref": rule.get("ref", rule_id),
+            "version": version,
+            "last_updated": self.now(),
+        }
+
+    def public_ruleset(self, ruleset: dict, with_rules: bool = True) -> dict:
+        result = {key: value for key, value in ruleset.items() if key not in ("rules", "owner")}
+        # Rulesets without rules have no rules key
+        if with_rules and ruleset["rules"]:
+            result["rules"] = ruleset["rules"]
+        return result
+
+    def has_owner(self, scope: str, owner_id: str) -> bool:
+        return owner_id in (self.zones if scope == "zones" else self.accounts)
+
+    def owned_ruleset(self, scope: str, owner_id: str, ruleset_id: str) -> dict | None:
+        ruleset = self.rulesets.get(ruleset_id)
+        if not self.has_owner(scope, owner_id) or not ruleset or ruleset["owner"] != (scope, owner_id):
+            return None
+        return ruleset
+
+    def phase_ruleset(self, scope: str, owner_id: str, phase: str) -> dict | None:
+        """Get the entrypoint ruleset of a phase, custom rulesets of accounts are not entrypoints"""
+
+        return next(
+            (x for x in self.rulesets.values() if x["owner"] == (scope, owner_id) and x["phase"] == phase and x["kind"] in ("zone", "root")),
+            None,
+        )
+
+    def check_rule(self, rule: dict) -> MemoryResponse | None:
+        """Check a rule like Cloudflare does, returning an error response if it is not valid"""
+
+        if not rule.get("expression"):
+            return self.failure(400, 20021, "expression is required")
+        if not rule.get("action"):
+            return self.failure(400, 20021, "action is required")
+
+        try:
+            Expression(rule["expression"])
+        except Error as e:
+            return self.failure(400, 20118, f"filter parsing error: {e}")
+
+        if rule["action"] == "execute" and (rule.get("action_parameters") or {}).get("id") not in self.rulesets:
+            return self.failure(400, 20021, "execute action requires the id of an existing ruleset")
+
+        return None
+
+    def move_rule(self, ruleset: dict, rule: dict, position: dict | None) -> None:
+        if rule in ruleset["rules"]:
+            ruleset["rules"].remove(rule)
+
+        index = len(ruleset["rules"])
+        if position:
+            if "index" in position:
+                index = min(max(position["index"] - 1, 0), len(ruleset["rules"]))
+            elif "before" in position:
+                index = next((i for i, x in enumerate(ruleset["rules"]) if x["id"] == position["before"]), 0)
+            elif "after" in position:
+                index = next((i + 1 for i, x in enumerate(ruleset["rules"]) if x["id"] == position["after"]), index)
+
+        ruleset["rules"].insert(index, rule)
+
+    def bump(self, ruleset: dict) -> None:
+        ruleset["version"] = str(int(ruleset["version"]) + 1)
+        ruleset["last_updated"] = self.now()
+
+    def request(self, method: str, url: str, headers: dict | None = None, json: dict | None = None, timeout: float = 5) -> MemoryResponse:
+        self.calls.append((method, url))
+
+        headers = headers or {}
+        if "Authorization" not in headers and "X-Auth-Key" not in headers:
+            return self.failure(400, 6003, "Invalid request headers")
+
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path.removeprefix(urllib.parse.urlsplit(API_URL).path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if match and method == route_method:
+                return handler(query, json, *match.groups())
+
+        return self.failure(404, 7003, f"Could not route to {path}, perhaps your object identifier is invalid?")
+
+    def get_user(self, query: dict, body: dict | None) -> MemoryResponse:
+        return self.success({"id": "user", "email": "cloudflare@example.com"})
+
+    def verify_token(self, query: dict, body: dict | None) -> MemoryResponse:
+        return self.success({"id": "token", "status": "active"})
+
+    def list_zones(self, query: dict, body: dict | None) -> MemoryResponse:
+        zones = [x for x in self.zones.values() if "name" not in query or x["name"] == query["name"]]
+
+        page = int(query.get("page", 1))
+        per_page = min(int(query.get("per_page", 20)), 50)
+        result = zones[(page - 1) * per_page:page * per_page]
+
+        return self.success(result, result_info={
+            "page": page,
+            "per_page": per_page,
+            "count": len(result),
+            "total_count": len(zones),
+            "total_pages": -(-len(zones) // per_page),
+        })
+
+    def list_rulesets(self, query: dict, body: dict | None, scope: str, owner_id: str) -> MemoryResponse:
+        if not self.has_owner(scope, owner_id):
+            return self.failure(404, 7003, f"Could not route to {scope}")
+        return self.success([self.public_ruleset(x, with_rules=False) for x in self.rulesets.values() if x["owner"] == (scope, owner_id)])
+
+    def create_ruleset(self, query: dict, body: dict | None, scope: str, owner_id: str) -> MemoryResponse:
+        if not self.has_owner(scope, owner_id):
+            return self.failure(404, 7003, f"Could not route to {scope}")
+
+        body = body or {}
+        if not body.get("name") or not body.get("phase") or body.get("kind") != "custom":
+            return self.failure(400, 20021, "name, phase and kind (custom) are required")
+        for rule in body.get("rules", []):
+            if error := self.check_rule(rule):
+                return error
+
+        ruleset = self.add_ruleset(owner_id, body["phase"], body.get("rules"), scope=scope, kind="custom", name=body["name"])
+        ruleset["description"] = body.get("description", "")
+
+        return self.success(self.public_ruleset(ruleset))
+
+    def get_entrypoint(self, query: dict, body: dict | None, scope: str, owner_id: str, phase: str) -> MemoryResponse:
+        ruleset = self.phase_ruleset(scope, owner_id, phase) if self.has_owner(scope, owner_id) else None
+        if not ruleset:
+            return self.failure(404, 10003, f"could not find entrypoint ruleset in the {phase} phase")
+        return self.success(self.public_ruleset(ruleset))
+
+    def update_entrypoint(self, query: dict, body: dict | None, scope: str, owner_id: str, phase: str) -> MemoryResponse:
+        if not self.has_owner(scope, owner_id):
+            return self.failure(404, 7003, f"Could not route to {scope}")
+
+        ruleset = self.phase_ruleset(scope, owner_id, phase)
+        if not ruleset:
+            ruleset = self.add_ruleset(owner_id, phase, scope=scope)
+
+        return self.update_ruleset(query, body, scope, owner_id, ruleset["id"])
+
+    def get_ruleset(self, query: dict, body: dict | None, scope: str, owner_id: str, ruleset_id: str) -> MemoryResponse:
+        ruleset = self.owned_ruleset(scope, owner_id, ruleset_id)
+        if not ruleset:
+            return self.failure(404, 10000, "Ruleset not found")
+        return self.success(self.public_ruleset(ruleset))
+
+    def update_ruleset(self, query: dict, body: dict | None, scope: str, owner_id: str, ruleset_id: str) -> MemoryResponse:
+        ruleset = self.owned_ruleset(scope, owner_id, ruleset_id)
+        if not ruleset:
+            return self.failure(404, 10000, "Ruleset not found")
+
+        rules = (body or {}).get("rules", [])
+        for rule in rules:
+            if error := self.check_rule(rule):
+                return error
+
+        self.bump(ruleset)
+        ruleset["rules"] = [self.new_rule(x, ruleset["version"]) for x in rules]
+        if "description" in (body or {}):
+            ruleset["description"] = body["description"]
+
+        return self.success(self.public_ruleset(ruleset))
+
+    def create_rule(self, query: dict, body: dict | None, scope: str, owner_id: str, ruleset_id: str) -> MemoryResponse:
+        ruleset = self.owned_ruleset(scope, owner_id, ruleset_id)
+        if not ruleset:
+            return self.failure(404, 10000, "Ruleset not found")
+
+        body = body or {}
+        if error := self.check_rule(body):
+            return error
+
+        self.bump(ruleset)
+        rule = self.new_rule({key: value for key, value in body.items() if key != "id"}, ruleset["version"])
+        self.move_rule(ruleset, rule, body.get("position"))
+
+        return self.success(self.public_ruleset(ruleset))
+
+    def update_rule(self, query: dict, body: dict | None, scope: str, owner_id: str, ruleset_id: str, rule_id: str) -> MemoryResponse:
+        ruleset = self.owned_ruleset(scope, owner_id, ruleset_id)
+        rule = next((x for x in ruleset["rules"] if x["id"] == rule_id), None) if ruleset else None
+        if not rule:
+            return self.failure(404, 10000, "Rule not found")
+
+        body = body or {}
+        if error := self.check_rule({**rule, **body}):
+            return error
+
+        self.bump(ruleset)
+        rule.update({key: value for key, value in body.items() if key not in ("id", "position")})
+        rule["version"] = ruleset["version"]
+        rule["last_updated"] = ruleset["last_updated"]
+        if body.get("position"):
+            self.move_rule(ruleset, rule, body["position"])
+
+        return self.success(self.public_ruleset(ruleset))
+
+    def delete_rule(self, query: dict, body: dict | None, scope: str, owner_id: str, ruleset_id: str, rule_id: str) -> MemoryResponse:
+        ruleset = self.owned_ruleset(scope, owner_id, ruleset_id)
+        rule = next((x for x in ruleset["rules"] if x["id"] == rule_id), None) if ruleset else None
+        if not rule:
+            return self.failure(404, 10000, "Rule not found")
+
+        self.bump(ruleset)
+        ruleset["rules"].remove(rule)
+
+        return self.success(self.public_ruleset(ruleset))
@@ -1,16 +1,86 @@
+import json
+import mmap
 import os
+from collections.abc import Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Files bigger than this size are memory-mapped instead of read through a buffer
+MMAP_THRESHOLD = 1 << 20
+
+# Phase of the custom rules
+CUSTOM_PHASE = "http_request_firewall_custom"
+
+# Actions available in every phase of a zone, the first one is the default action
+PHASE_ACTIONS = {
+    CUSTOM_PHASE: ("managed_challenge", "js_challenge", "challenge", "block", "skip", "log"),
+    "http_ratelimit": ("block", "managed_challenge", "js_challenge", "challenge", "log"),
+    "http_request_transform": ("rewrite",),
+    "http_request_late_transform": ("rewrite",),
+    "http_response_headers_transform": ("rewrite",),
+    "http_request_dynamic_redirect": ("redirect",),
+    "http_request_origin": ("route",),
+    "http_config_settings": ("set_config",),
+    "http_request_cache_settings": ("set_cache_settings",),
+    "http_response_compression": ("compress_response",),
+    "http_custom_errors": ("serve_error",),
+}
+
+# List of all available actions for Cloudflare custom rules
+AVAILABLE_ACTIONS = PHASE_ACTIONS[CUSTOM_PHASE]
+ALL_ACTIONS = tuple(dict.fromkeys(x for actions in PHASE_ACTIONS.values() for x in actions))
+
+# Header items holding a JSON object, written without spaces
+JSON_HEADER_KEYS = ("action_parameters", "ratelimit")
+
+# Main fields of zones, kept by Cloudflare when set as its zone_fields (see :func:`Utils.project`), True keeps a whole value
+ZONE_FIELDS = {
+    "id": True,
+    "name": True,
+    "status": True,
+    "paused": True,
+    "type": True,
+    "plan": {"id": True, "name": True, "legacy_id": True},
+    "account": {"id": True, "name": True},
+}
+
+# Fields of rulesets kept by Cloudflare, rules are kept whole to be sent back unchanged
+RULESET_FIELDS = {
+    "id": True,
+    "name": True,
+    "description": True,
+    "kind": True,
+    "phase": True,
+    "version": True,
+    "source": True,
+    "last_updated": True,
+    "rules": True,
+}
+
+# Maximum number of custom rules by plan
+PLAN_MAX_RULES = {
+    "free": 5,
+    "pro": 20,
+    "business": 100,
+    "enterprise": 1000,
+}
 
 
 class Utils:
-    def __init__(self, directory: str = None) -> None:
+    def __init__(self, directory: str = None, create: bool = True) -> None:
         """Utils class to manage Cloudflare data
 
+        * create -> Create the folder now, else it is only created when an expression is written
+
         >>> utils = Utils("my_expressions")
         """
 
         self.directory = directory or "expressions"
 
-        if not os.path.isdir(self.directory):
+        if create and not os.path.isdir(self.directory):
             os.mkdir(self.directory)
 
     def change_directory(self, directory: str) -> None:
@@ -61,35 +131,85 @@ class Utils:
 
         return expression.replace(" or ", " or\n").replace(" and ", " and\n")
 
-    def write_expression(self, rule_file: str, rule_expression: str, header: dict | None = None) -> None:
+    def get_filename(self, rule_file: str) -> str:
+        """Get the path of a rule file in the directory, the .txt extension is optional
+
+        >>> utils.get_filename("Bad/Bots")
+        >>> "expressions/Bad_Bots.txt"
+        """
+
+        if not rule_file.endswith(".txt"):
+            rule_file += ".txt"
+
+        return f"{self.directory}/{self.escape(rule_file)}"
+
+    def write_expression(self, rule_file: str, rule_expression: str | Iterable[str], header: dict | None = None) -> None:
         """Write an expression to a readable text file
 
+        The expression can also be an iterable of clauses, written one by one and joined by "or"
+
         >>> utils.write_expression("IsBot", "(cf.client.bot)")
         >>> utils.write_expression("IsBot", "(cf.client.bot)", header={"action": "managed_challenge", "enabled": "True"})
+        >>> utils.write_expression("Bad IPs", (f"(ip.src eq {ip})" for ip in ips))
         """
 
-        if not rule_file.endswith(".txt"):
-            rule_file += ".txt"
+        filename = self.get_filename(rule_file)
 
-        filename = f"{self.directory}/{self.escape(rule_file)}"
+        if not os.path.isdir(self.directory):
+            os.mkdir(self.directory)
 
         with open(filename, "w", encoding="utf-8") as file:
             if header:
-                data = " ".join(f"{x}:{y}" for x, y in header.items())
+                data = " ".join(f"{x}:{self.header_value(y)}" for x, y in header.items())
                 file.write(f"#! {data} !#\n")
-            file.write(rule_expression)
 
-    def read_expression(self, rule_file: str) -> tuple[str, str]:
-        """Read an expression from a file
+            if isinstance(rule_expression, str):
+                file.write(rule_expression)
+            else:
+                for index, clause in enumerate(rule_expression):
+                    file.write(f" or\n{clause}" if index else clause)
 
-        >>> utils.read_expression("IsBot")
-        >>> "(cf.client.bot)"
+    @staticmethod
+    def header_value(value: object) -> str:
+        """Format a value of the header, objects are written as JSON with escaped spaces
+
+        >>> utils.header_value({"uri": {"path": {"value": "/a b"}}})
+        >>> '{"uri":{"path":{"value":"/a\\u0020b"}}}'
         """
 
-        if not rule_file.endswith(".txt"):
-            rule_file += ".txt"
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, separators=(",", ":")).replace(" ", "\\u0020")
+
+        return str(value)
+
+    @staticmethod
+    def read_lines(filename: str) -> Iterator[str]:
+        """Read the lines of a file one by one, memory-mapping big files"""
+
+        with open(filename, "rb") as file:
+            if os.fstat(file.fileno()).st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for line in iter(mapped.readline, b""):
+                        yield line.decode("utf-8")
+            else:
+                for line in file:
+                    yield line.decode("utf-8")
+
+    def stream_expression(self, rule_file: str) -> tuple[dict | None, Iterator[str]]:
+        """Read the header of an expression file and stream the lines of its expression, without comments
+
+        The lines can be given directly to :class:`Expression` to parse a huge file without loading it at once
+
+        :exception Error: If the file is not found
+
+        >>> header, lines = utils.stream_expression("Bad Bots")
+        >>> header
+        >>> {"action": "block", "enabled": True}
+        >>> next(lines)
+        >>> '(http.user_agent contains "DotBot") or'
+        """
 
-        filename = f"{self.directory}/{self.escape(rule_file)}"
+        filename = self.get_filename(rule_file)
 
         if not os.path.isfile(filename):
             # pylint: disable=import-outside-toplevel
@@ -97,45 +217,150 @@ class Utils:
 
             raise Error(f"No such file in folder '{self.directory}'")
 
-        with open(filename, "r", encoding="utf-8") as file:
-            first_line = file.readline().strip()
-            header = self.process_header(first_line)
+        lines = self.read_lines(filename)
+
+        first_line = next(lines, "").strip()
+        header = self.process_header(first_line)
+
+        def expression() -> Iterator[str]:
+            # If the first line is not a header or a comment, it is part of the expression
+            if not header and first_line and not first_line.startswith("#"):
+                yield first_line
+
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+        return header, expression()
+
+    def read_expression(self, rule_file: str) -> tuple[str, str]:
+        """Read an expression from a file
+
+        >>> utils.read_expression("IsBot")
+        >>> "(cf.client.bot)"
+        """
+
+        header, lines = self.stream_expression(rule_file)
+
+        return header, " ".join(lines)
+
+    def iter_clauses(self, rule_file: str) -> Iterator[str]:
+        """Parse an expression file and yield its top-level clauses (joined by "or") one by one
+
+        :exception Error: If the file is not found or the expression is not valid
+
+        >>> for clause in utils.iter_clauses("Bad Bots"):
+        ...     print(clause)
+        # (http.user_agent contains "DotBot")
+        # (http.user_agent contains "dotbot")
+        """
 
-            expression = [x.strip() for x in file.readlines() if not x.strip().startswith("#")]
+        # pylint: disable=import-outside-toplevel
+        from .expression import Expression
 
-            # If the first line is not a header or a comment, we add it to the expression
-            if not header and not first_line.startswith("#"):
-                expression.insert(0, first_line)
+        _, lines = self.stream_expression(rule_file)
+
+        for clause in Expression.iter_clauses(lines):
+            yield f"({clause.text()})"
+
+    @staticmethod
+    def parse_header(header_line: str) -> tuple[dict | None, list[str]]:
+        """Parse the header of an expression file, returning the header and the problems found in it
+
+        Items that are not key:value pairs, invalid actions, enabled states and JSON objects are left out of the header
+
+        >>> utils.parse_header("#! action:blocks enabled:True !#")
+        >>> ({"enabled": True}, ["Invalid action 'blocks' (available actions: managed_challenge, ...)"])
+        """
+
+        if not header_line.startswith("#!") or not header_line.endswith("!#"):
+            return None, []
+
+        header = {}
+        problems = []
+
+        for item in header_line[2:-2].split():
+            key, separator, value = item.partition(":")
+            if not key or not separator:
+                problems.append(f"Invalid header item '{item}' (expected key:value)")
+                continue
+            header[key] = value
+
+        if "action" in header and header["action"] not in ALL_ACTIONS:
+            problems.append(f"Invalid action '{header.pop('action')}' (available actions: {', '.join(ALL_ACTIONS)})")
+        for key in JSON_HEADER_KEYS:
+            if key in header:
+                try:
+                    header[key] = json.loads(header[key])
+                except ValueError:
+                    problems.append(f"Invalid {key} '{header.pop(key)}' (expected a JSON object)")
+        if "enabled" in header:
+            if header["enabled"].lower() not in ("true", "false"):
+                problems.append(f"Invalid enabled state '{header.pop('enabled')}' (expected True or False)")
+            else:
+                header["enabled"] = header["enabled"].lower() == "true"
 
-        return header, " ".join(expression)
+        return header, problems
 
     def process_header(self, header_line: str) -> dict | None:
         """Process the header of an expression file if it exists
         It retrieves all header data and returns a dictionary
 
+        Invalid items are ignored with a message, see :func:`parse_header`
+
         >>> utils.process_header("#! action:block enabled:True !#")
-        >>> {"action": "block", "enabled": "True"}
+        >>> {"action": "block", "enabled": True}
         """
 
-        if header_line.startswith("#!") and header_line.endswith("!#"):
-            header_data = header_line[2:-2].strip()
-            header = dict([x.split(":") for x in header_data.split(" ")])
-
-            if "action" in header:
-                # List of all available actions for Cloudflare
-                available_actions = ["managed_challenge", "js_challenge", "challenge", "block", "skip", "log"]
+        header, problems = self.parse_header(header_line)
 
-                if header["action"] not in available_actions:
-                    del header["action"]
-                    print("The action in the header is not valid, ignoring it...")
-                    print("List of available actions: " + ", ".join(available_actions))
-            if "enabled" in header:
-                header["enabled"] = header["enabled"].lower() == "true"
-        else:
-            header = None
+        for problem in problems:
+            print(f"{problem} in the header, ignoring it...")
 
         return header
 
+    @staticmethod
+    def decode_json(content: bytes | str, fields: dict | None = None) -> object:
+        """Decode a JSON response, with orjson if it is installed (pip install orjson),
+        keeping only some fields of its result (see :func:`project`)
+
+        The other fields are dropped right after decoding, before the response is reshaped or kept
+
+        >>> utils.decode_json(r.content, {"id": True, "name": True})
+        >>> {"success": True, "errors": [], "result": [{"id": "a1b2c3", "name": "example.com"}, ...], ...}
+        """
+
+        data = orjson.loads(content) if orjson is not None else json.loads(content)
+
+        if fields is not None and isinstance(data, dict) and data.get("result") is not None:
+            data["result"] = Utils.project(data["result"], fields)
+
+        return data
+
+    @staticmethod
+    def project(data: object, fields: dict | bool) -> object:
+        """Keep only some fields of an object or of every object of a list
+
+        Fields are a dictionary of keys, True keeps the whole value and a dictionary keeps some of its fields
+
+        >>> utils.project([{"id": "a1b2c3", "plan": {"legacy_id": "pro", "price": 20}, "meta": {...}}], {"id": True, "plan": {"legacy_id": True}})
+        >>> [{"id": "a1b2c3", "plan": {"legacy_id": "pro"}}]
+        """
+
+        if fields is True:
+            return data
+        if isinstance(data, list):
+            return [Utils.project(x, fields) for x in data]
+        if isinstance(data, dict):
+            # Most fields are kept whole, without a recursive call
+            return {
+                key: data[key] if value is True else Utils.project(data[key], value)
+                for key, value in fields.items()
+                if key in data
+            }
+        return data
+
     @staticmethod
     def get_json_key(json: dict, keys: list[str | int]) -> object:
         """Get an element from a json using a list of keys
@@ -0,0 +1,86 @@
+import time
+from collections.abc import Callable, Iterable
+
+from .error import Error
+from .utils import PLAN_MAX_RULES
+
+
+class ZoneIndex:
+    def __init__(self, list_zones: Callable[[], Iterable[dict]], refresh_interval: float = 5) -> None:
+        """In-memory index of zones by domain name, built from a single listing of all zones
+
+        Domains missing from the index list the zones again, at most once every refresh_interval seconds
+
+        >>> index = ZoneIndex(cf.iter_zones)
+        >>> index.refresh()
+        """
+
+        self.list_zones = list_zones
+        self.refresh_interval = refresh_interval
+
+        self._zones = {}
+        self._refreshed_at = None
+
+    def refresh(self) -> int:
+        """List all zones again and return their number
+
+        >>> index.refresh()
+        >>> 1250
+        """
+
+        self._zones = {x["name"]: x for x in self.list_zones()}
+        self._refreshed_at = time.monotonic()
+
+        return len(self._zones)
+
+    @property
+    def zones(self) -> list[dict]:
+        """Get all indexed zones
+
+        >>> index.zones
+        >>> [{"id": "a1b2c3", "name": "example.com", "status": "active", "plan": {"legacy_id": "pro", ...}, ...}, ...]
+        """
+
+        return list(self._zones.values())
+
+    def get(self, domain_name: str) -> dict:
+        """Get a zone by its domain name, listing the zones again if it is not indexed
+
+        :exception Error: If the domain is not found
+
+        >>> index.get("example.com")
+        >>> {"id": "a1b2c3", "name": "example.com", ...}
+        """
+
+        if domain_name not in self._zones and (
+            self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_interval
+        ):
+            self.refresh()
+
+        if domain_name not in self._zones:
+            raise Error(f"Domain '{domain_name}' not found")
+
+        return self._zones[domain_name]
+
+    def summary(self) -> dict:
+        """Get the id, plan, status and maximum custom rules of every zone
+
+        >>> index.summary()
+        >>> {"example.com": {"id": "a1b2c3", "plan": "pro", "status": "active", "max_rules": 20}, ...}
+        """
+
+        return {
+            name: {
+                "id": zone["id"],
+                "plan": zone["plan"]["legacy_id"],
+                "status": zone.get("status"),
+                "max_rules": PLAN_MAX_RULES.get(zone["plan"]["legacy_id"]),
+            }
+            for name, zone in self._zones.items()
+        }
+
+    def __contains__(self, domain_name: str) -> bool:
+        return domain_name in self._zones
+
+    def __len__(self) -> int:
+        return len(self._zones)
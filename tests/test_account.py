@@ -0,0 +1,35 @@
+from cf_rules import Cloudflare, MemoryTransport, Utils
+
+
+def test_deploy_account_rules(tmp_path):
+    transport = MemoryTransport()
+    for domain_name in ("example.com", "example.fr", "example.net"):
+        transport.add_zone(domain_name, plan="enterprise")
+
+    folder = str(tmp_path / "expressions")
+    Utils(folder).write_expression("Bad Bots", "(cf.client.bot)", header={"action": "block"})
+    Utils(folder).write_expression("Bad IP", "(ip.src eq 1.1.1.1)")
+
+    cf = Cloudflare(folder, transport=transport)
+    cf.auth_token("token")
+    account_id = cf.get_account_id("example.com")
+
+    report = cf.deploy_account_rules(account_id, "Fleet rules", ["example.com", "example.fr"])
+    assert (report["ruleset"], report["scope"]) == ("created", "created")
+    assert report["rules"] == ["Bad Bots", "Bad IP"]
+    assert cf.get_account_scope(account_id, "Fleet rules") == ["example.com", "example.fr"]
+
+    # Nothing is sent when the rules and the scope did not change
+    start = len(transport.calls)
+    report = cf.deploy_account_rules(account_id, "Fleet rules", ["example.fr", "example.com"])
+    assert (report["ruleset"], report["scope"]) == ("unchanged", "unchanged")
+    assert all(x == "GET" for x, _ in transport.calls[start:])
+
+    # The number of requests does not depend on the number of domains
+    Utils(folder).write_expression("Bad IP", "(ip.src eq 2.2.2.2)")
+    start = len(transport.calls)
+    report = cf.deploy_account_rules(account_id, "Fleet rules", ["example.com", "example.fr", "example.net"])
+    assert (report["ruleset"], report["scope"]) == ("updated", "updated")
+    assert [x for x, _ in transport.calls[start:] if x != "GET"] == ["PUT", "PUT"]
+    assert cf.get_account_scope(account_id, "Fleet rules") == ["example.com", "example.fr", "example.net"]
+    assert cf.get_account_ruleset(account_id, "Fleet rules")["rules"][1]["expression"] == "(ip.src eq 2.2.2.2)"
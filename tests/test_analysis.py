@@ -0,0 +1,32 @@
+from cf_rules import Analyzer
+
+
+def make_rule(name, size):
+    return {"description": name, "expression": f'(http.user_agent contains "{name}{"x" * size}")', "action": "block"}
+
+
+def test_mergeable_groups_fit_in_an_expression():
+    analyzer = Analyzer([make_rule(f"Rule {i}", 1500) for i in range(5)])
+
+    mergeable = analyzer.mergeable()
+
+    assert [x["rules"] for x in mergeable] == [["Rule 0", "Rule 1"], ["Rule 2", "Rule 3"]]
+    assert all(x["length"] <= 4096 for x in mergeable)
+    assert analyzer.report()["slots_freed"] == 2
+
+
+def test_rules_too_long_to_merge():
+    assert Analyzer([make_rule("A", 3000), make_rule("B", 3000)]).mergeable() == []
+
+
+def test_case_variants_of_rules_with_the_same_action():
+    analyzer = Analyzer([
+        {"description": "A", "expression": '(http.user_agent contains "Bad\\"Bot")', "action": "block"},
+        {"description": "B", "expression": '(http.user_agent contains "bad\\"bot")', "action": "block"},
+        {"description": "C", "expression": '(http.user_agent contains "BAD\\"BOT")', "action": "log"},
+    ])
+
+    variants = analyzer.case_variants()
+
+    assert [x["rules"] for x in variants] == [["A", "B"]]
+    assert variants[0]["suggestion"] == '(lower(http.user_agent) contains "bad\\"bot")'
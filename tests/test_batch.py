@@ -0,0 +1,30 @@
+import pytest
+
+from cf_rules import Batch, Expression
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("expression", [
+    "(cf.threat_score lt 5)",
+    "(cf.threat_score le 10)",
+    "(cf.threat_score ne 10)",
+    "(cf.threat_score in {0..5})",
+    "(cf.threat_score)",
+    '(http.user_agent ne "bot")',
+    '(http.user_agent eq "")',
+    "not (cf.threat_score lt 5)",
+])
+def test_missing_values_match_evaluate(expression):
+    columns = {"cf.threat_score": [None, 10, 3], "http.user_agent": [None, "bot", "curl"]}
+    requests = [{}, {"cf.threat_score": 10, "http.user_agent": "bot"}, {"cf.threat_score": 3, "http.user_agent": "curl"}]
+
+    mask = Batch(columns).evaluate(expression)["mask"]
+
+    assert mask.tolist() == [Expression(expression).evaluate(x) for x in requests]
+
+
+def test_missing_float_values():
+    mask = Batch({"cf.threat_score": np.array([np.nan, 1.0])}).evaluate("(cf.threat_score lt 5)")["mask"]
+
+    assert mask.tolist() == [False, True]
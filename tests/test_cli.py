@@ -0,0 +1,19 @@
+import json
+
+from cf_rules.cli import main
+
+
+def test_system_errors_are_reported(tmp_path, capsys):
+    assert main(["--format", "ndjson", "--folder", str(tmp_path / "expressions"), "unpack", str(tmp_path / "missing.pack.json")]) == 2
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err.startswith("Error: ")
+
+
+def test_json_output_is_closed_on_errors(tmp_path, capsys, monkeypatch):
+    monkeypatch.delenv("CF_API_TOKEN", raising=False)
+    monkeypatch.delenv("CF_API_KEY", raising=False)
+
+    assert main(["--format", "json", "--folder", str(tmp_path / "expressions"), "list"]) == 2
+    assert json.loads(capsys.readouterr().out) == []
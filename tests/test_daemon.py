@@ -0,0 +1,120 @@
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from cf_rules import Cloudflare, Daemon, DaemonClient, Error, MemoryTransport, RulePack
+from cf_rules.daemon import parse_address
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", rules=[{"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"}])
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    daemon = Daemon(cf, str(tmp_path / "cf_rules.sock"))
+    thread = threading.Thread(target=daemon.serve)
+    thread.start()
+
+    client = DaemonClient(daemon.address, timeout=5)
+    for _ in range(100):
+        try:
+            client.ping()
+            break
+        except Error:
+            thread.join(0.05)
+
+    yield daemon
+
+    daemon.stop()
+    thread.join()
+
+
+def send(address, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(5)
+        connection.connect(address)
+        connection.sendall(line.encode("utf-8") + b"\n")
+        with connection.makefile("rb") as file:
+            return json.loads(file.readline())
+
+
+def test_export_pack(daemon, tmp_path):
+    filename = str(tmp_path / "rules.pack.json")
+    rules = DaemonClient(daemon.address, timeout=5).export_pack("example.com", filename)
+
+    assert [x["name"] for x in rules] == ["Bad Bots"]
+    assert RulePack.load(filename).rules == rules
+
+
+def test_errors_get_a_response(daemon):
+    assert send(daemon.address, "[1, 2]")["success"] is False
+    assert send(daemon.address, '{"method": "get_rules", "kwargs": []}')["success"] is False
+
+    daemon.cf.get_domains = lambda *args, **kwargs: {"domains": {"example.com"}}
+    response = send(daemon.address, '{"method": "get_domains"}')
+    assert response["success"] is False
+    assert "cannot be encoded" in response["error"]
+
+    # The connection and the daemon are still usable
+    assert DaemonClient(daemon.address, timeout=5).ping() == "pong"
+
+
+def test_socket_is_only_accessible_by_its_owner(daemon):
+    assert stat.S_IMODE(os.stat(daemon.address).st_mode) == 0o600
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1:8787", ":8787", "localhost:8787", "[::1]:8787"])
+def test_local_addresses(address):
+    assert parse_address(address)[1] == 8787
+
+
+@pytest.mark.parametrize("address", ["0.0.0.0:8787", "192.168.1.10:8787", "example.com:8787"])
+def test_network_addresses_are_rejected(address):
+    with pytest.raises(Error):
+        Daemon(Cloudflare(create=False), address)
+
+
+def make_daemon(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", rules=[{"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"}])
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    return Daemon(cf, str(tmp_path / "cf_rules.sock"))
+
+
+def test_handle_unknown_methods(tmp_path):
+    daemon = make_daemon(tmp_path)
+
+    for method in (None, "auth_token", "_request", "dry_run_unknown"):
+        response = daemon.handle({"method": method})
+        assert response == {"success": False, "error": f"Unknown method '{method}'", "output": ""}
+
+
+def test_handle_errors(tmp_path):
+    daemon = make_daemon(tmp_path)
+
+    response = daemon.handle({"method": "delete_rule", "args": ["example.com", "Missing"]})
+    assert response["success"] is False
+    assert "Missing" in response["error"]
+
+    response = daemon.handle({"method": "get_rules", "args": ["example.com"], "kwargs": {"unknown": True}})
+    assert response["success"] is False
+    assert response["error"].startswith("TypeError: ")
+
+    # The folder of a request is not kept after an error
+    directory = daemon.cf.utils.directory
+    response = daemon.handle({"method": "update_rule", "args": ["example.com", "Bad Bots.txt"], "folder": str(tmp_path / "other")})
+    assert response["success"] is False
+    assert "No such file" in response["error"]
+    assert daemon.cf.utils.directory == directory
+
+    assert daemon.handle({"method": "get_rules", "args": ["example.com"]})["result"]["rules"] == ["Bad Bots"]
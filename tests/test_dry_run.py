@@ -0,0 +1,49 @@
+from cf_rules import Cloudflare, MemoryTransport
+
+
+def make_cloudflare(tmp_path):
+    transport = MemoryTransport()
+    for domain_name in ("example.com", "example.net"):
+        transport.add_zone(domain_name, rules=[{"description": f"Rule {i}", "expression": "(cf.client.bot)", "action": "block"} for i in range(2)])
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    return cf, transport
+
+
+def test_dry_run_records_the_calls_of_the_real_run(tmp_path):
+    cf, transport = make_cloudflare(tmp_path)
+
+    report = cf.dry_run("purge_rules", domain_names=["example.com"])
+
+    start = len(transport.calls)
+    cf.purge_rules("example.com")
+
+    assert report["calls"] == len(transport.calls) - start
+    assert report["writes"] == 1
+    assert report["errors"] == []
+
+
+def test_dry_run_keeps_the_zone_index(tmp_path):
+    cf, transport = make_cloudflare(tmp_path)
+    index = cf.index_zones(refresh_interval=0)
+    transport.add_zone("example.org")
+
+    start = len(transport.calls)
+    report = cf.dry_run("get_rules", domain_names=["example.org"])
+
+    # The zones listed again are recorded, and only through the recording transport
+    assert report["endpoints"]["GET /zones"] == 1
+    assert len(transport.calls) - start == report["calls"]
+    assert "example.org" not in index
+    assert cf.zone_index is index
+
+
+def test_dry_run_passes_the_arguments_after_the_domain(tmp_path):
+    cf, _ = make_cloudflare(tmp_path)
+
+    report = cf.dry_run("get_rules", "http_ratelimit", domain_names=["example.com", "example.net"])
+
+    assert report["endpoints"]["GET /zones/:id/rulesets/phases/http_ratelimit/entrypoint"] == 2
+    assert report["errors"] == []
@@ -0,0 +1,64 @@
+from cf_rules import Cloudflare, MemoryTransport, Utils
+
+
+def test_same_expression_with_another_name_and_action_is_imported(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", plan="pro", rules=[{"description": "Log Bots", "expression": "(cf.client.bot)", "action": "log"}])
+
+    folder = str(tmp_path / "expressions")
+    Utils(folder).write_expression("Block Bots", "(cf.client.bot)", header={"action": "block"})
+
+    cf = Cloudflare(folder, transport=transport)
+    cf.auth_token("token")
+    cf.set_plan("example.com")
+    cf.import_rules("example.com")
+
+    rules = {x["description"]: x["action"] for x in cf.get_rules("example.com")["result"]}
+    assert rules == {"Log Bots": "log", "Block Bots": "block"}
+
+
+def test_update_rule_without_changes_sends_nothing(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", rules=[{"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"}])
+
+    folder = str(tmp_path / "expressions")
+    Utils(folder).write_expression("Bad Bots", "cf.client.bot", header={"action": "block", "enabled": True})
+
+    cf = Cloudflare(folder, transport=transport)
+    cf.auth_token("token")
+
+    start = len(transport.calls)
+    cf.update_rule("example.com", "Bad Bots")
+    assert [x for x, _ in transport.calls[start:]] == ["GET", "GET"]
+
+    Utils(folder).write_expression("Bad Bots", "cf.client.bot", header={"action": "managed_challenge", "enabled": True})
+    cf.update_rule("example.com", "Bad Bots")
+    assert cf.get_rules("example.com")["result"][0]["action"] == "managed_challenge"
+
+
+def test_update_rule_keeps_the_skip_parameters_of_the_header(tmp_path):
+    parameters = {"phases": ["http_ratelimit"], "products": [], "ruleset": "current"}
+    transport = MemoryTransport()
+    transport.add_zone("example.com", rules=[
+        {"description": "Good Bots", "expression": "(cf.client.bot)", "action": "skip", "action_parameters": parameters},
+    ])
+
+    folder = str(tmp_path / "expressions")
+    Utils(folder).write_expression("Good Bots", "cf.client.bot", header={"action": "skip", "enabled": True, "action_parameters": parameters})
+
+    cf = Cloudflare(folder, transport=transport)
+    cf.auth_token("token")
+
+    start = len(transport.calls)
+    cf.update_rule("example.com", "Good Bots")
+    assert [x for x, _ in transport.calls[start:]] == ["GET", "GET"]
+
+    # The parameters of the skip action are not sent with another action
+    bodies = []
+    request = transport.request
+    transport.request = lambda method, url, json=None, **kwargs: bodies.append(json) or request(method, url, json=json, **kwargs)
+
+    Utils(folder).write_expression("Good Bots", "cf.client.bot", header={"action": "block", "enabled": True})
+    cf.update_rule("example.com", "Good Bots")
+    assert bodies[-1]["action"] == "block"
+    assert "action_parameters" not in bodies[-1]
@@ -0,0 +1,21 @@
+from cf_rules import Optimizer
+
+RULES = [
+    {"description": "Challenge", "expression": '(http.user_agent contains "bot")', "action": "managed_challenge"},
+    {"description": "Block", "expression": "(ip.src eq 1.1.1.1)", "action": "block"},
+]
+STATS = {"Challenge": {"hit_rate": 0.01}, "Block": {"hit_rate": 0.5}}
+
+
+def test_different_actions_keep_their_order_without_overlaps():
+    assert Optimizer(RULES, STATS).optimize()["order"] == ["Challenge", "Block"]
+
+
+def test_different_actions_keep_their_order_when_overlapping():
+    overlaps = {"Challenge": {"Block": 3}}
+
+    assert Optimizer(RULES, STATS, overlaps=overlaps).optimize()["order"] == ["Challenge", "Block"]
+
+
+def test_disjoint_rules_are_reordered():
+    assert Optimizer(RULES, STATS, overlaps={}).optimize()["order"] == ["Block", "Challenge"]
@@ -0,0 +1,31 @@
+from cf_rules import MemoryTransport, Orchestrator
+
+
+def test_network_errors_are_reported_by_domain(tmp_path):
+    backends = {"Bearer agency": MemoryTransport(), "Bearer customer": MemoryTransport()}
+    backends["Bearer agency"].add_zone("example.com")
+    backends["Bearer customer"].add_zone("example.net")
+    down = set()
+
+    class Router:
+        def request(self, method, url, headers=None, json=None, timeout=5):
+            if headers["Authorization"] in down:
+                raise ConnectionError("Connection refused")
+            return backends[headers["Authorization"]].request(method, url, headers, json, timeout)
+
+        def close(self):
+            pass
+
+    orchestrator = Orchestrator(str(tmp_path / "expressions"), Router, rate=100)
+    try:
+        orchestrator.add_token("agency", "agency")
+        orchestrator.add_token("customer", "customer")
+        orchestrator.discover()
+
+        down.add("Bearer customer")
+        report = orchestrator.run("get_rules")
+    finally:
+        orchestrator.close()
+
+    assert report["example.com"]["success"] is True
+    assert report["example.net"] == {"account": "customer", "success": False, "error": "ConnectionError: Connection refused"}
@@ -0,0 +1,59 @@
+from cf_rules import Cloudflare, MemoryTransport, RulePack
+
+
+def test_sync_pack_replaces_the_action_parameters(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", plan="pro", rules=[
+        {"description": "Good Bots", "expression": "(cf.client.bot)", "action": "skip", "action_parameters": {"ruleset": "current"}},
+    ])
+
+    filename = str(tmp_path / "rules.pack.json")
+    RulePack([RulePack.rule("Good Bots", "(cf.client.bot)", "block", position=1)]).save(filename)
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+    cf.set_plan("example.com")
+    report = cf.sync_pack(["example.com"], filename)
+
+    assert report["example.com"]["updated"] == ["Good Bots"]
+    rule = cf.get_rules("example.com")["result"][0]
+    assert rule["action"] == "block"
+    assert "action_parameters" not in rule
+
+
+def test_pack_positions_are_applied(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", plan="pro", rules=[
+        {"description": "Bad IP", "expression": "(ip.src eq 1.1.1.1)", "action": "block"},
+        {"description": "Other", "expression": "(http.host eq \"a.example.com\")", "action": "block"},
+        {"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"},
+    ])
+
+    filename = str(tmp_path / "rules.pack.json")
+    RulePack([
+        RulePack.rule("Bad AS", "(ip.src.asnum eq 1234)", "block"),
+        RulePack.rule("Bad IP", "(ip.src eq 1.1.1.1)", "block", position=2),
+        RulePack.rule("Bad Bots", "(cf.client.bot)", "block", position=1),
+    ]).save(filename)
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+    cf.set_plan("example.com")
+    report = cf.sync_pack(["example.com"], filename)["example.com"]
+
+    assert report == {"created": ["Bad AS"], "updated": [], "moved": ["Bad Bots", "Bad IP"], "skipped": []}
+    assert cf.get_rules("example.com")["rules"] == ["Bad Bots", "Bad IP", "Other", "Bad AS"]
+
+    # Nothing is sent once the rules are in place
+    start = len(transport.calls)
+    report = cf.sync_pack(["example.com"], filename)["example.com"]
+    assert report["skipped"] == ["Bad Bots", "Bad IP", "Bad AS"]
+    assert "PUT" not in [x for x, _ in transport.calls[start:]]
+
+
+def test_pack_check_positions():
+    pack = RulePack([RulePack.rule("A", "(cf.client.bot)", position=1), RulePack.rule("B", "(cf.client.bot)", position=1)])
+    assert pack.check() == ["Invalid position 1 for rule 'B' (positions start from 1 and are unique)"]
+
+    pack = RulePack([RulePack.rule("A", "(cf.client.bot)"), RulePack.rule("B", "(cf.client.bot)", position=1)])
+    assert pack.names == ["B", "A"]
@@ -0,0 +1,46 @@
+from cf_rules import Cloudflare, MemoryTransport, Preflight, Utils
+
+
+def test_export_preflight_import_round_trip(tmp_path):
+    expression = '(http.user_agent contains "foo and bar") or (http.request.uri.path eq "/a or b")'
+
+    transport = MemoryTransport()
+    transport.add_zone("example.com", rules=[{"description": "Quoted", "expression": expression, "action": "block"}])
+    transport.add_zone("example.net")
+
+    folder = str(tmp_path / "expressions")
+    cf = Cloudflare(folder, transport=transport)
+    cf.auth_token("token")
+    cf.export_rules("example.com")
+
+    # Beautified lines are split inside the strings
+    with open(Utils(folder).get_filename("Quoted"), encoding="utf-8") as file:
+        assert '"foo and\nbar"' in file.read()
+
+    report = Preflight(folder).run()
+    assert report["errors"] == []
+    assert report["create"] == ["Quoted.txt"]
+
+    cf.import_rules("example.net")
+
+    rules = cf.get_rules("example.net")["result"]
+    assert [x["description"] for x in rules] == ["Quoted"]
+    assert rules[0]["expression"] == expression
+    assert rules[0]["action"] == "block"
+
+
+def test_invalid_enabled_state_is_left_out_of_the_header():
+    header, problems = Utils.parse_header("#! action:block enabled:ture !#")
+
+    assert header == {"action": "block"}
+    assert problems == ["Invalid enabled state 'ture' (expected True or False)"]
+
+
+def test_preflight_reports_an_invalid_enabled_state(tmp_path):
+    folder = str(tmp_path / "expressions")
+    Utils(folder).write_expression("Bad Bots", "(cf.client.bot)", header={"action": "block", "enabled": "ture"})
+
+    result = Preflight(folder).check_files()[0]
+
+    assert result["header"] == {"action": "block"}
+    assert result["errors"] == ["Invalid enabled state 'ture' (expected True or False)"]
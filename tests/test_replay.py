@@ -0,0 +1,30 @@
+import gzip
+import json
+
+import pytest
+
+from cf_rules import Error, Replay, Utils
+
+
+def test_missing_folder_is_not_created(tmp_path):
+    with pytest.raises(Error):
+        Replay(str(tmp_path / "missing"))
+
+    assert not (tmp_path / "missing").exists()
+
+
+def test_unavailable_fields_are_reported(tmp_path):
+    folder = str(tmp_path / "expressions")
+    Utils(folder).write_expression("Bad Bots", '(http.user_agent contains "bot")')
+    Utils(folder).write_expression("Threats", "(cf.threat_score gt 10)")
+
+    log_file = str(tmp_path / "logs.log.gz")
+    with gzip.open(log_file, "wt") as file:
+        file.write(json.dumps({"ClientRequestUserAgent": "a bot"}) + "\n")
+
+    replay = Replay(folder)
+    assert replay.unavailable == {"Threats": ["cf.threat_score"]}
+
+    report = replay.run(log_file, workers=1)
+    assert report["rules"]["Bad Bots"]["hits"] == 1
+    assert report["unavailable"] == {"Threats": ["cf.threat_score"]}
@@ -0,0 +1,34 @@
+from cf_rules import Cloudflare, MemoryTransport, Snapshots
+
+
+def test_snapshot_reuse_and_restore(tmp_path):
+    transport = MemoryTransport()
+    for domain_name in ("example.com", "example.net"):
+        transport.add_zone(domain_name, rules=[
+            {"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"},
+            {"description": "Bad IP", "expression": "(ip.src eq 1.1.1.1)", "action": "managed_challenge"},
+        ])
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    directory = str(tmp_path / "backups")
+    first = cf.snapshot_zones(directory=directory)
+    assert first["stats"]["written"] == 2
+
+    # Only the changed ruleset is fetched and archived again
+    cf.delete_rule("example.net", "Bad IP")
+    second = cf.snapshot_zones(directory=directory)
+    assert (second["stats"]["written"], second["stats"]["reused"]) == (1, 1)
+    assert [x["name"] for x in Snapshots(directory).snapshots] == [first["name"], second["name"]]
+
+    # The reused ruleset is read from the first archive
+    rulesets = Snapshots(directory).read("example.com")
+    assert [x["description"] for x in rulesets["http_request_firewall_custom"]["rules"]] == ["Bad Bots", "Bad IP"]
+
+    cf.purge_rules("example.com")
+    assert cf.restore_snapshot("example.com", directory) == {"http_request_firewall_custom": 2}
+    assert cf.get_rules("example.com")["rules"] == ["Bad Bots", "Bad IP"]
+
+    assert cf.restore_snapshot("example.net", directory, first["name"]) == {"http_request_firewall_custom": 2}
+    assert cf.get_rules("example.net")["rules"] == ["Bad Bots", "Bad IP"]
@@ -0,0 +1,42 @@
+from cf_rules import Cloudflare, MemoryTransport, RuleStore
+
+
+def test_drift_matrix(tmp_path):
+    transport = MemoryTransport()
+    for name, action in (("example.com", "block"), ("example.fr", "block"), ("example.net", "managed_challenge")):
+        transport.add_zone(name, rules=[
+            {"description": "Bad Bots", "expression": "(cf.client.bot)", "action": action},
+            {"description": "Bad IP", "expression": "(ip.src eq 1.1.1.1)", "action": "block"},
+        ])
+    transport.add_zone("example.org", rules=[
+        {"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"},
+    ])
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    directory = str(tmp_path / "store")
+    report = cf.drift_report(["example.com", "example.fr", "example.net", "example.org"], directory)
+
+    assert report["rules"] == ["Bad Bots", "Bad IP"]
+    assert report["reference"]["Bad Bots"]["action"] == "block"
+    assert report["matrix"] == {
+        "example.com": {"Bad Bots": "identical", "Bad IP": "identical"},
+        "example.fr": {"Bad Bots": "identical", "Bad IP": "identical"},
+        # Only the action differs
+        "example.net": {"Bad Bots": "differing", "Bad IP": "identical"},
+        "example.org": {"Bad Bots": "identical", "Bad IP": "missing"},
+    }
+
+    # The manifests are compared again without any request
+    start = len(transport.calls)
+    assert cf.drift_report(directory=directory, refresh=False)["matrix"] == report["matrix"]
+    assert transport.calls[start:] == []
+
+
+def test_signature_includes_json_items():
+    rule = {"hash": "5d0b0c8f", "action": "skip", "enabled": True, "action_parameters": {"ruleset": "current"}}
+
+    assert RuleStore.signature({**rule, "id": "f1e2d3"}) == rule
+    assert RuleStore.signature({**rule, "action_parameters": {"phases": ["http_ratelimit"]}}) != RuleStore.signature(rule)
+    assert RuleStore.signature({**rule, "enabled": False}) != RuleStore.signature(rule)
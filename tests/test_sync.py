@@ -0,0 +1,25 @@
+from cf_rules import Cloudflare, MemoryTransport
+
+
+def test_sync_zones_creates_the_entrypoint(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com", plan="pro", rules=[
+        {"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"},
+        {"description": "Bad IP", "expression": "(ip.src eq 1.1.1.1)", "action": "managed_challenge"},
+    ])
+    zone = transport.add_zone("example.net", plan="pro")
+
+    # The zone has no custom rules entrypoint yet
+    for ruleset_id in [x for x, y in transport.rulesets.items() if y["owner"] == ("zones", zone["id"])]:
+        del transport.rulesets[ruleset_id]
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+    cf.set_plan("example.net")
+
+    directory = str(tmp_path / "store")
+    cf.export_zones(["example.com"], directory)
+    report = cf.sync_zones(["example.net"], directory, source="example.com")
+
+    assert report["example.net"]["created"] == ["Bad Bots", "Bad IP"]
+    assert cf.get_rules("example.net")["rules"] == ["Bad Bots", "Bad IP"]
@@ -0,0 +1,43 @@
+from cf_rules import Cloudflare, MemoryTransport, Transport
+from cf_rules.utils import ZONE_FIELDS
+
+
+class JSONOnlyTransport(Transport):
+    """Transport whose responses only have a json() method"""
+
+    def __init__(self) -> None:
+        self.memory = MemoryTransport()
+
+    def request(self, method, url, headers=None, json=None, timeout=5):
+        response = self.memory.request(method, url, headers=headers, json=json, timeout=timeout)
+
+        class Response:
+            status_code = response.status_code
+
+            def json(self):
+                return response.json()
+
+        return Response()
+
+
+def test_responses_without_content_are_decoded(tmp_path):
+    transport = JSONOnlyTransport()
+    transport.memory.add_zone("example.com", rules=[{"description": "Bad Bots", "expression": "(cf.client.bot)", "action": "block"}])
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    assert cf.get_domains()["domains"] == ["example.com"]
+    assert cf.get_rules("example.com")["rules"] == ["Bad Bots"]
+
+
+def test_zones_are_kept_whole_unless_projected(tmp_path):
+    transport = MemoryTransport()
+    transport.add_zone("example.com")
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+    assert "name_servers" in cf.get_domain("example.com")
+
+    cf.zone_fields = ZONE_FIELDS
+    assert "name_servers" not in cf.get_domain("example.com")
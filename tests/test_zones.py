@@ -0,0 +1,35 @@
+import pytest
+
+from cf_rules import Cloudflare, Error, MemoryTransport
+
+
+def test_zone_index(tmp_path):
+    transport = MemoryTransport()
+    for i in range(120):
+        transport.add_zone(f"example{i}.com", plan="pro" if i % 2 else "free")
+
+    cf = Cloudflare(str(tmp_path / "expressions"), transport=transport)
+    cf.auth_token("token")
+
+    # All zones are listed page by page once, then domains are resolved without any request
+    start = len(transport.calls)
+    index = cf.index_zones(refresh_interval=60)
+    assert len(index) == 120
+    assert [x for x, _ in transport.calls[start:]] == ["GET"] * 3
+
+    start = len(transport.calls)
+    cf.set_plan("example1.com")
+    assert cf.max_rules == 20
+    assert cf.get_domain("example2.com")["name"] == "example2.com"
+    assert index.summary()["example3.com"]["plan"] == "pro"
+    assert transport.calls[start:] == []
+
+    # A missing domain lists the zones again, at most once per refresh interval
+    transport.add_zone("example.org")
+    with pytest.raises(Error):
+        cf.get_domain("example.org")
+    assert transport.calls[start:] == []
+
+    index.refresh_interval = 0
+    assert cf.get_domain("example.org")["name"] == "example.org"
+    assert [x for x, _ in transport.calls[start:]] == ["GET"] * 3